@@ -0,0 +1,262 @@
+"""
+Замеры скорости горячих путей игры на полях от 9x9 до 2000x2000
+
+Пример: python benchmarks/run.py --output bench.json
+        python benchmarks/run.py --output new.json --baseline bench.json
+
+Результаты пишутся в JSON (минимум и медиана по повторам для каждого
+случая), а при заданном --baseline печатается сравнение с прошлым запуском.
+Renderer.draw_grid замеряется с заглушкой вместо OpenGL: вызовы GL ничего
+не делают, поэтому видна стоимость самого обхода поля на Python.
+"""
+import argparse
+import gc
+import importlib.util
+import json
+import os
+import platform
+import re
+import statistics
+import sys
+import time
+import types
+
+# Общий движок и версии игры лежат в корне репозитория
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from minesweeper_engine import Board
+
+SIZES = [9, 16, 30, 100, 500, 1000, 2000]
+DENSITIES = [0.1, 0.15, 0.2]
+# Отрисовка проходит по каждой клетке с десятками вызовов GL, большие поля замерять бессмысленно
+MAX_DRAW_SIZE = 100
+# Количество повторов замера - около RUNS_CELLS клеток в сумме, но не меньше MIN_RUNS и не больше MAX_RUNS
+RUNS_CELLS = 1000000
+MIN_RUNS = 3
+MAX_RUNS = 200
+
+
+def load_module(name, path):
+    """Загружает модуль версии игры по пути к файлу (папки версий - не пакеты)"""
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def stub_gl():
+    """
+    Подменяет OpenGL модулями-заглушками
+
+    Имена функций и констант GL берутся из исходников 3D-версии, каждая
+    функция ничего не делает, каждая константа равна нулю.
+    """
+    names = set()
+    for file in ('renderer.py', 'game.py'):
+        with open(os.path.join(ROOT, 'game_3d', file), encoding='utf-8') as f:
+            names.update(re.findall(r'\b(?:gl|glu)[A-Z]\w*|\bGL_\w+', f.read()))
+
+    def noop(*args, **kwargs):
+        return 0
+
+    package = types.ModuleType('OpenGL')
+    for module_name in ('GL', 'GLU'):
+        module = types.ModuleType(f'OpenGL.{module_name}')
+        for name in names:
+            setattr(module, name, 0 if name.startswith('GL_') else noop)
+        setattr(package, module_name, module)
+        sys.modules[f'OpenGL.{module_name}'] = module
+    sys.modules['OpenGL'] = package
+
+
+class ColdPool:
+    """Запас полей, который всегда пуст: первый клик генерирует поле сам (худший случай)"""
+
+    def place(self, board, x, y):
+        board.place_mines(x, y)
+        return {'pooled': False, 'attempts': 1, 'elapsed': 0.0}
+
+
+def measure(setup, action, runs):
+    """
+    Замеряет action(state) runs раз, каждый раз на свежем состоянии setup(seed)
+
+    Зёрна полей - номера повторов, поэтому при каждом запуске замеряются
+    одни и те же поля и результаты разных запусков сравнимы между собой.
+
+    Returns:
+        Словарь с минимумом и медианой в секундах и числом повторов
+    """
+    times = []
+    for seed in range(runs):
+        state = setup(seed)
+        # Как и timeit, отключаем сборщик мусора, чтобы он не срабатывал посреди замера
+        gc.collect()
+        gc.disable()
+        try:
+            started = time.perf_counter()
+            action(state)
+            times.append(time.perf_counter() - started)
+        finally:
+            gc.enable()
+    return {'min': min(times), 'median': statistics.median(times), 'runs': runs}
+
+
+def run_count(size):
+    """Количество повторов: много на маленьких полях (шум таймера), мало на больших (дорогая подготовка)"""
+    return max(MIN_RUNS, min(MAX_RUNS, RUNS_CELLS // (size * size)))
+
+
+def mine_count(size, density):
+    """Количество мин для плотности с учётом безопасной зоны 3x3"""
+    return max(1, min(round(size * size * density), size * size - 9))
+
+
+def cases(sizes, densities):
+    """
+    Перебирает случаи замеров: (имя, размер, плотность, setup, action) или (имя, ..., причина пропуска)
+
+    Версии игры, зависимости которых не установлены, пропускаются с указанием причины.
+    """
+    console = load_module('console_main', os.path.join(ROOT, 'game_in_console', 'main.py'))
+
+    try:
+        gui = load_module('gui_main', os.path.join(ROOT, 'game_in_gui', 'main.py'))
+    except ImportError as e:
+        gui = f"нет {e.name}"
+
+    stub_gl()
+    sys.path.insert(0, os.path.join(ROOT, 'game_3d'))
+    try:
+        game = load_module('game', os.path.join(ROOT, 'game_3d', 'game.py'))
+        renderer = sys.modules['renderer']
+    except ImportError as e:
+        game = renderer = f"нет {e.name}"
+
+    for size in sizes:
+        for density in densities:
+            mines = mine_count(size, density)
+            center = size // 2
+
+            yield ('console.Generator_Map', size, density,
+                   lambda seed: None, lambda _, m=mines, n=size: console.Generator_Map(m, (4, 4), n, n))
+
+            def fresh_board(seed, flag_win=False, size=size, mines=mines):
+                return Board(size, size, mines, flag_win=flag_win, seed=seed)
+
+            if isinstance(gui, str):
+                yield 'gui.place_mines', size, density, gui
+            else:
+                yield ('gui.place_mines', size, density,
+                       lambda seed: types.SimpleNamespace(board=fresh_board(seed, True), pool=ColdPool(),
+                                                     no_guess=types.SimpleNamespace(get=lambda: False)),
+                       lambda stub, c=center: gui.MinesweeperGUI.place_mines(stub, c, c))
+
+            if isinstance(game, str):
+                yield 'game3d.place_mines', size, density, game
+            else:
+                yield ('game3d.place_mines', size, density,
+                       lambda seed: types.SimpleNamespace(board=fresh_board(seed), pool=ColdPool(), settings={}),
+                       lambda stub, c=center: game.Minesweeper3D.place_mines(stub, c, c))
+
+            def placed_board(seed, size=size, mines=mines, center=center):
+                board = Board(size, size, mines, seed=seed)
+                board.place_mines(center, center)
+                return board
+
+            yield ('board.reveal', size, density, placed_board,
+                   lambda board, c=center: board.reveal(c, c))
+
+            def revealed_board(seed, placed_board=placed_board, center=center):
+                board = placed_board(seed)
+                board.reveal(center, center)
+                return board
+
+            yield ('board.check_win', size, density, revealed_board,
+                   lambda board: [board.check_win() for _ in range(1000)])
+
+            if size <= MAX_DRAW_SIZE:
+                if isinstance(renderer, str):
+                    yield 'renderer.draw_grid', size, density, renderer
+                else:
+                    def draw_state(seed, revealed_board=revealed_board):
+                        drawer = renderer.Renderer.__new__(renderer.Renderer)
+                        drawer.cell_size = 2
+                        drawer.depth = 0.7
+                        drawer.mine_quadric = drawer.spike_quadric = 0
+                        return drawer, revealed_board(seed)
+
+                    yield ('renderer.draw_grid', size, density, draw_state,
+                           lambda state, s=size, c=center: state[0].draw_grid(state[1], (c, c), s))
+
+
+def run(sizes, densities):
+    """Выполняет все замеры и возвращает словарь результатов"""
+    results = {}
+    for name, size, density, *case in cases(sizes, densities):
+        key = f"{name}/{size}x{size}/{density}"
+        if len(case) == 1:
+            results[key] = {'skipped': case[0]}
+            print(f"{key:<45} пропущено: {case[0]}", file=sys.stderr)
+            continue
+        results[key] = measure(*case, run_count(size))
+        print(f"{key:<45} {results[key]['median'] * 1000:>12.3f} мс", file=sys.stderr)
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'results': results,
+    }
+
+
+def compare(current, baseline, threshold):
+    """
+    Печатает сравнение с прошлым запуском
+
+    Сравниваются минимумы: на коротких случаях медиана заметно шумит
+    от планировщика ОС, а минимум почти не зависит от фоновой нагрузки.
+
+    Returns:
+        Количество случаев, ставших медленнее больше чем на threshold
+    """
+    regressions = 0
+    print(f"{'case':<45} {'base ms':>12} {'now ms':>12} {'ratio':>7}")
+    for key, result in current['results'].items():
+        old = baseline['results'].get(key)
+        if 'min' not in result or not old or 'min' not in old:
+            continue
+        ratio = result['min'] / old['min']
+        mark = ''
+        if ratio > 1 + threshold:
+            mark = '  медленнее'
+            regressions += 1
+        elif ratio < 1 - threshold:
+            mark = '  быстрее'
+        print(f"{key:<45} {old['min'] * 1000:>12.3f} {result['min'] * 1000:>12.3f} {ratio:>7.2f}{mark}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Замеры скорости генерации, вскрытия, проверки победы и отрисовки")
+    parser.add_argument('--size', action='append', type=int, help="Сторона поля (можно несколько раз)")
+    parser.add_argument('--density', action='append', type=float, help="Плотность мин (можно несколько раз)")
+    parser.add_argument('--output', default='bench.json', help="Файл для результатов в JSON")
+    parser.add_argument('--baseline', help="Результаты прошлого запуска для сравнения")
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help="Изменение времени, которое считается регрессией или ускорением (доля)")
+    args = parser.parse_args(argv)
+
+    current = run(args.size or SIZES, args.density or DENSITIES)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(current, f, indent=2, ensure_ascii=False)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        # Ненулевой код возврата, если что-то замедлилось (удобно для CI)
+        return 1 if compare(current, baseline, args.threshold) else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -2,9 +2,25 @@ import pygame
 from pygame.locals import *
 from OpenGL.GL import *
 from OpenGL.GLU import *
-import random
+import os
+import sys
 from renderer import Renderer
 
+# Общий движок лежит в корне репозитория
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from minesweeper_engine import Board, EndlessBoard, ProbabilityEngine, Solver, READY, PLAYING, LOST
+from minesweeper_engine.endless import MIN_DENSITY
+from minesweeper_engine.history import History
+from minesweeper_engine.instrument import timed, stages
+from minesweeper_engine.mapped import MappedStorage
+from minesweeper_engine.metrics import board_metrics
+from minesweeper_engine.pool import BoardPool
+from minesweeper_engine.replay import ReplayWriter, default_path, REVEAL, FLAG, CHORD
+from minesweeper_engine.snapshot import save_snapshot, load_snapshot, default_path as snapshot_path
+
+# До какого размера поля считать 3BV (подсчёт держит в памяти несколько копий поля)
+METRICS_MAX_CELLS = 2000 * 2000
+
 
 class Minesweeper3D:
     def __init__(self, settings):
@@ -17,6 +33,7 @@ class Minesweeper3D:
         self.settings = settings
         self.grid_size = settings['grid_size']
         self.mine_count = settings['mine_count']
+        self.endless = settings.get('endless', False)  # Бесконечное поле из кусков
 
         self.last_arrow_time = 0
         self.width, self.height = (1280, 1024)
@@ -27,28 +44,85 @@ class Minesweeper3D:
 
         # Инициализация рендерера для 3D-графики
         self.renderer = Renderer(self.width, self.height, self.grid_size, self.settings['lighting_enabled'])
-        # Первоначальная настройка игрового состояния
-        self.init_game()
+        self.pool = None  # Запас готовых полей (пополняется в фоне, пока игрок играет)
+        self.replay = None  # Запись партии в файл повтора (бесконечное поле не записывается)
 
-    def init_game(self):
+        # Первоначальная настройка игрового состояния (сохранённое в файле поле продолжаем)
+        self.init_game(resume=True)
+
+    def init_game(self, resume=False, board=None):
         """
         Инициализация или сброс игрового состояния к начальным значениям
 
         Создает чистую сетку, сбрасывает позицию курсора, таймеры и флаги состояния игры
-        """
-        # Создаем сетку клеток с начальными значениями
-        self.grid = [[{'mine': False, 'revealed': False, 'flagged': False, 'adjacent': 0}
-                      for _ in range(self.grid_size)] for _ in range(self.grid_size)]
 
-        # Позиция курсора (начинаем в центре поля)
-        self.cursor_pos = [self.grid_size // 2, self.grid_size // 2]
+        Args:
+            resume: Продолжить партию из файла settings['board_file'], если он уже есть
+            board: Поле загруженной из сохранения партии
+        """
+        board_file = self.settings.get('board_file')  # Поле в файле на диске (numpy.memmap)
+        if self.endless:
+            # Бесконечное поле с той же плотностью мин, что и у выбранного поля;
+            # игрок начинает в безопасном центре мира, а окно grid_size x grid_size следует за курсором
+            density = max(self.mine_count / (self.grid_size * self.grid_size), MIN_DENSITY)
+            self.board = EndlessBoard(density)
+            self.cursor_pos = [0, 0]
+        elif board is not None:
+            # Партия из сохранения: размеры берутся из поля
+            self.board = board
+            self.grid_size = board.width
+            self.mine_count = board.mine_count
+            self.cursor_pos = [self.grid_size // 2, self.grid_size // 2]
+        elif resume and board_file and os.path.exists(board_file):
+            # Продолжаем партию из файла: плоскости не загружаются, размеры берутся из файла
+            self.board = Board.resume(MappedStorage(board_file))
+            self.grid_size = self.board.width
+            self.mine_count = self.board.mine_count
+            self.cursor_pos = [self.grid_size // 2, self.grid_size // 2]
+        else:
+            # Создаем поле (мины расставляются при первом ходе)
+            storage = MappedStorage(board_file) if board_file else self.settings.get('storage')
+            self.board = Board(self.grid_size, self.grid_size, self.mine_count, storage=storage)
+
+            # Позиция курсора (начинаем в центре поля)
+            self.cursor_pos = [self.grid_size // 2, self.grid_size // 2]
+
+        # Поле в файле на диске может не помещаться в память: запас (готовые поля целиком)
+        # и повтор (расстановка и контрольные точки копируют плоскости) для него не ведутся
+        mapped = isinstance(self.board.storage, MappedStorage)
+
+        # Запас полей под размеры текущего поля (продолженное из файла поле может отличаться от меню)
+        pool = self.pool
+        pooled = not self.endless and not mapped
+        if pool is not None and (not pooled or (pool.width, pool.height, pool.mine_count) !=
+                                 (self.board.width, self.board.height, self.board.mine_count)):
+            pool.close()
+            self.pool = pool = None
+        if pooled and pool is None:
+            self.pool = BoardPool(self.board.width, self.board.height, self.board.mine_count,
+                                  no_guess=self.settings.get('no_guess', False))
+
+        # Журнал ходов для отмены и повтора (бесконечное поле ходы не отменяет)
+        self.history = None if self.endless else History(self.board)
+
+        # Каждая партия пишется в свой файл повтора (продолженная - с контрольной точки её состояния)
+        if self.replay is not None:
+            self.replay.close()
+        self.replay = None if self.endless or mapped else ReplayWriter(default_path(), self.board)
 
         # Состояние игры
-        self.game_over = False  # Флаг завершения игры
-        self.win = False  # Флаг победы
-        self.first_click = True  # Флаг первого хода (для безопасного старта)
+        self.game_over = self.board.status == LOST  # Флаг завершения игры (продолженная партия могла уже закончиться)
+        self.win = self.board.check_win()  # Флаг победы
+        self.first_click = self.endless or self.board.status == READY  # Флаг первого хода (для безопасного старта)
+        self.generation = None  # Статистика поиска поля без угадываний (попытки и время)
+        # Сложность поля (3BV); у продолженной из файла партии мины уже расставлены
+        self.metrics = self.measure_board() if not self.first_click else None
+        self.solver = None  # Решатель для подсказок (создаётся при первой подсказке)
+        self.probability_engine = None  # Точные вероятности мин (создаются при включении тепловой карты)
+        self.probabilities = None  # Вероятности для тепловой карты (None - карта выключена)
         self.start_time = pygame.time.get_ticks()  # Время начала игры
         self.elapsed_time = 0  # Прошедшее время игры
+        self.elapsed_ms = 0  # То же в миллисекундах (для 3BV/s)
 
         # Словарь для отслеживания состояния клавиш управления
         self.keys_pressed = {
@@ -57,81 +131,161 @@ class Minesweeper3D:
             pygame.K_LEFT: False, pygame.K_RIGHT: False, pygame.K_ESCAPE: False
         }
 
+    @timed('game3d.place_mines')
     def place_mines(self, safe_x, safe_y):
         """
-                Размещение мин на поле с гарантией безопасной зоны вокруг первого клика
+        Размещение мин на поле с гарантией безопасной зоны вокруг первого клика
 
-                Args:
-                    safe_x, safe_y: Координаты безопасной клетки (первый клик)
+        Args:
+            safe_x, safe_y: Координаты безопасной клетки (первый клик)
         """
-        mines_placed = 0
-        safe_cells = set()
-
-        # Создаем безопасную зону вокруг первого клика
-        for dx in [-1, 0, 1]:
-            for dy in [-1, 0, 1]:
-                nx, ny = safe_x + dx, safe_y + dy
-                if 0 <= nx < self.grid_size and 0 <= ny < self.grid_size:
-                    safe_cells.add((nx, ny))
-
-        # Размещаем мины
-        while mines_placed < self.mine_count:
-            x, y = random.randint(0, self.grid_size - 1), random.randint(0, self.grid_size - 1)
-            if (x, y) not in safe_cells and not self.grid[y][x]['mine']:
-                self.grid[y][x]['mine'] = True
-                mines_placed += 1
-
-                # Обновляем счетчики соседних мин
-                for dx in [-1, 0, 1]:
-                    for dy in [-1, 0, 1]:
-                        if dx == 0 and dy == 0:
-                            continue
-                        nx, ny = x + dx, y + dy
-                        if 0 <= nx < self.grid_size and 0 <= ny < self.grid_size:
-                            self.grid[ny][nx]['adjacent'] += 1
+        if self.pool is None:
+            self.board.place_mines(safe_x, safe_y)  # Поле в файле: мины пишутся в файл частями
+        else:
+            # Готовое поле из запаса подгоняется под клик, поэтому дорогая генерация не задерживает ход
+            result = self.pool.place(self.board, safe_x, safe_y)
+            if self.settings.get('no_guess'):
+                self.generation = result  # Попытки и время поиска поля без угадываний для HUD
+        self.metrics = self.measure_board()  # 3BV поля для HUD
+
+    def measure_board(self):
+        """Сложность поля (3BV и открытия) или None для слишком больших полей"""
+        if self.board.width * self.board.height > METRICS_MAX_CELLS:
+            return None
+        return board_metrics(self.board)
+
+    def save_game(self):
+        """Сохраняет партию (поле, время и настройки) в файл (бесконечное поле хранит себя само)"""
+        if self.endless:
+            return
+        settings = {key: value for key, value in self.settings.items()
+                    if key in ('grid_size', 'mine_count', 'lighting_enabled', 'no_guess')}
+        save_snapshot(snapshot_path('game_3d'), self.board, self.elapsed_ms / 1000, settings)
+
+    def load_game(self):
+        """Загружает сохранённую партию и продолжает её с сохранённым временем"""
+        path = snapshot_path('game_3d')
+        if not os.path.exists(path):
+            return
+        board, elapsed, settings = load_snapshot(path)
+        self.settings.update(settings)
+        self.endless = False
+        self.init_game(board=board)
+        self.start_time -= int(elapsed * 1000)
+        self.elapsed_ms = int(elapsed * 1000)
+        self.elapsed_time = self.elapsed_ms // 1000
 
     def reveal_cell(self, x, y):
-        """Вскрытие клетки и рекурсивное вскрытие соседей"""
-        if not (0 <= x < self.grid_size and 0 <= y < self.grid_size):
-            return
+        """
+        Вскрытие клетки и соседей (при проигрыше показываются все мины)
 
-        cell = self.grid[y][x]
-        if cell['revealed'] or cell['flagged']:
-            return
+        Returns:
+            Список открытых клеток (плоские индексы, для бесконечного поля - координаты)
+        """
+        if self.board.is_flagged(x, y):
+            return []
 
-        # Первый клик - гарантируем безопасность
+        # Первый клик - гарантируем безопасность (бесконечное поле создаёт мины само)
         if self.first_click:
             self.first_click = False
-            self.place_mines(x, y)
+            if not self.endless:
+                self.place_mines(x, y)
+
+        opened = (self.board if self.history is None else self.history).reveal(x, y)
+        if not opened:  # Клетка уже открыта - ход не записываем, как в консоли и GUI
+            return opened
+        if self.replay is not None:
+            self.replay.record(REVEAL, x, y)
+        if self.board.status == LOST:
+            self.game_over = True
+        elif self.solver is not None:
+            self.solver.update(opened)  # Решатель проверяет только ограничения у новых клеток
+        if self.probabilities is not None:
+            self.update_heatmap()
+        return opened
+
+    def chord_cell(self, x, y):
+        """
+        Аккорд: открывает соседей цифры, вокруг которой стоят все флаги
 
-        cell['revealed'] = True
+        Все каскады открываются движком одним проходом, поэтому решатель и
+        тепловая карта обновляются один раз на аккорд.
 
-        # Проверка на мину
-        if cell['mine']:
+        Returns:
+            Список открытых клеток (плоские индексы, для бесконечного поля - координаты)
+        """
+        opened = (self.board if self.history is None else self.history).chord(x, y)
+        if not opened:
+            return opened
+        if self.replay is not None:
+            self.replay.record(CHORD, x, y)
+        if self.board.status == LOST:
             self.game_over = True
-            # Показываем все мины при проигрыше
-            for row in self.grid:
-                for cell_data in row:
-                    if cell_data['mine']:
-                        cell_data['revealed'] = True
+        elif self.solver is not None:
+            self.solver.update(opened)
+        if self.probabilities is not None:
+            self.update_heatmap()
+        return opened
+
+    def toggle_heatmap(self):
+        """Включает или выключает тепловую карту вероятностей мин"""
+        if self.probabilities is not None or self.endless:
+            self.probabilities = None
+            return
+        if self.probability_engine is None:
+            if self.solver is None:
+                self.solver = Solver(self.board)
+            # Общий решатель: reveal_cell обновляет его, а компоненты границы запоминаются между ходами
+            self.probability_engine = ProbabilityEngine(self.board, self.solver)
+        self.update_heatmap()
+
+    def update_heatmap(self):
+        """Пересчитывает вероятности мин (до первого хода и после конца игры карта пустая)"""
+        if self.board.status == PLAYING:
+            self.probabilities = self.probability_engine.probabilities()
+        else:
+            self.probabilities = ({}, None)
+
+    def show_hint(self):
+        """Переводит курсор на клетку, которая наверняка безопасна (если такая есть)"""
+        if self.endless or self.board.status != PLAYING:
             return
+        if self.solver is None:
+            self.solver = Solver(self.board)
+        hint = self.solver.next_safe()
+        if hint is not None:
+            self.cursor_pos = list(hint)
+
+    def step_history(self, undo):
+        """
+        Отменяет или повторяет ход по журналу
 
-        # Рекурсивное вскрытие пустых клеток
-        if cell['adjacent'] == 0:
-            for dx in [-1, 0, 1]:
-                for dy in [-1, 0, 1]:
-                    if dx != 0 or dy != 0:
-                        self.reveal_cell(x + dx, y + dy)
+        Args:
+            undo: True - отменить последний ход, False - повторить отменённый
+        """
+        if self.history is None:
+            return
+        finished = self.game_over or self.win
+        if not len(self.history.undo() if undo else self.history.redo()):
+            return
+        self.game_over = self.board.status == LOST
+        self.win = self.board.check_win()
+        if finished and not (self.game_over or self.win):
+            self.start_time = pygame.time.get_ticks() - self.elapsed_ms  # Таймер продолжается с конца партии
+
+        # Решатель и вероятности обновляются только вперёд - после отмены строятся заново
+        self.solver = None
+        self.probability_engine = None
+        if self.probabilities is not None:
+            self.probabilities = None
+            self.toggle_heatmap()
+        if self.replay is not None:
+            self.replay.step(-1 if undo else 1)  # В повтор - короткая запись перехода, а не всё поле
 
     def check_win(self):
         """Проверка условия победы"""
-        for y in range(self.grid_size):
-            for x in range(self.grid_size):
-                cell = self.grid[y][x]
-                if not cell['mine'] and not cell['revealed']:
-                    return False
-        self.win = True
-        return True
+        self.win = self.board.check_win()
+        return self.win
 
     def handle_input(self):
         """Обработка ввода с клавиатуры"""
@@ -154,30 +308,41 @@ class Minesweeper3D:
         if self.keys_pressed[pygame.K_e]:
             self.renderer.camera_distance = max(-40, self.renderer.camera_distance - speed * 0.5)
 
-        # Управление курсором
+        # Управление курсором (на бесконечном поле границ нет)
+        low, high = (float('-inf'), float('inf')) if self.endless else (0, self.grid_size - 1)
         if self.keys_pressed[pygame.K_UP] and current_time - self.last_arrow_time > 150:
-            self.cursor_pos[1] = min(self.grid_size - 1, self.cursor_pos[1] + 1)
+            self.cursor_pos[1] = min(high, self.cursor_pos[1] + 1)
             self.last_arrow_time = current_time
         if self.keys_pressed[pygame.K_DOWN] and current_time - self.last_arrow_time > 150:
-            self.cursor_pos[1] = max(0, self.cursor_pos[1] - 1)
+            self.cursor_pos[1] = max(low, self.cursor_pos[1] - 1)
             self.last_arrow_time = current_time
         if self.keys_pressed[pygame.K_LEFT] and current_time - self.last_arrow_time > 150:
-            self.cursor_pos[0] = max(0, self.cursor_pos[0] - 1)
+            self.cursor_pos[0] = max(low, self.cursor_pos[0] - 1)
             self.last_arrow_time = current_time
         if self.keys_pressed[pygame.K_RIGHT] and current_time - self.last_arrow_time > 150:
-            self.cursor_pos[0] = min(self.grid_size - 1, self.cursor_pos[0] + 1)
+            self.cursor_pos[0] = min(high, self.cursor_pos[0] + 1)
             self.last_arrow_time = current_time
 
+    def view_origin(self):
+        """Левый нижний угол видимого окна (на бесконечном поле окно центрировано по курсору)"""
+        if not self.endless:
+            return 0, 0
+        return self.cursor_pos[0] - self.grid_size // 2, self.cursor_pos[1] - self.grid_size // 2
+
     def run(self):
         """Главный игровой цикл"""
         clock = pygame.time.Clock()
         running = True
+        frame = stages('frame')  # Время этапов кадра (при MINESWEEPER_PROFILE)
 
         while running:
+            frame.start()
+
             # Обновление времени
             current_time = pygame.time.get_ticks()
             if not self.game_over and not self.win:
-                self.elapsed_time = (current_time - self.start_time) // 1000
+                self.elapsed_ms = current_time - self.start_time
+                self.elapsed_time = self.elapsed_ms // 1000
 
             # Обработка событий
             for event in pygame.event.get():
@@ -197,6 +362,18 @@ class Minesweeper3D:
                         self.init_game()
                         continue
 
+                    # Сохранение и загрузка партии
+                    if event.key == pygame.K_F5:
+                        self.save_game()
+                    elif event.key == pygame.K_F9:
+                        self.load_game()
+                        continue
+
+                    # Отмена и повтор хода (отмена проигрышного хода продолжает партию)
+                    if event.key in (pygame.K_z, pygame.K_y) and event.mod & pygame.KMOD_CTRL:
+                        self.step_history(undo=event.key == pygame.K_z)
+                        continue
+
                     # Игровые действия
                     if not self.game_over and not self.win:
                         if event.key == pygame.K_SPACE:
@@ -204,10 +381,20 @@ class Minesweeper3D:
                             self.reveal_cell(x, y)
                             if not self.game_over and not self.first_click:
                                 self.check_win()
+                        elif event.key == pygame.K_c:
+                            x, y = self.cursor_pos
+                            self.chord_cell(x, y)
+                            if not self.game_over:
+                                self.check_win()
                         elif event.key == pygame.K_f:
                             x, y = self.cursor_pos
-                            if not self.grid[y][x]['revealed']:
-                                self.grid[y][x]['flagged'] = not self.grid[y][x]['flagged']
+                            flagged = (self.board if self.history is None else self.history).toggle_flag(x, y)
+                            if flagged and self.replay is not None:
+                                self.replay.record(FLAG, x, y)
+                        elif event.key == pygame.K_h:
+                            self.show_hint()
+                        elif event.key == pygame.K_p:
+                            self.toggle_heatmap()
 
                 elif event.type == pygame.KEYUP:
                     if event.key in self.keys_pressed:
@@ -215,23 +402,37 @@ class Minesweeper3D:
 
             # Обработка непрерывного ввода
             self.handle_input()
+            frame.mark('input')
 
             # Очистка экрана
             glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
 
             # Обновление камеры
             self.renderer.update_camera()
+            frame.mark('update_camera')
 
             # Отрисовка игрового поля
-            self.renderer.draw_grid(self.grid, self.cursor_pos, self.grid_size)
+            self.renderer.draw_grid(self.board, self.cursor_pos, self.grid_size, self.view_origin(),
+                                    self.probabilities)
+            frame.mark('draw_grid')
 
             # Отображение интерфейса
             self.draw_interface()
+            frame.mark('draw_interface')
 
             # Обновление дисплея
             pygame.display.flip()
+            frame.mark('flip', last=True)
             clock.tick(60)
 
+        if self.endless:
+            self.board.flush()  # Сохраняем изменённые куски, которые ещё в памяти
+        elif isinstance(self.board.storage, MappedStorage):
+            self.board.storage.flush()  # Сбрасываем изменённые страницы файла поля на диск
+        if self.pool is not None:
+            self.pool.close()
+        if self.replay is not None:
+            self.replay.close()
         pygame.quit()
 
     def draw_interface(self):
@@ -242,10 +443,18 @@ class Minesweeper3D:
         elif self.win:
             self.renderer.draw_text("YOU WIN! Press R to restart", self.width // 1.5, self.height // 2, background=True)
 
-        # Время и мины (с фоном)
+        # Время и мины (с фоном) - счётчики берутся из движка, поле не пересканируется
         time_text = f"Time: {self.elapsed_time}s"
-        mines_text = f"Mines: {self.mine_count}"
-        grid_text = f"Grid: {self.grid_size}x{self.grid_size}"
+        flags_text = f"Flags: {self.board.flags_placed}"
+        if self.endless:
+            # У бесконечного поля нет общего числа мин - показываем прогресс и положение
+            mines_text = f"Opened: {self.board.cells_revealed}"
+            safe_text = f"Chunks: {len(self.board.chunks)}"
+            grid_text = f"Pos: {self.cursor_pos[0]}, {self.cursor_pos[1]}"
+        else:
+            mines_text = f"Mines: {self.board.mines_left}/{self.mine_count}"
+            safe_text = f"Safe left: {self.board.safe_remaining}"
+            grid_text = f"Grid: {self.grid_size}x{self.grid_size}"
 
         # Вычисляем относительные отступы от краев экрана
         margin_x = self.width * 0.05  # 5% от ширины экрана
@@ -255,16 +464,33 @@ class Minesweeper3D:
         # Левая колонка (информация)
         self.renderer.draw_text(time_text, margin_x, margin_y, background=True)
         self.renderer.draw_text(mines_text, margin_x, margin_y + text_spacing, background=True)
+        if self.generation is not None:
+            if self.generation['failed']:
+                no_guess_text = "No-guess: not found, regular board"  # Слишком много мин для поля без угадываний
+            else:
+                no_guess_text = f"No-guess: {self.generation['attempts']} tries, {self.generation['elapsed']:.2f}s"
+            self.renderer.draw_text(no_guess_text, margin_x, margin_y + text_spacing * 2, background=True)
+        if self.metrics is not None:
+            # После победы показываем скорость игрока в 3BV в секунду
+            bbbv_text = f"3BV: {self.metrics['3bv']}"
+            if self.win and self.elapsed_ms:
+                bbbv_text += f"  3BV/s: {self.metrics['3bv'] * 1000 / self.elapsed_ms:.2f}"
+            self.renderer.draw_text(bbbv_text, margin_x, margin_y + text_spacing * 3, background=True)
 
         # Правая колонка (информация) - отступаем от правого края
         right_margin_x = self.width - 200  # Фиксированная ширина текста или можно сделать относительной
         self.renderer.draw_text(grid_text, right_margin_x, margin_y, background=True)
+        self.renderer.draw_text(flags_text, right_margin_x, margin_y + text_spacing, background=True)
+        self.renderer.draw_text(safe_text, right_margin_x, margin_y + text_spacing * 2, background=True)
 
         # Подсказки управления (нижний левый угол)
-        controls_text = "WASD: Camera  Q/E: Zoom  Arrows: Move  Space: Reveal  F: Flag"
+        controls_text = ("WASD: Camera  Q/E: Zoom  Arrows: Move  Space: Reveal  C: Chord  F: Flag  H: Hint  "
+                         "P: Odds  Ctrl+Z/Y: Undo/Redo")
         self.renderer.draw_text(controls_text, margin_x, self.height - margin_y, background=True)
 
         # Клавиши управления (нижний правый угол)
         control_keys = "R: Restart  ESC: Menu"
         right_controls_x = self.width - 200
+        self.renderer.draw_text("F5: Save  F9: Load", right_controls_x, self.height - margin_y - text_spacing,
+                                background=True)
         self.renderer.draw_text(control_keys, right_controls_x, self.height - margin_y, background=True)
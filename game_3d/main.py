@@ -1,3 +1,4 @@
+import sys
 import pygame
 from game import Minesweeper3D
 from menu import GameMenu
@@ -15,6 +16,10 @@ def main():
     game_settings = menu.run()
 
     if game_settings:  # Если пользователь начал игру
+        # Путь к файлу поля в аргументах: партия хранится на диске и продолжается при следующем запуске
+        if len(sys.argv) > 1:
+            game_settings['board_file'] = sys.argv[1]
+
         # Закрываем меню и создаем игровое окно
         pygame.quit()
 
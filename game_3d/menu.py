@@ -14,6 +14,8 @@ class GameMenu:
         self.grid_size = 10  # Размер поля
         self.mine_count = 15  # Мины для начала
         self.lighting_on = True  # Освещение включено
+        self.endless_on = False  # Бесконечное поле выключено
+        self.no_guess_on = False  # Поле без угадываний выключено
 
         # Вычисляем позиции относительно размера экрана
         self.middle_x = self.width // 2  # Центр экрана
@@ -23,7 +25,9 @@ class GameMenu:
         self.first_slider_y = self.height // 4  # Первый слайдер чуть ниже
         self.slider_spacing = self.height // 10  # Расстояние между слайдерами
         self.toggle_y = self.first_slider_y + self.slider_spacing * 2  # Переключатель после двух слайдеров
-        self.button_y = self.toggle_y + self.slider_spacing  # Кнопка внизу
+        self.endless_y = self.toggle_y + self.slider_spacing  # Переключатель бесконечного поля
+        self.no_guess_y = self.endless_y + self.slider_spacing  # Переключатель поля без угадываний
+        self.button_y = self.no_guess_y + self.slider_spacing  # Кнопка внизу
 
         # Ширины элементов - пропорционально ширине экрана
         self.slider_length = self.width // 4  # Слайдер занимает четверть экрана
@@ -113,6 +117,16 @@ class GameMenu:
         if toggle_rect.collidepoint(mouse_pos):
             self.lighting_on = not self.lighting_on  # Переключаем состояние
 
+        # Проверяем клик по переключателю бесконечного поля
+        endless_rect = pygame.Rect(self.middle_x - 70, self.endless_y, 140, 40)
+        if endless_rect.collidepoint(mouse_pos):
+            self.endless_on = not self.endless_on
+
+        # Проверяем клик по переключателю поля без угадываний
+        no_guess_rect = pygame.Rect(self.middle_x - 70, self.no_guess_y, 140, 40)
+        if no_guess_rect.collidepoint(mouse_pos):
+            self.no_guess_on = not self.no_guess_on
+
         # Проверяем клик по кнопке "Начать игру"
         start_rect = pygame.Rect(self.middle_x - self.btn_width // 2, self.button_y,
                                  self.btn_width, self.btn_height)
@@ -160,8 +174,10 @@ class GameMenu:
         self.draw_slider("Количество мин:", self.mine_count,
                          self.first_slider_y + self.slider_spacing, str(self.mine_count))
 
-        # Переключатель освещения
-        self.draw_lighting_toggle()
+        # Переключатели освещения, бесконечного поля и поля без угадываний
+        self.draw_toggle("Освещение:", self.lighting_on, self.toggle_y)
+        self.draw_toggle("Бесконечное поле:", self.endless_on, self.endless_y)
+        self.draw_toggle("Без угадываний:", self.no_guess_on, self.no_guess_y)
 
         # Кнопка начала игры
         self.draw_start_button()
@@ -203,23 +219,22 @@ class GameMenu:
 
         pygame.draw.circle(self.screen, (255, 255, 255), (int(handle_x), y_pos + 19), 12)
 
-    def draw_lighting_toggle(self):
-        """Рисуем переключатель освещения"""
+    def draw_toggle(self, label_text, enabled, toggle_y):
+        """Рисуем переключатель с меткой слева"""
         # Позиция переключателя - по центру
         toggle_x = self.middle_x - 70
-        toggle_y = self.toggle_y
 
         # Метка слева
-        label = self.normal_font.render("Освещение:", True, (255, 255, 255))
+        label = self.normal_font.render(label_text, True, (255, 255, 255))
         self.screen.blit(label, (toggle_x - label.get_width() - 30, toggle_y))
 
         # Сам переключатель - зеленный если включено, красный если выключено
-        toggle_color = (50, 200, 50) if self.lighting_on else (200, 50, 50)
+        toggle_color = (50, 200, 50) if enabled else (200, 50, 50)
         pygame.draw.rect(self.screen, toggle_color,
                          (toggle_x, toggle_y, 140, 40), border_radius=20)
 
         # Текст на переключателе
-        state_text = "ВКЛ" if self.lighting_on else "ВЫКЛ"
+        state_text = "ВКЛ" if enabled else "ВЫКЛ"
         text_surface = self.normal_font.render(state_text, True, (255, 255, 255))
         text_rect = text_surface.get_rect(center=(toggle_x + 70, toggle_y + 20))
         self.screen.blit(text_surface, text_rect)
@@ -250,5 +265,7 @@ class GameMenu:
         return {
             'grid_size': self.grid_size,
             'mine_count': self.mine_count,
-            'lighting_enabled': self.lighting_on
+            'lighting_enabled': self.lighting_on,
+            'endless': self.endless_on,
+            'no_guess': self.no_guess_on
         }
\ No newline at end of file
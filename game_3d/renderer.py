@@ -113,15 +113,20 @@ class Renderer:
                 glVertex3fv(vertices[vertex])
         glEnd()
 
-    def draw_grid(self, grid, cursor_pos, grid_size):
+    def draw_grid(self, board, cursor_pos, grid_size, origin=(0, 0), probabilities=None):
         """
         Отрисовка игрового поля с клетками, минами, флагами и курсором
 
         Args:
-            grid: Двумерный массив клеток игрового поля
+            board: Игровое поле (minesweeper_engine.Board или EndlessBoard)
             cursor_pos: Текущая позиция курсора (x, y)
-            grid_size: Размер игрового поля
+            grid_size: Размер игрового поля (для бесконечного поля - размер видимого окна)
+            origin: Координаты поля, которые рисуются в левом нижнем углу окна
+            probabilities: Результат ProbabilityEngine.probabilities() для тепловой карты
+                закрытых клеток (None - карта выключена)
         """
+        origin_x, origin_y = origin
+
         # Смещение для центрирования поля относительно начала координат
         offset_x = -grid_size * self.cell_size / 2
         offset_y = -grid_size * self.cell_size / 2
@@ -131,11 +136,18 @@ class Renderer:
             for x in range(grid_size):
                 cell_x = offset_x + x * self.cell_size
                 cell_y = offset_y + y * self.cell_size
-                cell = grid[y][x]
+                bx, by = origin_x + x, origin_y + y  # Координаты клетки на поле
+                revealed = board.is_revealed(bx, by)
+                mine = board.is_mine(bx, by)
 
                 # Выбор цвета клетки в зависимости от состояния
-                if cell['revealed']:
-                    color = (1, 0, 0) if cell['mine'] else (0.8, 0.8, 0.8)  # Красный для мин, серый для пустых
+                if revealed:
+                    color = (1, 0, 0) if mine else (0.8, 0.8, 0.8)  # Красный для мин, серый для пустых
+                elif probabilities is not None and not board.is_flagged(bx, by):
+                    # Тепловая карта: от синего (мины точно нет) к красному (мина точно есть)
+                    cells, interior = probabilities
+                    p = cells.get(by * board.width + bx, interior)
+                    color = (0.4, 0.4, 0.8) if p is None else (0.4 + 0.5 * p, 0.4 - 0.2 * p, 0.8 - 0.6 * p)
                 else:
                     color = (0.4, 0.4, 0.8)  # Синий для неоткрытых клеток
 
@@ -143,17 +155,17 @@ class Renderer:
                 self.draw_cube(cell_x, cell_y, 0, color)
 
                 # Отрисовка содержимого открытых клеток
-                if cell['revealed']:
-                    if cell['mine']:
+                if revealed:
+                    if mine:
                         self.draw_mine(cell_x, cell_y)  # Мина
-                    elif cell['adjacent'] > 0:
-                        self.draw_number(cell_x, cell_y, cell['adjacent'])  # Число соседних мин
-                elif cell['flagged']:
+                    elif board.adjacent_count(bx, by) > 0:
+                        self.draw_number(cell_x, cell_y, board.adjacent_count(bx, by))  # Число соседних мин
+                elif board.is_flagged(bx, by):
                     self.draw_flag(cell_x, cell_y)  # Флаг
 
         # Отрисовка курсора (желтая рамка поверх клетки)
-        cursor_x = offset_x + cursor_pos[0] * self.cell_size
-        cursor_y = offset_y + cursor_pos[1] * self.cell_size
+        cursor_x = offset_x + (cursor_pos[0] - origin_x) * self.cell_size
+        cursor_y = offset_y + (cursor_pos[1] - origin_y) * self.cell_size
         glColor3f(1, 1, 0)  # Желтый цвет
         glBegin(GL_LINE_LOOP)
         glVertex3f(cursor_x, cursor_y, 0.1)  # Лево-низ
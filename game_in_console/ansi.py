@@ -0,0 +1,169 @@
+"""
+Отрисовка поля консольной версии через ANSI-последовательности
+
+Поле рисуется один раз, а после хода перезаписываются только изменившиеся
+клетки: курсор ставится прямо на клетку (ESC[строка;столбецH). Всё, что нужно
+вывести за ход, собирается в одну строку и пишется одним вызовом write, поэтому
+по SSH за ход уходит число байт, пропорциональное числу изменённых клеток, а не
+размеру поля. Поле больше терминала показывается окном, которое сдвигается
+вслед за ходами или по команде игрока.
+"""
+import os
+import shutil
+import sys
+
+ESC = '\x1b['
+# Строки терминала под вопросами игры: состояние, сообщение, вопросы (длинные переносятся) и ответ
+PROMPT_LINES = 8
+# Изменённые клетки строки с разрывом не больше этого пишутся одним куском (дешевле нового перевода курсора)
+RUN_GAP = 3
+
+if os.name == 'nt':
+    os.system('')  # Включает обработку ANSI-последовательностей в консоли Windows
+
+
+def supported(out=None):
+    """Можно ли рисовать ANSI-последовательностями (вывод - терминал, а не файл или канал)"""
+    out = out or sys.stdout
+    return out.isatty() and os.environ.get('TERM') != 'dumb'
+
+
+class AnsiRenderer:
+    def __init__(self, board, out=None):
+        """
+        Инкрементальная отрисовка поля в терминале
+
+        Клетки показываются так же, как в print_map: '-' - закрытая, '?' - флаг,
+        цифра или пробел - открытая, а в конце партии - всё поле вместе с минами ('M').
+
+        Args:
+            board: Поле Board
+            out: Поток вывода (по умолчанию sys.stdout)
+        """
+        self.board = board
+        self.out = out or sys.stdout
+        self.label = len(str(board.height))  # Ширина номеров строк
+        self.cell = len(str(board.width)) + 1  # Ширина клетки вместе с пробелом после неё
+        self.origin = [0, 0]  # Левая верхняя клетка окна (x, y)
+        self.view = (1, 1)  # Ширина и высота окна в клетках
+        self.terminal = None  # Размер терминала, под который построено окно
+        self.full = True  # Нужно ли перерисовать окно целиком
+        self.pending = []  # Плоские индексы клеток, изменённых после прошлой отрисовки
+        self.messages = []
+        self.show_all = False  # Показывать всё поле (конец партии)
+
+    def _fit(self):
+        """Подгоняет окно под размер терминала; True, если размер изменился"""
+        terminal = shutil.get_terminal_size()
+        if terminal == self.terminal:
+            return False
+        self.terminal = terminal
+        columns = (terminal.columns - self.label - 1) // self.cell
+        lines = terminal.lines - 1 - PROMPT_LINES  # Строка номеров столбцов и место под вопросы
+        self.view = (max(1, min(self.board.width, columns)), max(1, min(self.board.height, lines)))
+        self._clamp()
+        return True
+
+    def _clamp(self):
+        """Не даёт окну выйти за край поля"""
+        width, height = self.view
+        self.origin[0] = max(0, min(self.origin[0], self.board.width - width))
+        self.origin[1] = max(0, min(self.origin[1], self.board.height - height))
+
+    def visible(self, x, y):
+        """Видна ли клетка (x, y) в окне"""
+        return (self.origin[0] <= x < self.origin[0] + self.view[0]
+                and self.origin[1] <= y < self.origin[1] + self.view[1])
+
+    def center(self, x, y):
+        """Сдвигает окно так, чтобы клетка (x, y) оказалась в его центре"""
+        self._fit()
+        self.origin = [x - self.view[0] // 2, y - self.view[1] // 2]
+        self._clamp()
+        self.full = True
+
+    def follow(self, x, y):
+        """Сдвигает окно к клетке (x, y), если она не видна"""
+        self._fit()
+        if not self.visible(x, y):
+            self.center(x, y)
+
+    def update(self, cells):
+        """Отмечает изменённые клетки (плоские индексы) для следующей отрисовки"""
+        self.pending.extend(cells)
+
+    def message(self, text):
+        """Сообщение игроку под полем (показывается при следующей отрисовке)"""
+        self.messages.append(text)
+
+    def finish(self):
+        """Показывает всё поле (конец партии) и оставляет курсор под ним"""
+        self.show_all = True
+        self.full = True
+        self.refresh()
+
+    def _char(self, i):
+        board = self.board
+        if self.show_all or board.revealed[i]:
+            x, y = board.coords(i)
+            return board.cell_char(x, y)
+        return '?' if board.flagged[i] else '-'
+
+    def _draw(self, parts):
+        """Всё окно: номера столбцов, затем строки с номерами"""
+        (left, top), (width, height) = self.origin, self.view
+        columns = range(left, left + width)
+        parts.append(f'{ESC}H{ESC}2J')
+        parts.append(' ' * (self.label + 1) + ''.join(str(x + 1).rjust(self.cell - 1) + ' ' for x in columns))
+        for y in range(top, top + height):
+            row = y * self.board.width
+            parts.append('\n' + str(y + 1).rjust(self.label) + ' '
+                         + ''.join(' ' * (self.cell - 2) + self._char(row + x) + ' ' for x in columns))
+
+    def _cells(self, parts):
+        """Только изменённые клетки окна: по переводу курсора на каждый кусок строки"""
+        (left, top), (width, height) = self.origin, self.view
+        rows = {}
+        for i in self.pending:
+            x, y = self.board.coords(i)
+            if left <= x < left + width and top <= y < top + height:
+                rows.setdefault(y, []).append(x)
+
+        gap = ' ' * (self.cell - 1)
+        for y in sorted(rows):
+            xs = sorted(set(rows[y]))
+            row = y * self.board.width
+            start = xs[0]
+            for end, after in zip(xs, xs[1:] + [None]):
+                if after is not None and after - end <= RUN_GAP:
+                    continue
+                # Символ клетки - в последней позиции её ширины перед пробелом
+                parts.append(f'{ESC}{y - top + 2};{self.label + (start - left + 1) * self.cell}H')
+                parts.append(gap.join(self._char(row + x) for x in range(start, end + 1)))
+                start = after
+
+    def refresh(self):
+        """Выводит изменения одним write и ставит курсор под поле для вопросов игры"""
+        if self._fit() or len(self.pending) >= self.view[0] * self.view[1]:
+            self.full = True  # Изменилось больше клеток, чем видно - дешевле нарисовать окно заново
+        parts = []
+        if self.full:
+            self._draw(parts)
+        else:
+            self._cells(parts)
+        self.full = False
+        self.pending = []
+
+        # Строка состояния и сообщения: сразу под полем, с очисткой прошлых вопросов
+        board = self.board
+        (left, top), (width, height) = self.origin, self.view
+        status = f"Мин: {board.mine_count}, флагов: {board.flags_placed}"
+        if (width, height) != (board.width, board.height):
+            status += (f"  Окно: строки {top + 1}-{top + height} из {board.height}, "
+                       f"столбцы {left + 1}-{left + width} из {board.width}")
+        parts.append(f'{ESC}{height + 2};1H{ESC}J{status}\n')
+        parts.extend(text + '\n' for text in self.messages)
+        self.messages = []
+
+        self.out.write(''.join(parts))
+        self.out.flush()
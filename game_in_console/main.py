@@ -1,51 +1,43 @@
-import random
+import os
+import sys
+import time
 
+# Общий движок лежит в корне репозитория
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from minesweeper_engine import Board, WON, LOST
+from minesweeper_engine.instrument import timed
+from minesweeper_engine.replay import ReplayWriter, default_path, REVEAL, FLAG, CHORD
+from minesweeper_engine.snapshot import save_snapshot, load_snapshot, default_path as snapshot_path
 
-def Generator_Map(mines, first_move):
-    """Метод создания карты"""
-    # Задаем размер игрового поля (классический сапёр - 9x9)
-    size = 9
-    map_dict = {}  # Используем словарь вместо списка
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from ansi import AnsiRenderer, supported
+
+# Размер поля по умолчанию (классический сапёр - 9x9)
+DEFAULT_SIZE = (9, 9)
 
-    mines_count = mines
-    mines = set()  # убрать дубликаты
 
-    # Генерация случайных мин, исключая первую клетку игрока
+@timed('console.Generator_Map')
+def Generator_Map(mines, first_move, width=DEFAULT_SIZE[0], height=DEFAULT_SIZE[1]):
+    """Метод создания карты"""
+    # Мины не ставятся только в первую клетку игрока, победа возможна и флагами
+    board = Board(width, height, mines, safe_radius=0, flag_win=True)
     first_x, first_y = first_move
-    while len(mines) < mines_count:
-        x, y = random.randint(0, size - 1), random.randint(0, size - 1)
-        if (x, y) != (first_x, first_y):  # Исключаем первую клетку игрока
-            mines.add((x, y))
-            map_dict[(x, y)] = 'M'  # Записываем мину в словарь
-
-    # Заполняем числами (количество мин вокруг) - список смещений для проверки 8 соседних клеток:
-    directions = [(-1, -1), (-1, 0), (-1, 1),  # Верхние соседи
-                  (0, -1), (0, 1),  # Боковые соседи
-                  (1, -1), (1, 0), (1, 1)]  # Нижние соседи
-
-    # Проходим по всем клеткам поля для заполнения чисел
-    for x in range(size):
-        for y in range(size):
-            if (x, y) not in map_dict:  # Если это не мина
-                count = 0
-                for dx, dy in directions:
-                    nx, ny = x + dx, y + dy
-                    if (nx, ny) in map_dict and map_dict[(nx, ny)] == 'M':
-                        count += 1
-                if count > 0:
-                    map_dict[(x, y)] = str(count)
-                else:
-                    map_dict[(x, y)] = ' '
-
-    # Преобразуем словарь обратно в список
-    map_mines = [[' '] + list(range(1, size + 1))]
-    for i in range(size):
-        row = [i + 1]
-        for j in range(size):
-            row.append(map_dict.get((i, j), ' '))
-        map_mines.append(row)
+    board.place_mines(first_y, first_x)  # x в консоли - номер строки
+    return board
 
-    return map_mines
+
+def build_map(board, show_all=False):
+    """Метод построения карты с заголовками строк и столбцов"""
+    map_cells = [[' '] + list(range(1, board.width + 1))]
+    for i in range(board.height):
+        row = [i + 1]
+        for j in range(board.width):
+            if show_all or board.is_revealed(j, i):
+                row.append(board.cell_char(j, i))
+            else:
+                row.append('-')
+        map_cells.append(row)
+    return map_cells
 
 
 def print_map(map, flags=None):
@@ -65,147 +57,215 @@ def print_map(map, flags=None):
         print(' '.join(printed_row))
 
 
-def get_bomb_count():
+def get_size():
+    """Метод запроса размера поля (Enter - классическое 9x9)"""
+    while True:
+        text = input(f"Введите размер поля ШxВ (Enter - {DEFAULT_SIZE[0]}x{DEFAULT_SIZE[1]}): ").strip().lower()
+        if not text:
+            return DEFAULT_SIZE
+        try:
+            width, _, height = text.partition('x')
+            width, height = int(width), int(height or width)
+        except ValueError:
+            print("Используйте формат 'ШxВ' (например, 30x16)")
+            continue
+        if width >= 1 and height >= 1 and width * height >= 2:
+            return width, height
+        print("На поле должно быть хотя бы две клетки!")
+
+
+def get_bomb_count(max_count=DEFAULT_SIZE[0] * DEFAULT_SIZE[1] - 1):
     """Метод запроса у пользователя количества мин"""
     while True:
-        count_of_bomb = int(input("Введите одно число - количество мин от 1-80 шт.\n"))
-        if count_of_bomb < 1 or count_of_bomb > 80:
+        count_of_bomb = int(input(f"Введите одно число - количество мин от 1-{max_count} шт.\n"))
+        if count_of_bomb < 1 or count_of_bomb > max_count:
             continue
         return count_of_bomb
         break
 
 
-def get_action():
-    """Метод запроса действия: открыть или пометить"""
+def get_action(scroll=False):
+    """Метод запроса действия: открыть, пометить, открыть соседей цифры, сдвинуть окно поля или сохранить игру"""
+    actions = ('d', 'f', 'c', 'v', 's') if scroll else ('d', 'f', 'c', 's')
     while True:
-        action = input("Выберите действие (d - открыть, f - пометить флагом): ").lower()
-        if action in ('d', 'f'):
+        action = input("Выберите действие (d - открыть, f - пометить флагом, c - открыть соседей открытой цифры, "
+                       + ("v - показать поле вокруг клетки, " if scroll else "") + "s - сохранить и выйти): ").lower()
+        if action in actions:
             return action
-        print("Используйте 'd' или 'f'!")
+        print("Используйте " + ", ".join(f"'{a}'" for a in actions[:-1]) + f" или '{actions[-1]}'!")
+
 
+def load_saved_game(path):
+    """Предлагает продолжить сохранённую игру (сохранение одноразовое и после загрузки удаляется)"""
+    if not os.path.exists(path):
+        return None, 0.0
+    answer = input("Есть сохранённая игра. Продолжить? (y/n): ").strip().lower()
+    if answer != 'y':
+        return None, 0.0
+    board, elapsed, _ = load_snapshot(path, storage='dense')
+    os.remove(path)
+    return board, elapsed
 
-def get_coordinates():
-    """Получение координат с проверкой"""
+
+def get_coordinates(width=DEFAULT_SIZE[0], height=DEFAULT_SIZE[1]):
+    """Получение координат с проверкой (сначала номер строки, затем столбца)"""
     MIN = 1
-    MAX = 9
     while True:
         try:
             coords = input("Введите координаты (формат Y-X): ").strip().split('-')
             if len(coords) != 2:
                 raise ValueError("Неправильный формат ввода")
             x, y = map(int, coords)
-            if not (MIN <= x <= MAX) or not (MIN <= y <= MAX):
-                print(f"Координаты должны быть от {MIN} до {MAX}!")
+            if not (MIN <= x <= height) or not (MIN <= y <= width):
+                print(f"Строка должна быть от {MIN} до {height}, столбец - от {MIN} до {width}!")
                 continue
-            return x - 1, y - 1  # Переводим в индексы массива (0-8)
+            return x - 1, y - 1  # Переводим в индексы массива (с нуля)
 
         except ValueError as e:
             print("Ошибка! Используйте формат 'Y-X' (например, 3-5)")
 
 
-def reveal_cells(map, player_map, display_map, x, y, size):
-    """Рекурсивно открывает все соседние пустые клетки"""
-    # Проверяем, что координаты в пределах поля и клетка еще не открыта
-    if not (0 <= x < size and 0 <= y < size) or player_map[x][y] != '-':
-        return
-
-    # Открываем текущую клетку
-    player_map[x][y] = map[x + 1][y + 1]  # +1 из-за заголовков в map
-    display_map[x + 1][y + 1] = player_map[x][y]  # Обновляем отображаемую карту
-
-    # Если клетка пустая (не число и не мина), открываем соседей
-    if player_map[x][y] == ' ':
-        directions = [(-1, -1), (-1, 0), (-1, 1),
-                      (0, -1), (0, 1),
-                      (1, -1), (1, 0), (1, 1)]
-
-        for dx, dy in directions:
-            reveal_cells(map, player_map, display_map, x + dx, y + dy, size)
+def show_result(screen, board, text):
+    """Сообщение о конце партии и всё поле"""
+    if screen is None:
+        print("\n" + text)
+        print("Игровое поле:")
+        print_map(build_map(board, show_all=True))
+    else:
+        screen.message(text)
+        screen.finish()
 
 
 def main():
     dictionary_for_x_y = {'y': [], 'x': []}
-    bomb_count = get_bomb_count()
+    snapshot = snapshot_path('console')
+    board, elapsed = load_saved_game(snapshot)
+    started = time.monotonic() - elapsed  # Время партии (сохраняется вместе с ней)
 
-    # Получаем первый ход до генерации карты
-    print("Сделайте первый ход:")
-    first_x, first_y = get_coordinates()
+    if board is None:
+        width, height = get_size()
+        bomb_count = get_bomb_count(width * height - 1)
 
-    # Генерируем карту с минами, исключая первую клетку игрока
-    hidden_map = Generator_Map(bomb_count, (first_x, first_y))
+        # Получаем первый ход до генерации карты
+        print("Сделайте первый ход:")
+        first_x, first_y = get_coordinates(width, height)
 
-    player_map = [['-' for _ in range(9)] for _ in range(9)]
-    flags = set()
-    correct_flags = set()
-
-    # Добавляем номера строк и столбцов для отображения
-    display_map = []
-    display_map.append([' '] + list(range(1, 10)))
-    for i in range(9):
-        display_map.append([i + 1] + player_map[i])
+        # Генерируем карту с минами, исключая первую клетку игрока
+        board = Generator_Map(bomb_count, (first_x, first_y), width, height)
+        flags = set()
 
-    # Обрабатываем первый ход
-    reveal_cells(hidden_map, player_map, display_map, first_x, first_y, 9)
-    dictionary_for_x_y['y'].append(first_x + 1)
-    dictionary_for_x_y['x'].append(first_y + 1)
-    print(first_x + 1, first_y + 1, dictionary_for_x_y)
+        # Партия записывается в файл повтора по ходу игры (прерванную запись повтор тоже читает)
+        replay = ReplayWriter(default_path(), board)
+
+        # Обрабатываем первый ход
+        board.reveal(first_y, first_x)
+        replay.record(REVEAL, first_y, first_x)
+        dictionary_for_x_y['y'].append(first_x + 1)
+        dictionary_for_x_y['x'].append(first_y + 1)
+        print(first_x + 1, first_y + 1, dictionary_for_x_y)
+        focus = (first_y, first_x)  # Окно большого поля начинается у первого хода
+    else:
+        # Флаги консоли хранятся как (строка, столбец), а движок хранит (x, y)
+        flags = set()
+        for i in range(board.width * board.height):
+            if board.flagged[i]:
+                x, y = board.coords(i)
+                flags.add((y, x))
+        replay = ReplayWriter(default_path(), board)
+        focus = (0, 0)
+
+    # В терминале поле рисуется один раз и дальше обновляется по изменённым клеткам,
+    # а в файл или канал (и в терминал без ANSI) печатается целиком после каждого хода
+    screen = AnsiRenderer(board) if supported() else None
+    say = print if screen is None else screen.message
+    if screen is not None:
+        screen.follow(*focus)
 
     while True:
-        print("\nТекущая карта:")
-        print_map(display_map, flags)
-        action = get_action()
-        x, y = get_coordinates()
+        if screen is None:
+            print("\nТекущая карта:")
+            print_map(build_map(board), flags)
+        else:
+            screen.refresh()
+        action = get_action(scroll=screen is not None)
+        if action == 's':
+            save_snapshot(snapshot, board, time.monotonic() - started)
+            print(f"Игра сохранена в {snapshot}")
+            break
+        x, y = get_coordinates(board.width, board.height)
+
+        if screen is not None:
+            if action == 'v':  # Только сдвиг окна по большому полю
+                screen.center(y, x)
+                continue
+            screen.follow(y, x)
+
+        if action == 'c':  # Аккорд: все соседи цифры, вокруг которой стоят все флаги, открываются разом
+            opened = board.chord(y, x)
+            if not opened:
+                say("Нужна открытая цифра, вокруг которой стоит столько же флагов!")
+                continue
+            replay.record(CHORD, y, x)
+            if board.status == LOST:
+                show_result(screen, board, "BOOM! Один из флагов стоял неверно")
+                break
+            if board.status == WON:
+                show_result(screen, board, "Поздравляем! Вы открыли все безопасные клетки")
+                break
+            if screen is not None:
+                screen.update(opened)
+            continue
 
         # Проверка на уже открытую клетку
-        if player_map[x][y] != '-':
-            print("Эта клетка уже открыта!")
+        if board.is_revealed(y, x):
+            say("Эта клетка уже открыта!")
             continue
 
         if action == 'f':  # Пометить флагом
+            board.toggle_flag(y, x)
+            replay.record(FLAG, y, x)
             if (x, y) in flags:
                 flags.remove((x, y))
-                if hidden_map[x + 1][y + 1] == 'M':
-                    correct_flags.remove((x, y))
             else:
                 flags.add((x, y))
-                if hidden_map[x + 1][y + 1] == 'M':
-                    correct_flags.add((x, y))
 
             # Проверка победы по флагам
-            if len(correct_flags) == bomb_count and len(flags) == bomb_count:
-                print("\nПоздравляем! Вы правильно отметили все мины")
-                print("Игровое поле:")
-                print_map(hidden_map)
+            if board.status == WON:
+                show_result(screen, board, "Поздравляем! Вы правильно отметили все мины")
                 break
+            if screen is not None:
+                screen.update([x * board.width + y])
             continue
 
         # Действие: открыть клетку
         if (x, y) in flags:
-            print("Сначала уберите флаг с этой клетки!")
+            say("Сначала уберите флаг с этой клетки!")
             continue
 
-        # Проверка на мину ДО открытия
-        if hidden_map[x + 1][y + 1] == 'M':
-            print("\nBOOM! Вы наступили на мину")
-            print("Игровое поле:")
-            print_map(hidden_map)
-            break
-
         # Открываем клетку и соседей (если пустая)
-        reveal_cells(hidden_map, player_map, display_map, x, y, 9)
+        opened = board.reveal(y, x)
+        replay.record(REVEAL, y, x)
+
+        if board.status == LOST:
+            show_result(screen, board, "BOOM! Вы наступили на мину")
+            break
 
-        # Добавляем в историю
+        # Добавляем в историю (в терминале с ANSI она не печатается - поле не сдвигается)
         dictionary_for_x_y['y'].append(x + 1)
         dictionary_for_x_y['x'].append(y + 1)
-        print(x + 1, y + 1, dictionary_for_x_y)
+        if screen is None:
+            print(x + 1, y + 1, dictionary_for_x_y)
+        else:
+            screen.update(opened)
 
         # Проверка победы по открытым клеткам
-        if all(player_map[i][j] != '-' or hidden_map[i + 1][j + 1] == 'M'
-               for i in range(9) for j in range(9)):
-            print("\nПоздравляем! Вы открыли все безопасные клетки")
-            print("Игровое поле:")
-            print_map(hidden_map)
+        if board.status == WON:
+            show_result(screen, board, "Поздравляем! Вы открыли все безопасные клетки")
             break
 
+    replay.close()
+    print(f"Повтор партии сохранён в {replay.path}")
+
 
-main()
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,18 @@
-import random
+import os
+import sys
 import tkinter as tk
 from tkinter import messagebox, simpledialog
 from time import time
 
+# Общий движок лежит в корне репозитория
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from minesweeper_engine import Board, READY, PLAYING, WON, LOST
+from minesweeper_engine.history import History
+from minesweeper_engine.instrument import timed
+from minesweeper_engine.pool import BoardPool
+from minesweeper_engine.replay import ReplayWriter, default_path, REVEAL, FLAG, CHORD
+from minesweeper_engine.snapshot import save_snapshot, load_snapshot, default_path as snapshot_path
+
 
 class MinesweeperGUI:
     def __init__(self, root):
@@ -11,16 +21,21 @@ class MinesweeperGUI:
 
         # Настройки игры
         self.grid_size = 9
-        self.max_bombs = 80
+        self.max_bombs = self.grid_size * self.grid_size - 9  # Поле минус безопасная зона 3x3
         self.min_bombs = 1
         self.default_bombs = 10
         self.bomb_count = self.default_bombs
+        self.no_guess = tk.BooleanVar(value=False)  # Поле, которое проходится без угадываний
 
         # Состояние игры
-        self.flags = set()
-        self.correct_flags = set()
-        self.first_click = True
+        self.board = None
+        self.pool = None  # Запас готовых полей (пополняется в фоне, пока игрок играет)
+        self.replay = None  # Запись партии в файл повтора
+        self.history = None  # Журнал ходов для отмены и повтора
+        self.finished = False  # Партия закончилась (кнопки отключены)
+        self.end_time = 0  # Когда партия закончилась (таймер продолжается после отмены проигрыша)
         self.game_started = False
+        self.root.title("Сапёр")
         self.start_time = 0
 
         # Элементы интерфейса (таймер)
@@ -39,10 +54,21 @@ class MinesweeperGUI:
         game_menu = tk.Menu(menubar, tearoff=0)
         game_menu.add_command(label="Новая игра", command=self.start_new_game)
         game_menu.add_command(label="Настройки", command=self.change_settings)
+        game_menu.add_command(label="Сохранить", command=self.save_game)
+        game_menu.add_command(label="Загрузить", command=self.load_game)
+        game_menu.add_checkbutton(label="Без угадываний", variable=self.no_guess, command=self.start_new_game)
         game_menu.add_separator()
         game_menu.add_command(label="Выход", command=self.root.quit)
         menubar.add_cascade(label="Игра", menu=game_menu)
 
+        move_menu = tk.Menu(menubar, tearoff=0)
+        move_menu.add_command(label="Отменить ход", accelerator="Ctrl+Z", command=self.undo_move)
+        move_menu.add_command(label="Повторить ход", accelerator="Ctrl+Y", command=self.redo_move)
+        move_menu.add_command(label="Отменить все ходы", command=self.undo_all)
+        menubar.add_cascade(label="Ход", menu=move_menu)
+        self.root.bind('<Control-z>', lambda event: self.undo_move())
+        self.root.bind('<Control-y>', lambda event: self.redo_move())
+
         self.root.config(menu=menubar)
 
     def create_game_interface(self):
@@ -58,56 +84,50 @@ class MinesweeperGUI:
         # Создаем кнопки для клеток
         self.create_buttons()
 
-    def init_game(self):
-        """Инициализирует новую игру"""
-        self.game_started = False
-        self.first_click = True
-        self.flags = set()
-        self.correct_flags = set()
+    def init_game(self, board=None):
+        """
+        Инициализирует новую игру
 
-        # Инициализация карт
-        self.hidden_map = [[' ' for _ in range(self.grid_size)] for _ in range(self.grid_size)]
-        self.mines = set()
-        self.player_map = [['-' for _ in range(self.grid_size)] for _ in range(self.grid_size)]
+        Args:
+            board: Поле загруженной партии (по умолчанию - новое поле)
+        """
+        self.game_started = False
+        self.finished = False
+
+        # Поле создаётся заново, мины расставляются при первом клике
+        if board is None:
+            board = Board(self.grid_size, self.grid_size, self.bomb_count, flag_win=True)
+        self.board = board
+        self.history = History(self.board)
+
+        # Каждая партия пишется в свой файл повтора (недоигранная запись тоже читается)
+        if self.replay is not None:
+            self.replay.close()
+        self.replay = ReplayWriter(default_path(), self.board)
+
+        # Запас полей пересоздаётся только при смене настроек
+        no_guess = self.no_guess.get()
+        pool = self.pool
+        if pool is None or (pool.mine_count, pool.no_guess) != (self.bomb_count, no_guess):
+            if pool is not None:
+                pool.close()
+            self.pool = BoardPool(self.grid_size, self.grid_size, self.bomb_count, no_guess=no_guess)
 
         # Обновляем интерфейс
         self.update_timer()
         self.update_buttons()
 
-    def count_adjacent_mines(self, row, col):
-        """Считает количество мин вокруг указанной клетки"""
-        count = 0
-        for r in range(row - 1, row + 2):
-            for c in range(col - 1, col + 2):
-                if (0 <= r < self.grid_size and 0 <= c < self.grid_size and
-                        self.hidden_map[r][c] == 'M'):
-                    count += 1
-        return count
-
+    @timed('gui.place_mines')
     def place_mines(self, first_row, first_col):
-        """Размещает мины на поле, избегая первой клетки и соседей"""
-        # Определяем безопасную зону вокруг первого клика
-        safe_zone = set()
-        for r in range(first_row - 1, first_row + 2):
-            for c in range(first_col - 1, first_col + 2):
-                if 0 <= r < self.grid_size and 0 <= c < self.grid_size:
-                    safe_zone.add((r, c))
-
-        # Размещаем мины
-        self.mines = set()
-        while len(self.mines) < self.bomb_count:
-            r, c = random.randint(0, self.grid_size - 1), random.randint(0, self.grid_size - 1)
-            if (r, c) not in safe_zone:
-                self.mines.add((r, c))
-                self.hidden_map[r][c] = 'M'
-
-        # Заполняем числами (количество мин вокруг)
-        for r in range(self.grid_size):
-            for c in range(self.grid_size):
-                if self.hidden_map[r][c] != 'M':
-                    count = self.count_adjacent_mines(r, c)
-                    if count > 0:
-                        self.hidden_map[r][c] = str(count)
+        """Размещает мины на поле, избегая первой клетки и соседей (готовое поле берётся из запаса)"""
+        result = self.pool.place(self.board, first_col, first_row)
+
+        # Для полей без угадываний показываем, во что обошёлся их поиск
+        if result['failed']:
+            self.root.title("Сапёр - обычное поле")
+            messagebox.showwarning("Без угадываний", f"{result['failed']}. Мины расставлены обычным способом.")
+        elif self.no_guess.get():
+            self.root.title(f"Сапёр - без угадываний ({result['attempts']} попыток, {result['elapsed']:.2f} сек)")
 
     def create_buttons(self):
         """Создает кнопки игрового поля"""
@@ -126,14 +146,15 @@ class MinesweeperGUI:
                     command=lambda r=row, c=col: self.on_left_click(r, c)
                 )
                 btn.bind('<Button-3>', lambda event, r=row, c=col: self.on_right_click(r, c))
+                btn.bind('<Button-2>', lambda event, r=row, c=col: self.on_middle_click(r, c))
                 btn.grid(row=row + 1, column=col, sticky='nsew')  # +1 чтобы пропустить строку с таймером
                 button_row.append(btn)
             self.buttons.append(button_row)
 
-    def start_game_timer(self):
-        """Запускает таймер игры"""
+    def start_game_timer(self, elapsed=0):
+        """Запускает таймер игры (elapsed - сколько секунд уже прошло в загруженной партии)"""
         self.game_started = True
-        self.start_time = time()
+        self.start_time = time() - elapsed
         self.update_timer()
 
     def update_timer(self):
@@ -147,95 +168,145 @@ class MinesweeperGUI:
 
     def on_left_click(self, row, col):
         """Обрабатывает левый клик мыши (открытие клетки)"""
-        if (row, col) in self.flags:  # Не открываем помеченные флажками клетки
+        if self.board.is_flagged(col, row):  # Не открываем помеченные флажками клетки
             return
 
-        if self.first_click:
+        if self.board.status == READY:
             self.place_mines(row, col)
             self.start_game_timer()
-            self.first_click = False
 
-        if self.hidden_map[row][col] == 'M':
+        opened = self.history.reveal(col, row)
+        if not opened:  # Клетка уже открыта - ход не записываем, как и в консоли
+            return
+        self.replay.record(REVEAL, col, row)
+        if self.board.status == LOST:
             self.game_over(False)
             return
 
-        self.reveal_cells(row, col)
-        self.update_buttons()
+        # Перерисовываем только открывшиеся клетки
+        self.update_cells(opened)
 
         if self.check_win():
             self.game_over(True)
 
     def on_right_click(self, row, col):
         """Обрабатывает правый клик мыши (установка/снятие флага)"""
-        if self.player_map[row][col] != '-':  # Не ставим флаги на открытые клетки
+        if not self.history.toggle_flag(col, row):  # Не ставим флаги на открытые клетки
             return
+        self.replay.record(FLAG, col, row)
 
-        if (row, col) in self.flags:
-            self.flags.remove((row, col))
-            if (row, col) in self.correct_flags:
-                self.correct_flags.remove((row, col))
-        else:
-            self.flags.add((row, col))
-            if self.hidden_map[row][col] == 'M':
-                self.correct_flags.add((row, col))
-
-        self.update_buttons()
+        self.update_button(row, col)
 
         # Проверяем победу (все мины правильно помечены)
-        if (len(self.correct_flags) == self.bomb_count and
-                len(self.flags) == self.bomb_count):
+        if self.board.status == WON:
             self.game_over(True)
 
-    def reveal_cells(self, row, col):
-        """Рекурсивно открывает клетки"""
-        if not (0 <= row < self.grid_size and 0 <= col < self.grid_size) or self.player_map[row][col] != '-':
+    def on_middle_click(self, row, col):
+        """Обрабатывает средний клик мыши (аккорд: открытие соседей цифры, вокруг которой стоят все флаги)"""
+        opened = self.history.chord(col, row)
+        if not opened:
+            return
+        self.replay.record(CHORD, col, row)
+
+        # Все каскады аккорда открыты одним проходом - перерисовываем их один раз
+        # (и при проигрыше: клетки до мины уже открыты)
+        self.update_cells(opened)
+        if self.board.status == LOST:
+            self.game_over(False)
             return
 
-        self.player_map[row][col] = self.hidden_map[row][col]
+        if self.check_win():
+            self.game_over(True)
 
-        # Если клетка пустая, открываем соседей
-        if self.hidden_map[row][col] == ' ':
-            for r in range(row - 1, row + 2):
-                for c in range(col - 1, col + 2):
-                    if r != row or c != col:  # Не проверяем саму клетку
-                        self.reveal_cells(r, c)
+    def undo_move(self):
+        """Отменяет последний ход (после проигрыша - продолжает партию с позиции перед ошибкой)"""
+        position = self.history.position
+        self.apply_history(self.history.undo(), position)
+
+    def redo_move(self):
+        """Повторяет отменённый ход"""
+        position = self.history.position
+        self.apply_history(self.history.redo(), position)
+
+    def undo_all(self):
+        """Отменяет все ходы после первого"""
+        position = self.history.position
+        self.apply_history(self.history.goto(0), position)
+
+    def apply_history(self, cells, position):
+        """
+        Показывает результат отмены или повтора ходов
+
+        Args:
+            cells: Изменённые клетки или None, если перерисовать нужно всё поле
+            position: Позиция журнала до отмены или повтора
+        """
+        if cells is not None and not len(cells):
+            return
+        if self.finished and self.board.status == PLAYING:
+            # Отменён последний ход закончившейся партии - она продолжается, запись идёт в новый файл
+            self.finished = False
+            for row in self.buttons:
+                for btn in row:
+                    btn.config(state='normal')
+            self.start_game_timer(self.end_time - self.start_time)
+            self.replay = ReplayWriter(default_path(), self.board)
+            cells = None  # Показанные при проигрыше мины нужно скрыть
+        else:
+            self.replay.step(self.history.position - position)  # Короткая запись перехода, а не всё поле
+
+        if cells is None:
+            self.update_buttons()
+        else:
+            self.update_cells(cells)
+        if self.board.status in (WON, LOST):
+            self.game_over(self.board.status == WON)
 
     def update_buttons(self):
         """Обновляет внешний вид кнопок в соответствии с состоянием игры"""
         for row in range(self.grid_size):
             for col in range(self.grid_size):
-                if (row, col) in self.flags:
-                    self.buttons[row][col].config(text='🚩', fg='red', bg='SystemButtonFace')
-                elif self.player_map[row][col] == '-':
-                    self.buttons[row][col].config(text=' ', bg='SystemButtonFace')
-                else:
-                    cell = self.player_map[row][col]
-                    self.buttons[row][col].config(text=cell, bg='light gray')
-
-                    # Разные цвета для цифр
-                    if cell.isdigit():
-                        num = int(cell)
-                        colors = ['', 'blue', 'green', 'red', 'dark blue',
-                                  'brown', 'teal', 'black', 'gray']
-                        self.buttons[row][col].config(fg=colors[num])
+                self.update_button(row, col)
+
+    def update_cells(self, cells):
+        """Обновляет только перечисленные клетки (плоские индексы движка)"""
+        for i in cells:
+            col, row = self.board.coords(i)
+            self.update_button(row, col)
+
+    def update_button(self, row, col):
+        """Обновляет внешний вид одной кнопки"""
+        if self.board.is_flagged(col, row):
+            self.buttons[row][col].config(text='🚩', fg='red', bg='SystemButtonFace')
+        elif not self.board.is_revealed(col, row):
+            self.buttons[row][col].config(text=' ', bg='SystemButtonFace')
+        else:
+            cell = self.board.cell_char(col, row)
+            self.buttons[row][col].config(text=cell, bg='light gray')
+
+            # Разные цвета для цифр
+            if cell.isdigit():
+                num = int(cell)
+                colors = ['', 'blue', 'green', 'red', 'dark blue',
+                          'brown', 'teal', 'black', 'gray']
+                self.buttons[row][col].config(fg=colors[num])
 
     def check_win(self):
         """Проверяет условия победы"""
         # Все безопасные клетки должны быть открыты
-        for row in range(self.grid_size):
-            for col in range(self.grid_size):
-                if self.hidden_map[row][col] != 'M' and self.player_map[row][col] == '-':
-                    return False
-        return True
+        return self.board.check_win()
 
     def game_over(self, won):
         """Обрабатывает завершение игры"""
         self.game_started = False
+        self.finished = True
+        self.end_time = time()
+        self.replay.close()
 
         # Показываем все мины
         for row in range(self.grid_size):
             for col in range(self.grid_size):
-                if self.hidden_map[row][col] == 'M':
+                if self.board.is_mine(col, row):
                     self.buttons[row][col].config(
                         text='💣',
                         bg='light green' if won else 'orange'
@@ -253,6 +324,33 @@ class MinesweeperGUI:
         else:
             messagebox.showinfo("Поражение", "Вы наступили на мину!")
 
+    def save_game(self):
+        """Сохраняет партию (поле, время и настройки) в файл"""
+        elapsed = time() - self.start_time if self.game_started else 0.0
+        path = snapshot_path('gui')
+        save_snapshot(path, self.board, elapsed, {'no_guess': self.no_guess.get()})
+        messagebox.showinfo("Сохранение", f"Игра сохранена в {path}")
+
+    def load_game(self):
+        """Загружает сохранённую партию"""
+        path = snapshot_path('gui')
+        if not os.path.exists(path):
+            messagebox.showinfo("Загрузка", "Сохранённой игры нет")
+            return
+        board, elapsed, settings = load_snapshot(path, storage='dense')
+        if (board.width, board.height) != (self.grid_size, self.grid_size):
+            messagebox.showerror("Загрузка", f"Сохранена игра на поле {board.width}x{board.height}")
+            return
+
+        self.bomb_count = board.mine_count
+        self.no_guess.set(settings.get('no_guess', False))
+        for row in self.buttons:
+            for btn in row:
+                btn.config(state='normal')
+        self.init_game(board)
+        if board.status == PLAYING:
+            self.start_game_timer(elapsed)
+
     def start_new_game(self):
         """Начинает новую игру"""
         self.init_game()
@@ -0,0 +1,150 @@
+"""
+Нагрузочный клиент для сервера сапёра: пропускная способность и задержки
+
+Пример: python game_server/loadgen.py --clients 200 --games 20 --size 16x16 --mines 40
+        python game_server/loadgen.py --local --clients 1000 --games 5
+
+Каждый клиент - отдельное соединение, которое играет партии: открывает
+случайные закрытые клетки (или клетки из подсказок сервера с --hints), пока
+партия не закончится. С --interleave клиент ведёт несколько партий сразу и
+ходит в них по очереди - так число открытых партий растёт, и сервер начинает
+выгружать их на диск. Задержка каждого запроса меряется от отправки до
+получения ответа. С --local сервер запускается в том же процессе.
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from server import GameServer, MAX_CELLS
+from store import MEMORY_BUDGET
+
+# Предел длины строки ответа: вскрытие всего поля - до ~12 символов на клетку
+RESPONSE_LIMIT = MAX_CELLS * 12
+
+
+async def request(reader, writer, line, latencies):
+    """Отправляет команду и ждёт ответ, записывая задержку в секундах"""
+    started = time.perf_counter()
+    writer.write(line.encode() + b'\n')
+    response = (await reader.readline()).decode().split()
+    latencies.append(time.perf_counter() - started)
+    if not response or response[0] != 'OK':
+        raise RuntimeError(f"{line}: {' '.join(response)}")
+    return response[1:]
+
+
+async def client(host, port, games, interleave, width, height, mines, hints, rng, latencies, results):
+    """Одно соединение, играющее games партий, из которых interleave идут одновременно (ходы по очереди)"""
+    reader, writer = await asyncio.open_connection(host, port, limit=RESPONSE_LIMIT)
+    started = 0
+    active = []  # [номер партии, закрытые клетки, состояние]
+    try:
+        while active or started < games:
+            while len(active) < interleave and started < games:
+                sid = (await request(reader, writer, f'NEW {width} {height} {mines} {rng.getrandbits(63)}',
+                                     latencies))[0]
+                active.append([sid, set(range(width * height)), 'ready'])
+                started += 1
+
+            for game in list(active):
+                sid, closed, status = game
+                cell = None
+                if hints and status == 'playing':
+                    hint = await request(reader, writer, f'HINT {sid}', latencies)
+                    if hint[0] != '-':
+                        cell = int(hint[1]) * width + int(hint[0])
+                if cell is None:
+                    cell = rng.choice(tuple(closed))
+                response = await request(reader, writer, f'REVEAL {sid} {cell % width} {cell // width}', latencies)
+                game[2] = status = response[0]
+                for item in response[2:]:
+                    closed.discard(int(item.partition(':')[0]))
+                if status not in ('ready', 'playing'):
+                    results[status] = results.get(status, 0) + 1
+                    await request(reader, writer, f'CLOSE {sid}', latencies)
+                    active.remove(game)
+    finally:
+        writer.close()
+        await writer.wait_closed()
+
+
+async def server_stats(host, port):
+    """Метрики хранилища партий сервера (команда STATS)"""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        return ' '.join(await request(reader, writer, 'STATS', []))
+    finally:
+        writer.close()
+        await writer.wait_closed()
+
+
+def percentile(values, fraction):
+    """Значение, которое не превышает доля fraction отсортированных values"""
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+async def run(args):
+    server = None
+    host, port = args.host, args.port
+    if args.local:
+        game_server = GameServer(args.workers, args.memory * 2**20)
+        server = await asyncio.start_server(game_server.handle, '127.0.0.1', 0)
+        host, port = server.sockets[0].getsockname()[:2]
+
+    width, height = args.size
+    rng = random.Random(args.seed)
+    latencies = []
+    results = {}
+    started = time.perf_counter()
+    await asyncio.gather(*(client(host, port, args.games, args.interleave, width, height, args.mines, args.hints,
+                                  random.Random(rng.getrandbits(63)), latencies, results)
+                           for _ in range(args.clients)))
+    elapsed = time.perf_counter() - started
+    stats = await server_stats(host, port)
+
+    if server is not None:
+        server.close()
+        await server.wait_closed()
+        await game_server.sessions.close()
+
+    latencies.sort()
+    games = sum(results.values())
+    print(f"{args.clients} clients, {games} games ({results.get('won', 0)} won) in {elapsed:.2f}s")
+    print(f"{len(latencies)} requests, {len(latencies) / elapsed:.0f} req/s")
+    print(f"latency p50 {percentile(latencies, 0.5) * 1000:.3f} ms, p99 {percentile(latencies, 0.99) * 1000:.3f} ms, "
+          f"mean {statistics.fmean(latencies) * 1000:.3f} ms")
+    print(f"server: {stats}")
+
+
+def parse_size(text):
+    """'16x30' -> (16, 30)"""
+    width, _, height = text.lower().partition('x')
+    return int(width), int(height or width)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Нагрузочный клиент для сервера сапёра")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--local', action='store_true', help="Запустить сервер в этом же процессе")
+    parser.add_argument('--workers', type=int, help="Потоков сервера для тяжёлых команд (с --local)")
+    parser.add_argument('--clients', type=int, default=100, help="Одновременных соединений")
+    parser.add_argument('--memory', type=int, default=MEMORY_BUDGET // 2**20,
+                        help="Бюджет памяти сервера для партий в МБ (с --local)")
+    parser.add_argument('--games', type=int, default=10, help="Партий на соединение")
+    parser.add_argument('--interleave', type=int, default=1,
+                        help="Сколько партий соединение ведёт одновременно (открытых партий - clients * interleave)")
+    parser.add_argument('--size', type=parse_size, default=(9, 9), help="Размер поля ШxВ")
+    parser.add_argument('--mines', type=int, default=10, help="Количество мин")
+    parser.add_argument('--hints', action='store_true', help="Ходить по подсказкам сервера, где они есть")
+    parser.add_argument('--seed', type=int, help="Зерно для воспроизводимой нагрузки")
+    asyncio.run(run(parser.parse_args(argv)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,182 @@
+"""
+Сервер сапёра: много независимых партий в одном процессе (asyncio, TCP)
+
+Пример: python game_server/server.py --port 8765
+
+Протокол строковый: клиент шлёт команду в одну строку, сервер отвечает одной
+строкой, начинающейся с OK или ERR. Координаты - как в движке (x - столбец).
+
+    NEW ширина высота мины [зерно]  -> OK id
+    REVEAL id x y                   -> OK состояние открыто индекс:значение ...
+    CHORD id x y                    -> то же, что REVEAL
+    FLAG id x y                     -> OK состояние 0|1 (есть ли теперь флаг)
+    HINT id                         -> OK x y (или OK -, если безопасных клеток не найдено)
+    STATE id                        -> OK состояние ширина высота мины закрыто_безопасных флагов
+    CLOSE id                        -> OK
+    STATS                           -> OK имя=значение ... (метрики хранилища партий)
+
+Значение открытой клетки - число мин вокруг или M для мины (показ мин при
+проигрыше). Партии, созданные соединением, удаляются при его закрытии.
+Партии держатся в памяти в пределах бюджета (--memory), давно не
+использованные выгружаются на диск и загружаются при следующей команде.
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from store import Session, SessionStore, MEMORY_BUDGET
+from minesweeper_engine import Board
+
+# Поля больше этого (в клетках) обрабатываются в пуле потоков: большое вскрытие не задерживает другие партии
+INLINE_CELLS = 64 * 64
+# Ограничения на партии
+MAX_SESSIONS = 1000000
+MAX_CELLS = 4000 * 4000
+# Зерно записывается в выгруженную партию как 64-битное целое со знаком
+SEED_LIMIT = 2 ** 63
+
+
+class GameServer:
+    def __init__(self, workers=None, memory=MEMORY_BUDGET, spill_dir=None):
+        """
+        Состояние сервера: хранилище партий и пул потоков для тяжёлых команд
+
+        Args:
+            workers: Количество потоков для тяжёлых команд (по умолчанию - по числу ядер)
+            memory: Бюджет памяти для партий в байтах
+            spill_dir: Папка для выгруженных партий (по умолчанию - временная)
+        """
+        self.executor = ThreadPoolExecutor(max_workers=workers or os.cpu_count())
+        self.sessions = SessionStore(memory, spill_dir, self.executor)
+        self.ids = itertools.count(1)
+        self.commands = {
+            'NEW': self.new,
+            'REVEAL': self.reveal,
+            'CHORD': self.chord,
+            'FLAG': self.flag,
+            'HINT': self.hint,
+            'STATE': self.state,
+            'CLOSE': self.close,
+            'STATS': self.stats,
+        }
+
+    async def handle(self, reader, writer):
+        """Обслуживает одно соединение: читает команды построчно и отвечает на каждую"""
+        owned = set()  # Партии соединения (удаляются при отключении)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                parts = line.decode().split()
+                if not parts:
+                    continue
+                command = self.commands.get(parts[0].upper())
+                try:
+                    if command is None:
+                        raise ValueError(f"unknown command {parts[0]}")
+                    result = await command(parts[1:], owned)
+                    response = f'OK {result}' if result else 'OK'
+                except (ValueError, IndexError) as e:
+                    response = f'ERR {e}'
+                writer.write(response.encode() + b'\n')
+                await writer.drain()
+        except (ConnectionError, ValueError):  # Обрыв соединения или слишком длинная строка команды
+            pass
+        finally:
+            for sid in owned:
+                await self.sessions.remove(sid)
+            writer.close()
+
+    async def run(self, session, method, *args):
+        """Выполняет команду партии: маленькие поля - сразу, большие - в пуле потоков"""
+        async with session.lock:
+            if session.cells > INLINE_CELLS:
+                return await asyncio.get_running_loop().run_in_executor(self.executor, method, *args)
+            return method(*args)
+
+    async def session(self, args, owned):
+        sid = int(args[0])
+        if sid not in owned:
+            raise ValueError(f"no session {sid}")
+        return await self.sessions.get(sid)
+
+    async def new(self, args, owned):
+        width, height, mines = map(int, args[:3])
+        seed = int(args[3]) if len(args) > 3 else None
+        if seed is not None and not -SEED_LIMIT <= seed < SEED_LIMIT:
+            raise ValueError("seed must fit in 64 bits")  # Иначе партию не записать на диск
+        if width * height > MAX_CELLS:
+            raise ValueError(f"board larger than {MAX_CELLS} cells")
+        if len(self.sessions) >= MAX_SESSIONS:
+            raise ValueError("too many sessions")
+        sid = next(self.ids)
+        self.sessions.add(sid, Session(Board(width, height, mines, seed=seed, storage='packed')))
+        owned.add(sid)
+        return str(sid)
+
+    async def reveal(self, args, owned, chord=False):
+        session = await self.session(args, owned)
+        return await self.run(session, session.reveal, int(args[1]), int(args[2]), chord)
+
+    async def chord(self, args, owned):
+        return await self.reveal(args, owned, chord=True)
+
+    async def flag(self, args, owned):
+        session = await self.session(args, owned)
+        return await self.run(session, session.flag, int(args[1]), int(args[2]))
+
+    async def hint(self, args, owned):
+        session = await self.session(args, owned)
+        # Решатель всегда считается в пуле потоков: первый вызов сканирует всю границу поля
+        async with session.lock:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, session.hint)
+
+    async def state(self, args, owned):
+        board = (await self.session(args, owned)).board
+        return (f"{board.status} {board.width} {board.height} {board.mine_count} "
+                f"{board.safe_remaining} {board.flags_placed}")
+
+    async def close(self, args, owned):
+        await self.session(args, owned)
+        sid = int(args[0])
+        owned.discard(sid)
+        await self.sessions.remove(sid)
+        return ''
+
+    async def stats(self, args, owned):
+        return ' '.join(f"{name}={value:.3f}" if isinstance(value, float) else f"{name}={value}"
+                        for name, value in self.sessions.stats().items())
+
+
+async def serve(host, port, workers=None, memory=MEMORY_BUDGET, spill_dir=None):
+    """Запускает сервер и обслуживает соединения до остановки"""
+    game_server = GameServer(workers, memory, spill_dir)
+    server = await asyncio.start_server(game_server.handle, host, port)
+    print(f"Serving on {', '.join(str(s.getsockname()) for s in server.sockets)}", file=sys.stderr)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await game_server.sessions.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Сервер сапёра для множества одновременных партий")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--workers', type=int, help="Потоков для тяжёлых команд (по умолчанию - по числу ядер)")
+    parser.add_argument('--memory', type=int, default=MEMORY_BUDGET // 2**20, help="Бюджет памяти для партий в МБ")
+    parser.add_argument('--spill-dir', help="Папка для выгруженных на диск партий (по умолчанию - временная)")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers, args.memory * 2**20, args.spill_dir))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,241 @@
+"""
+Хранилище партий сервера с бюджетом памяти
+
+Активные партии лежат в памяти (поле в битовом хранении), а давно не
+использованные выгружаются на диск в порядке LRU и загружаются обратно при
+следующем обращении. В памяти для выгруженной партии остаётся только её номер.
+Запись и чтение файлов идут в пуле потоков, чтобы не задерживать цикл событий.
+"""
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import time
+from collections import OrderedDict
+
+# Общий движок лежит в корне репозитория
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from minesweeper_engine import Solver, PLAYING
+from minesweeper_engine.snapshot import save_snapshot, load_snapshot
+
+# Оценка памяти партии (замерено tracemalloc): объекты партии, поля и хранения,
+# три битовые плоскости и байт счётчика на клетку, записи решателя
+SESSION_BYTES = 1200
+BITS_PER_CELL = 11
+SOLVER_ENTRY_BYTES = 600  # Ограничение решателя или закрытая клетка в нём
+# Бюджет памяти для партий по умолчанию
+MEMORY_BUDGET = 256 * 1024 * 1024
+
+
+class Session:
+    """Одна партия: поле в битовом хранении (чуть больше байта на клетку) и решатель для подсказок"""
+
+    def __init__(self, board):
+        self.board = board
+        self.solver = None  # Создаётся при первой подсказке (и заново после выгрузки на диск)
+        self.lock = asyncio.Lock()  # Команды одной партии выполняются по очереди
+
+    @property
+    def cells(self):
+        return self.board.width * self.board.height
+
+    @property
+    def memory(self):
+        """Оценка занимаемой памяти в байтах"""
+        size = SESSION_BYTES + self.cells * BITS_PER_CELL // 8
+        if self.solver is not None:
+            size += SOLVER_ENTRY_BYTES * (len(self.solver.constraints) + len(self.solver.watch))
+        return size
+
+    # Команды возвращают готовый ответ: для большого вскрытия и строка ответа большая
+
+    def reveal(self, x, y, chord=False):
+        board = self.board
+        opened = board.chord(x, y) if chord else board.reveal(x, y)
+        if self.solver is not None and board.status == PLAYING:
+            self.solver.update(opened)
+        mines, adjacent = board.mines, board.adjacent
+        cells = ' '.join(f"{i}:{'M' if mines[i] else adjacent[i]}" for i in opened)
+        return f"{board.status} {len(opened)} {cells}".rstrip()
+
+    def flag(self, x, y):
+        board = self.board
+        board.toggle_flag(x, y)
+        return f"{board.status} {int(board.is_flagged(x, y))}"
+
+    def hint(self):
+        if self.board.status != PLAYING:
+            return '-'
+        if self.solver is None:
+            self.solver = Solver(self.board)
+        cell = self.solver.next_safe()
+        return '-' if cell is None else f"{cell[0]} {cell[1]}"
+
+
+class SessionStore:
+    def __init__(self, budget=MEMORY_BUDGET, directory=None, executor=None):
+        """
+        Партии по номерам: в памяти - пока укладываются в бюджет, остальные - на диске
+
+        Порядок LRU ведёт OrderedDict: обращение переносит партию в конец, а
+        при превышении бюджета выгружаются партии из начала. Партия, команда
+        которой ещё выполняется (занят её lock), не выгружается. Решатель при
+        выгрузке отбрасывается - он восстанавливается по открытым клеткам при
+        следующей подсказке. Оценка памяти партии обновляется при каждом
+        обращении к ней.
+
+        Выгружаемая партия сразу уходит из памяти в очередь записи, а файл
+        пишется в пуле потоков. Обращение к партии, которая ещё пишется,
+        дожидается конца записи. Если запись не удалась, партия возвращается
+        в память - она не теряется, хотя бюджет временно превышен.
+
+        Args:
+            budget: Бюджет памяти для партий в байтах
+            directory: Папка для выгруженных партий (по умолчанию - временная,
+                удаляется в close)
+            executor: Пул потоков для записи и загрузки партий (по умолчанию -
+                пул цикла событий)
+        """
+        self.budget = budget
+        self.own_directory = directory is None
+        self.directory = tempfile.mkdtemp(prefix='minesweeper-sessions-') if directory is None else directory
+        os.makedirs(self.directory, exist_ok=True)
+        self.executor = executor
+
+        self.hot = OrderedDict()  # Номер -> Session, от давно не использованных к недавним
+        self.sizes = {}  # Номер -> оценка памяти партии в памяти
+        self.spilled = set()  # Номера партий на диске
+        self.saving = {}  # Номер -> (Session, Future записи) для партий, которые сейчас пишутся на диск
+        self.used = 0  # Сумма оценок памяти партий в памяти
+
+        # Метрики
+        self.hits = 0  # Обращения к партиям в памяти
+        self.misses = 0  # Обращения к партиям на диске (с загрузкой)
+        self.evictions = 0
+        self.restore_time = 0.0  # Суммарное и наибольшее время загрузки с диска в секундах
+        self.restore_max = 0.0
+
+    def __len__(self):
+        return len(self.hot) + len(self.saving) + len(self.spilled)
+
+    def __contains__(self, sid):
+        return sid in self.hot or sid in self.saving or sid in self.spilled
+
+    def path(self, sid):
+        return os.path.join(self.directory, f'{sid}.msnap')
+
+    def add(self, sid, session):
+        """Добавляет новую партию (при нехватке бюджета выгружает старые)"""
+        self.hot[sid] = session
+        self.sizes[sid] = session.memory
+        self.used += self.sizes[sid]
+        self.evict()
+
+    async def settle(self, sid):
+        """Дожидается конца записи партии на диск, если она сейчас пишется"""
+        pending = self.saving.get(sid)
+        if pending is not None:
+            await asyncio.wait([pending[1]])  # Ошибку записи разбирает _saved
+
+    async def get(self, sid):
+        """Партия по номеру: из памяти или загруженная с диска"""
+        await self.settle(sid)
+        session = self.hot.get(sid)
+        if session is not None:
+            self.hits += 1
+            self.hot.move_to_end(sid)
+            size = session.memory
+            self.used += size - self.sizes[sid]
+            self.sizes[sid] = size
+        else:
+            if sid not in self.spilled:
+                raise KeyError(sid)
+            self.misses += 1
+            started = time.perf_counter()
+            loop = asyncio.get_running_loop()
+            session = Session(await loop.run_in_executor(self.executor, _restore, self.path(sid)))
+            elapsed = time.perf_counter() - started
+            self.restore_time += elapsed
+            self.restore_max = max(self.restore_max, elapsed)
+            self.spilled.discard(sid)
+            self.add(sid, session)
+        return session
+
+    async def remove(self, sid):
+        """Удаляет партию из памяти или с диска"""
+        await self.settle(sid)
+        if sid in self.hot:
+            del self.hot[sid]
+            self.used -= self.sizes.pop(sid)
+        elif sid in self.spilled:
+            self.spilled.discard(sid)
+            os.remove(self.path(sid))
+
+    def evict(self):
+        """Выгружает давно не использованные партии, пока память не уложится в бюджет"""
+        if self.used <= self.budget:
+            return
+        # Последняя партия - та, к которой только что обратились: её не выгружаем
+        newest = next(reversed(self.hot))
+        victims = []
+        excess = self.used - self.budget
+        for sid, session in self.hot.items():
+            if excess <= 0 or sid == newest:
+                break
+            if not session.lock.locked():
+                victims.append(sid)
+                excess -= self.sizes[sid]
+
+        loop = asyncio.get_running_loop()
+        for sid in victims:
+            session = self.hot.pop(sid)
+            self.used -= self.sizes.pop(sid)
+            future = loop.run_in_executor(self.executor, save_snapshot, self.path(sid), session.board)
+            self.saving[sid] = (session, future)
+            future.add_done_callback(lambda future, sid=sid: self._saved(sid, future))
+
+    def _saved(self, sid, future):
+        """Завершает выгрузку: партия числится на диске или, если запись не удалась, возвращается в память"""
+        session, _ = self.saving.pop(sid)
+        if future.exception() is None:
+            self.spilled.add(sid)
+            self.evictions += 1
+            return
+        print(f"Не удалось выгрузить партию {sid}: {future.exception()}", file=sys.stderr)
+        # Возвращаем в начало очереди LRU: при следующем превышении бюджета выгрузка повторится
+        self.hot[sid] = session
+        self.hot.move_to_end(sid, last=False)
+        self.sizes[sid] = session.memory
+        self.used += self.sizes[sid]
+
+    def stats(self):
+        """Метрики хранилища: количество партий, память, доля попаданий, выгрузки и время загрузки"""
+        requests = self.hits + self.misses
+        return {
+            'sessions': len(self),
+            'hot': len(self.hot),
+            'spilled': len(self.spilled),
+            'memory': self.used,
+            'hit_rate': self.hits / requests if requests else 1.0,
+            'evictions': self.evictions,
+            'restores': self.misses,
+            'restore_ms_mean': self.restore_time / self.misses * 1000 if self.misses else 0.0,
+            'restore_ms_max': self.restore_max * 1000,
+        }
+
+    async def close(self):
+        """Удаляет выгруженные партии (и временную папку, если она создана хранилищем)"""
+        for sid in list(self.saving):
+            await self.settle(sid)
+        for sid in list(self.spilled):
+            await self.remove(sid)
+        if self.own_directory:
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def _restore(path):
+    """Загружает выгруженное поле и удаляет его файл (выполняется в пуле потоков)"""
+    board = load_snapshot(path)[0]
+    os.remove(path)
+    return board
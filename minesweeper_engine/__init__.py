@@ -0,0 +1,7 @@
+"""Общий движок сапёра без зависимостей от интерфейса (консоль, tkinter, pygame/OpenGL)"""
+from .board import Board, READY, PLAYING, WON, LOST
+from .endless import EndlessBoard
+from .probability import ProbabilityEngine
+from .solver import Solver
+
+__all__ = ['Board', 'EndlessBoard', 'ProbabilityEngine', 'Solver', 'READY', 'PLAYING', 'WON', 'LOST']
@@ -0,0 +1,145 @@
+try:
+    import numpy as np
+except ImportError:  # NumPy необязателен: без него работает построчный вариант
+    np = None
+
+# Высота полосы строк при пакетном подсчёте (подобрана под размер кэша L2)
+BAND_ROWS = 128
+
+
+def compute_adjacency(mines, adjacent, width, height):
+    """
+    Заполняет массив количеств соседних мин для всего поля
+
+    Если установлен NumPy, подсчёт выполняется одним пакетным шагом
+    (сумма по окну 3x3 над дополненной нулями маской мин), иначе -
+    инкрементом счётчиков вокруг каждой мины.
+
+    Args:
+        mines: Плоский массив маски мин (по байту на клетку)
+        adjacent: Плоский массив, в который записываются результаты
+        width, height: Размеры поля
+    """
+    if np is not None:
+        _compute_adjacency_numpy(mines, adjacent, width, height)
+    else:
+        _compute_adjacency_python(mines, adjacent, width, height)
+
+
+def adjacency_array(mine_mask, out=None):
+    """
+    Возвращает массив количеств соседних мин для двумерной маски мин
+
+    Окно 3x3 раскладывается на две одномерные суммы (по строкам и по столбцам),
+    поэтому на клетку приходится всего четыре сложения. Поле обрабатывается
+    полосами по BAND_ROWS строк, чтобы промежуточные суммы оставались в кэше
+    процессора и время росло линейно с площадью поля.
+
+    Args:
+        mine_mask: Массив NumPy формы (height, width) из 0 и 1
+        out: Необязательный массив uint8 той же формы для записи результата
+    """
+    mask = np.asarray(mine_mask, dtype=np.uint8)
+    height, width = mask.shape
+    if out is None:
+        out = np.empty((height, width), dtype=np.uint8)
+
+    padded = np.zeros((height + 2, width + 2), dtype=np.uint8)
+    padded[1:-1, 1:-1] = mask
+
+    rows = np.empty((BAND_ROWS + 2, width), dtype=np.uint8)
+    for top in range(0, height, BAND_ROWS):
+        bottom = min(height, top + BAND_ROWS)
+        count = bottom - top
+        window = padded[top:bottom + 2]
+
+        # Сумма по трём соседним столбцам
+        band = rows[:count + 2]
+        np.add(window[:, :width], window[:, 1:width + 1], out=band)
+        band += window[:, 2:width + 2]
+
+        # Сумма по трём соседним строкам, сама клетка в окно не входит
+        result = out[top:bottom]
+        np.add(band[:count], band[1:count + 1], out=result)
+        result += band[2:count + 2]
+        result -= mask[top:bottom]
+
+    return out
+
+
+def _compute_adjacency_numpy(mines, adjacent, width, height):
+    """Пакетный подсчёт через NumPy (результат пишется прямо в adjacent)"""
+    mask = np.frombuffer(mines, dtype=np.uint8).reshape(height, width)
+    out = np.frombuffer(adjacent, dtype=np.uint8).reshape(height, width)
+    adjacency_array(mask, out=out)
+
+
+def _compute_adjacency_python(mines, adjacent, width, height):
+    """Подсчёт без NumPy: увеличиваем счётчики вокруг каждой мины"""
+    adjacent[:] = bytes(width * height)
+
+    i = mines.find(1)
+    while i != -1:
+        _increment_around(adjacent, i, width, height)
+        i = mines.find(1, i + 1)
+
+
+def _increment_around(adjacent, i, width, height):
+    """Увеличивает счётчики всех соседей мины в клетке i"""
+    x, y = i % width, i // width
+    for ny in range(max(0, y - 1), min(height, y + 2)):
+        row = ny * width
+        for nx in range(max(0, x - 1), min(width, x + 2)):
+            if nx != x or ny != y:
+                adjacent[row + nx] += 1
+
+
+def compute_adjacency_packed(mines, adjacent, width, height):
+    """
+    Заполняет массив количеств соседних мин по битовой плоскости мин (BitPlane)
+
+    С NumPy плоскость распаковывается полосами строк, поэтому распакованная маска
+    никогда не занимает больше нескольких полос. Без NumPy счётчики
+    увеличиваются вокруг каждой установленной битом мины.
+    """
+    if np is None:
+        adjacent[:] = bytes(width * height)
+        for i in mines.ones():
+            _increment_around(adjacent, i, width, height)
+        return
+
+    bits = np.frombuffer(mines.data, dtype=np.uint8)
+    out = np.frombuffer(adjacent, dtype=np.uint8).reshape(height, width)
+    for top in range(0, height, BAND_ROWS):
+        bottom = min(height, top + BAND_ROWS)
+
+        # Распаковываем полосу вместе с соседними строками сверху и снизу
+        first = max(0, top - 1)
+        last = min(height, bottom + 1)
+        start, end = first * width, last * width
+        mask = np.unpackbits(bits[start >> 3:(end + 7) >> 3], bitorder='little')
+        offset = start - ((start >> 3) << 3)
+        mask = mask[offset:offset + end - start].reshape(last - first, width)
+
+        counts = adjacency_array(mask)
+        out[top:bottom] = counts[top - first:top - first + bottom - top]
+
+
+def compute_adjacency_banded(mask, out):
+    """
+    Заполняет out количествами соседних мин по двумерной маске, читая её полосами
+
+    В памяти одновременно находится только одна полоса строк с соседними
+    строками сверху и снизу, поэтому маска и результат могут быть
+    отображёнными в память файлами (numpy.memmap) больше оперативной памяти.
+
+    Args:
+        mask: Массив NumPy формы (height, width) из 0 и 1
+        out: Массив uint8 той же формы для записи результата
+    """
+    height = mask.shape[0]
+    for top in range(0, height, BAND_ROWS):
+        bottom = min(height, top + BAND_ROWS)
+        first, last = max(0, top - 1), min(height, bottom + 1)
+        counts = adjacency_array(mask[first:last])
+        out[top:bottom] = counts[top - first:bottom - first]
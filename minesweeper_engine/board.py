@@ -0,0 +1,428 @@
+import random
+
+from .instrument import timed
+from .openings import Openings
+from .placement import new_seed, sample_layout
+from .planes import BitPlane
+from .storage import make_storage
+
+# Состояния партии
+READY = 'ready'  # Мины ещё не расставлены (ждём первый ход)
+PLAYING = 'playing'  # Игра идёт
+WON = 'won'  # Все безопасные клетки открыты (или все мины помечены)
+LOST = 'lost'  # Открыта клетка с миной
+
+# Смещения для 8 соседних клеток
+NEIGHBOR_OFFSETS = [(-1, -1), (0, -1), (1, -1),  # Верхние соседи
+                    (-1, 0), (1, 0),  # Боковые соседи
+                    (-1, 1), (0, 1), (1, 1)]  # Нижние соседи
+
+
+class Board:
+    def __init__(self, width, height, mine_count, safe_radius=1, flag_win=False, seed=None,
+                 storage=None):
+        """
+        Игровое поле сапёра без зависимостей от интерфейса
+
+        Состояние хранится в плоских массивах (плоскостях) мин, открытых клеток,
+        флагов и счётчиков соседей, индекс клетки вычисляется как y * width + x.
+
+        Args:
+            width, height: Размеры поля в клетках
+            mine_count: Количество мин
+            safe_radius: Радиус безопасной зоны вокруг первого хода
+                (0 - только сама клетка, 1 - квадрат 3x3)
+            flag_win: Засчитывать ли победу за правильную разметку всех мин флагами
+            seed: Зерно генератора мин (одинаковое зерно и первый ход дают одинаковое поле)
+            storage: Вариант хранения плоскостей: 'dense' (байт на клетку, по умолчанию),
+                'packed' (биты на клетку), 'sparse' (только мины и открытые области),
+                'mapped' (файл на диске, см. Board.resume) или готовый объект хранения
+        """
+        if width < 1 or height < 1:
+            raise ValueError("Размеры поля должны быть положительными")
+        # Мины должны помещаться вне безопасной зоны первого хода в любом месте поля
+        zone = min(width, 2 * safe_radius + 1) * min(height, 2 * safe_radius + 1)
+        if not 0 <= mine_count <= width * height - zone:
+            raise ValueError(f"Количество мин должно быть от 0 до {width * height - zone}")
+
+        self.width = width
+        self.height = height
+        self.mine_count = mine_count
+        self.safe_radius = safe_radius
+        self.flag_win = flag_win
+        self.storage = make_storage(storage)
+
+        self.new_game(seed)
+
+    @classmethod
+    def resume(cls, storage):
+        """
+        Продолжает партию, сохранённую в хранении (например, MappedStorage с путём к файлу)
+
+        Плоскости не читаются и не копируются: параметры и счётчики берутся из
+        заголовка, а клетки - прямо из хранения по мере обращения к ним.
+
+        Args:
+            storage: Объект хранения с методом resume
+        """
+        state = storage.resume()
+        board = cls.__new__(cls)
+        board.width = state['width']
+        board.height = state['height']
+        board.mine_count = state['mine_count']
+        board.safe_radius = state['safe_radius']
+        board.flag_win = state['flag_win']
+        board.seed = state['seed']
+        board.status = state['status']
+        board.safe_remaining = state['safe_remaining']
+        board.flags_placed = state['flags_placed']
+        board.correct_flags = state['correct_flags']
+        board.storage = storage
+        board._bind_planes()
+        return board
+
+    def new_game(self, seed=None):
+        """
+        Сбрасывает поле к начальному состоянию (мины расставляются при первом ходе)
+
+        Args:
+            seed: Зерно генератора мин для новой партии (по умолчанию - случайное)
+        """
+        self.seed = new_seed() if seed is None else seed
+        cells = self.width * self.height
+        self.storage.allocate(self.width, self.height)
+        self._bind_planes()
+        self.status = READY
+
+        # Счётчики обновляются при каждом действии, поэтому проверки победы не сканируют поле
+        self.safe_remaining = cells - self.mine_count  # Закрытые безопасные клетки
+        self.flags_placed = 0  # Поставленные флаги
+        self.correct_flags = 0  # Флаги, стоящие на минах
+        self._sync()
+
+    def _bind_planes(self):
+        """Берёт плоскости из хранения"""
+        self.mines = self.storage.mines  # 1 - в клетке мина
+        self.revealed = self.storage.revealed  # 1 - клетка открыта
+        self.flagged = self.storage.flagged  # 1 - на клетке флаг
+        self.adjacent = self.storage.adjacent  # Количество мин вокруг клетки
+        self.openings = None  # Разметка пустых областей (строится при расстановке мин)
+
+    def _sync(self):
+        """Сообщает хранению новое состояние партии (если хранению это нужно)"""
+        if self.storage.sync is not None:
+            self.storage.sync(self)
+
+    def in_bounds(self, x, y):
+        """Проверяет, что координаты лежат в пределах поля"""
+        return 0 <= x < self.width and 0 <= y < self.height
+
+    def neighbors(self, x, y):
+        """Возвращает координаты соседних клеток в пределах поля"""
+        result = []
+        for dx, dy in NEIGHBOR_OFFSETS:
+            nx, ny = x + dx, y + dy
+            if 0 <= nx < self.width and 0 <= ny < self.height:
+                result.append((nx, ny))
+        return result
+
+    def safe_zone(self, safe_x, safe_y):
+        """Возвращает плоские индексы клеток, где не может быть мин при первом ходе"""
+        r = self.safe_radius
+        zone = []
+        for y in range(max(0, safe_y - r), min(self.height, safe_y + r + 1)):
+            for x in range(max(0, safe_x - r), min(self.width, safe_x + r + 1)):
+                zone.append(y * self.width + x)
+        return zone
+
+    @timed('board.place_mines')
+    def place_mines(self, safe_x, safe_y):
+        """
+        Размещение мин на поле с гарантией безопасной зоны вокруг первого хода
+
+        Args:
+            safe_x, safe_y: Координаты первого хода
+        """
+        # Ровно mine_count клеток вне безопасной зоны (время не зависит от плотности, память - от числа мин)
+        rng = random.Random(self.seed)
+        zone = self.safe_zone(safe_x, safe_y)
+        self.place_layout(sample_layout(rng, self.width * self.height, self.mine_count, zone))
+
+    def place_layout(self, mines):
+        """
+        Расставляет мины по готовому списку плоских индексов (например, из пула полей)
+
+        Args:
+            mines: Плоские индексы ровно mine_count клеток с минами или BitPlane с ними
+        """
+        count = mines.count() if isinstance(mines, BitPlane) else len(mines)
+        if count != self.mine_count:
+            raise ValueError(f"Нужно ровно {self.mine_count} мин, передано {count}")
+        self.storage.set_mines(mines)
+
+        # Заполняем числами (количество мин вокруг) одним проходом по всему полю
+        self.storage.compute_adjacency()
+
+        # Вся работа по поиску пустых областей выполняется здесь, а не при клике
+        if self.storage.openings:
+            self.openings = Openings(self.mines, self.adjacent, self.width, self.height)
+
+        # Флаги могли быть поставлены до первого хода
+        if self.flags_placed:
+            self.correct_flags = self.storage.count_correct_flags()
+
+        self.status = PLAYING
+        self._sync()
+
+    def is_mine(self, x, y):
+        """Есть ли в клетке мина"""
+        return bool(self.mines[y * self.width + x])
+
+    def is_revealed(self, x, y):
+        """Открыта ли клетка"""
+        return bool(self.revealed[y * self.width + x])
+
+    def is_flagged(self, x, y):
+        """Стоит ли на клетке флаг"""
+        return bool(self.flagged[y * self.width + x])
+
+    def adjacent_count(self, x, y):
+        """Количество мин вокруг клетки"""
+        return self.adjacent[y * self.width + x]
+
+    def cell_char(self, x, y):
+        """Символ клетки в формате консольной и GUI версий: 'M', цифра или пробел"""
+        i = y * self.width + x
+        if self.mines[i]:
+            return 'M'
+        return str(self.adjacent[i]) if self.adjacent[i] else ' '
+
+    def coords(self, i):
+        """Переводит плоский индекс клетки в координаты (x, y)"""
+        return i % self.width, i // self.width
+
+    @timed('board.reveal', cells=True)
+    def reveal(self, x, y):
+        """
+        Открывает клетку (при первом ходе сначала расставляет мины)
+
+        Returns:
+            Список плоских индексов впервые открытых клеток (пустой, если ничего не открылось).
+            При проигрыше в него входят все показанные мины
+        """
+        if self.status not in (READY, PLAYING) or not self.in_bounds(x, y):
+            return []
+        i = y * self.width + x
+        if self.revealed[i] or self.flagged[i]:
+            return []
+
+        # Первый ход - гарантируем безопасность
+        if self.status == READY:
+            self.place_mines(x, y)
+
+        if self.mines[i]:
+            return self.lose()
+
+        opened = self._flood([i])
+        self.safe_remaining -= len(opened)
+        self.check_win()
+        self._sync()
+        return opened
+
+    def _flood(self, starts):
+        """
+        Открывает клетки starts и пустые области вокруг них
+
+        Для пустой клетки область берётся из заранее построенной разметки
+        открытий (self.openings), иначе - из заливки, которую предоставляет
+        хранение, или обходом соседей. Открытие с флагами или уже открытыми
+        пустыми клетками тоже открывается обходом соседей: флаг останавливает
+        заливку, и результат не должен зависеть от хранения.
+
+        Returns:
+            Список плоских индексов открытых клеток
+        """
+        if self.storage.flood is not None:
+            return self.storage.flood(starts)
+        if self.openings is None:
+            return self._flood_search(starts)
+
+        revealed, flagged, adjacent = self.revealed, self.flagged, self.adjacent
+        opened = []
+        for i in starts:
+            if revealed[i] or flagged[i]:
+                continue
+            if adjacent[i] == 0:
+                label = self.openings.label(i)
+                if self.openings.untouched(label, revealed, flagged if self.flags_placed else None):
+                    self._open_region(label, opened)
+                else:
+                    opened.extend(self._flood_search([i]))
+            else:
+                revealed[i] = 1
+                opened.append(i)
+        return opened
+
+    def _open_region(self, label, opened):
+        """
+        Открывает все закрытые клетки открытия label (в нём нет флагов)
+
+        Закрытые участки отрезков находятся поиском по байтовым массивам
+        и открываются присваиванием срезов.
+        """
+        revealed = self.revealed
+        for start, end in self.openings.segments(label):
+            pos = revealed.find(0, start, end)
+            while pos != -1:
+                stop = revealed.find(1, pos, end)
+                if stop == -1:
+                    stop = end
+                # [pos, stop) - закрытые клетки
+                revealed[pos:stop] = b'\x01' * (stop - pos)
+                opened.extend(range(pos, stop))
+                pos = revealed.find(0, stop, end) if stop < end else -1
+
+    def _flood_search(self, starts):
+        """
+        Итеративно открывает клетки starts и пустые области вокруг них обходом соседей
+
+        Вместо рекурсии используется явный стек, поэтому размер области не ограничен
+        глубиной рекурсии. Клетка помечается открытой в момент попадания в стек,
+        так что каждая клетка просматривается не больше одного раза.
+
+        Returns:
+            Список плоских индексов открытых клеток
+        """
+        width, height = self.width, self.height
+        revealed, flagged, adjacent = self.revealed, self.flagged, self.adjacent
+
+        # Смещения соседей для внутренних клеток (не на краю поля)
+        offsets = (-width - 1, -width, -width + 1, -1, 1, width - 1, width, width + 1)
+        last_row = width * (height - 1)
+
+        opened = []
+        stack = []
+        for i in starts:
+            if revealed[i] or flagged[i]:
+                continue
+            revealed[i] = 1
+            opened.append(i)
+            if adjacent[i] == 0:
+                stack.append(i)
+
+        while stack:
+            i = stack.pop()
+            x = i % width
+            if 0 < x < width - 1 and width <= i < last_row:
+                around = [i + d for d in offsets]
+            else:
+                y = i // width
+                around = [ny * width + nx
+                          for ny in range(max(0, y - 1), min(height, y + 2))
+                          for nx in range(max(0, x - 1), min(width, x + 2))
+                          if nx != x or ny != y]
+
+            for j in around:
+                if revealed[j] or flagged[j]:
+                    continue
+                # Соседи пустой клетки не бывают минами
+                revealed[j] = 1
+                opened.append(j)
+                if adjacent[j] == 0:
+                    stack.append(j)
+
+        return opened
+
+    def toggle_flag(self, x, y):
+        """
+        Ставит или снимает флаг с закрытой клетки
+
+        Returns:
+            True, если состояние флага изменилось
+        """
+        if self.status not in (READY, PLAYING) or not self.in_bounds(x, y):
+            return False
+        i = y * self.width + x
+        if self.revealed[i]:
+            return False
+
+        step = 1 if not self.flagged[i] else -1
+        self.flagged[i] ^= 1
+        self.flags_placed += step
+        if self.status == PLAYING:
+            self.correct_flags += step * self.mines[i]
+            if self.flag_win and self.all_mines_flagged():
+                self.status = WON
+        self._sync()
+        return True
+
+    @timed('board.chord', cells=True)
+    def chord(self, x, y):
+        """
+        Открывает всех непомеченных соседей открытой цифры,
+        если вокруг неё уже стоит нужное число флагов
+
+        Все соседи открываются одним проходом: пустые области вокруг них
+        заливаются вместе (общие клетки просматриваются один раз), а счётчики,
+        проверка победы и синхронизация с хранением обновляются один раз на аккорд.
+
+        Returns:
+            Список плоских индексов открытых клеток.
+            При проигрыше (флаги стояли неверно) в него входят все показанные мины
+        """
+        if self.status != PLAYING or not self.in_bounds(x, y):
+            return []
+        i = y * self.width + x
+        if not self.revealed[i] or self.adjacent[i] == 0:
+            return []
+
+        around = [ny * self.width + nx for nx, ny in self.neighbors(x, y)]
+        revealed, flagged = self.revealed, self.flagged
+        if sum(flagged[j] for j in around) != self.adjacent[i]:
+            return []
+
+        starts = [j for j in around if not revealed[j] and not flagged[j]]
+        # Неверный флаг: соседи по порядку до первой мины открываются, затем проигрыш
+        mines = self.mines
+        hit = next((k for k, j in enumerate(starts) if mines[j]), None)
+        if hit is not None:
+            del starts[hit:]
+
+        opened = self._flood(starts)
+        self.safe_remaining -= len(opened)
+        if hit is not None:
+            return list(opened) + self.lose()
+        self.check_win()
+        self._sync()
+        return opened
+
+    @property
+    def mines_left(self):
+        """Сколько мин осталось пометить (может быть отрицательным при лишних флагах)"""
+        return self.mine_count - self.flags_placed
+
+    def all_mines_flagged(self):
+        """Проверяет, что флаги стоят ровно на всех минах"""
+        return self.correct_flags == self.mine_count == self.flags_placed
+
+    @timed('board.check_win')
+    def check_win(self):
+        """Проверка условия победы (все безопасные клетки открыты)"""
+        if self.status != PLAYING:
+            return self.status == WON
+        if self.safe_remaining:
+            return False
+        self.status = WON
+        return True
+
+    def lose(self):
+        """
+        Завершает партию поражением и показывает все мины
+
+        Returns:
+            Список плоских индексов мин, открытых при показе
+        """
+        self.status = LOST
+        shown = self.storage.reveal_mines()
+        self._sync()
+        return shown
@@ -0,0 +1,338 @@
+import hashlib
+import os
+import random
+import struct
+import tempfile
+from collections import OrderedDict
+
+from .adjacency import compute_adjacency
+from .board import PLAYING, LOST
+from .instrument import timed
+from .placement import new_seed, sample_cells
+
+# Ниже этой плотности пустые области почти наверняка бесконечны
+MIN_DENSITY = 0.1
+# Сколько клеток может открыть один клик (остальная область откроется кликом по её краю)
+MAX_CASCADE = 50000
+
+
+class Chunk:
+    def __init__(self, cx, cy, size, mines):
+        """
+        Квадратный кусок бесконечного поля
+
+        Args:
+            cx, cy: Координаты куска (в кусках, а не в клетках)
+            size: Сторона куска в клетках
+            mines: Маска мин куска (по байту на клетку)
+        """
+        cells = size * size
+        self.cx, self.cy = cx, cy
+        self.mines = mines
+        self.adjacent = bytearray(cells)
+        self.revealed = bytearray(cells)
+        self.flagged = bytearray(cells)
+        self.dirty = False  # Игрок менял состояние куска (нужно сохранить при вытеснении)
+
+
+class EndlessBoard:
+    def __init__(self, density, seed=None, chunk_size=32, max_chunks=256, save_dir=None):
+        """
+        Бесконечное поле, разбитое на куски, которые создаются при первом обращении
+
+        Мины куска определяются только зерном мира и координатами куска, поэтому
+        вытесненный кусок восстанавливается в точности. Загруженные куски лежат
+        в LRU-кэше ограниченного размера, изменённые игроком куски при вытеснении
+        сохраняются на диск (мины не сохраняются - они генерируются заново).
+        Для подсчёта соседей на границе куска генерируются только маски мин
+        соседних кусков. Клетки вокруг начала координат (0, 0) всегда без мин,
+        поэтому первый ход в центр мира безопасен.
+
+        Args:
+            density: Доля клеток с минами
+            seed: Зерно мира (по умолчанию - случайное)
+            chunk_size: Сторона куска в клетках
+            max_chunks: Сколько кусков держать в памяти одновременно
+            save_dir: Папка для вытесненных изменённых кусков (по умолчанию - временная)
+        """
+        if not MIN_DENSITY <= density < 1:
+            raise ValueError(f"Плотность мин должна быть от {MIN_DENSITY} до 1")
+
+        self.density = density
+        self.seed = new_seed() if seed is None else seed
+        self.chunk_size = chunk_size
+        self.max_chunks = max_chunks
+        self.save_dir = save_dir or tempfile.mkdtemp(prefix='minesweeper_endless_')
+        os.makedirs(self.save_dir, exist_ok=True)
+
+        self.chunks = OrderedDict()  # (cx, cy) -> Chunk, в порядке последнего обращения
+        self.masks = OrderedDict()  # Маски мин незагруженных соседних кусков
+
+        self.status = PLAYING
+        self.cells_revealed = 0  # Открытые клетки во всём мире
+        self.flags_placed = 0  # Поставленные флаги
+        self.frontier = set()  # Открытые пустые клетки, соседей которых каскад не успел открыть
+
+    def chunk_seed(self, cx, cy):
+        """Зерно генератора мин куска (детерминированно зависит от мира и координат)"""
+        digest = hashlib.blake2b(struct.pack('<qqq', self.seed, cx, cy), digest_size=8).digest()
+        return int.from_bytes(digest, 'little')
+
+    def generate_mines(self, cx, cy):
+        """Генерирует маску мин куска заново по зерну мира"""
+        size = self.chunk_size
+        cells = size * size
+
+        # Безопасная зона 3x3 вокруг начала координат
+        excluded = []
+        for y in range(-1, 2):
+            for x in range(-1, 2):
+                if x // size == cx and y // size == cy:
+                    excluded.append((y % size) * size + x % size)
+
+        count = min(round(self.density * cells), cells - len(excluded))
+        mines = bytearray(cells)
+        for i in sample_cells(random.Random(self.chunk_seed(cx, cy)), cells, count, excluded):
+            mines[i] = 1
+        return mines
+
+    def mine_mask(self, cx, cy):
+        """Маска мин куска: из загруженного куска, из кэша масок или сгенерированная"""
+        chunk = self.chunks.get((cx, cy))
+        if chunk is not None:
+            return chunk.mines
+        mask = self.masks.get((cx, cy))
+        if mask is None:
+            mask = self.generate_mines(cx, cy)
+            self.masks[(cx, cy)] = mask
+            if len(self.masks) > self.max_chunks:
+                self.masks.popitem(last=False)
+        else:
+            self.masks.move_to_end((cx, cy))
+        return mask
+
+    def chunk(self, cx, cy):
+        """Возвращает кусок, загружая или создавая его при необходимости"""
+        key = (cx, cy)
+        chunk = self.chunks.get(key)
+        if chunk is not None:
+            self.chunks.move_to_end(key)
+            return chunk
+
+        mines = self.masks.pop(key, None) or self.generate_mines(cx, cy)
+        chunk = Chunk(cx, cy, self.chunk_size, mines)
+        self._compute_adjacency(chunk)
+        self._restore(chunk)
+
+        self.chunks[key] = chunk
+        if len(self.chunks) > self.max_chunks:
+            _, evicted = self.chunks.popitem(last=False)
+            if evicted.dirty:
+                self._save(evicted)
+        return chunk
+
+    def _compute_adjacency(self, chunk):
+        """Считает соседей куска по его маске и краям масок восьми соседних кусков"""
+        size = self.chunk_size
+        padded_size = size + 2
+        padded = bytearray(padded_size * padded_size)
+
+        for dy in (-1, 0, 1):
+            for dx in (-1, 0, 1):
+                mask = chunk.mines if dx == dy == 0 else self.mine_mask(chunk.cx + dx, chunk.cy + dy)
+                # Какие строки и столбцы соседа попадают в рамку шириной в одну клетку
+                xs = range(size) if dx == 0 else ([size - 1] if dx < 0 else [0])
+                ys = range(size) if dy == 0 else ([size - 1] if dy < 0 else [0])
+                for y in ys:
+                    py = y + 1 + dy * size
+                    for x in xs:
+                        padded[py * padded_size + x + 1 + dx * size] = mask[y * size + x]
+
+        counts = bytearray(padded_size * padded_size)
+        compute_adjacency(padded, counts, padded_size, padded_size)
+        for y in range(size):
+            start = (y + 1) * padded_size + 1
+            chunk.adjacent[y * size:(y + 1) * size] = counts[start:start + size]
+
+    def _chunk_path(self, chunk):
+        return os.path.join(self.save_dir, f'chunk_{chunk.cx}_{chunk.cy}.bin')
+
+    def _save(self, chunk):
+        """Сохраняет открытые клетки и флаги куска на диск"""
+        with open(self._chunk_path(chunk), 'wb') as f:
+            f.write(chunk.revealed)
+            f.write(chunk.flagged)
+
+    def _restore(self, chunk):
+        """Восстанавливает состояние ранее вытесненного куска, если оно было сохранено"""
+        path = self._chunk_path(chunk)
+        if not os.path.exists(path):
+            return
+        cells = self.chunk_size * self.chunk_size
+        with open(path, 'rb') as f:
+            data = f.read()
+        chunk.revealed[:] = data[:cells]
+        chunk.flagged[:] = data[cells:2 * cells]
+        chunk.dirty = True
+
+    def flush(self):
+        """Сохраняет на диск все изменённые загруженные куски"""
+        for chunk in self.chunks.values():
+            if chunk.dirty:
+                self._save(chunk)
+
+    def _locate(self, x, y):
+        """Кусок и индекс клетки внутри него по мировым координатам"""
+        size = self.chunk_size
+        return self.chunk(x // size, y // size), (y % size) * size + x % size
+
+    def is_mine(self, x, y):
+        """Есть ли в клетке мина"""
+        chunk, i = self._locate(x, y)
+        return bool(chunk.mines[i])
+
+    def is_revealed(self, x, y):
+        """Открыта ли клетка"""
+        chunk, i = self._locate(x, y)
+        return bool(chunk.revealed[i])
+
+    def is_flagged(self, x, y):
+        """Стоит ли на клетке флаг"""
+        chunk, i = self._locate(x, y)
+        return bool(chunk.flagged[i])
+
+    def adjacent_count(self, x, y):
+        """Количество мин вокруг клетки"""
+        chunk, i = self._locate(x, y)
+        return chunk.adjacent[i]
+
+    @timed('endless.reveal', cells=True)
+    def reveal(self, x, y):
+        """
+        Открывает клетку и пустую область вокруг неё (не больше MAX_CASCADE клеток)
+
+        Клик по открытой пустой клетке, на которой остановился прошлый
+        каскад, продолжает его с того места, где он прервался.
+
+        Returns:
+            Список мировых координат (x, y) открытых клеток
+        """
+        if self.status != PLAYING:
+            return []
+        chunk, i = self._locate(x, y)
+        if chunk.revealed[i]:
+            return self._cascade([], resume=True) if (x, y) in self.frontier else []
+        if chunk.flagged[i]:
+            return []
+
+        if chunk.mines[i]:
+            chunk.revealed[i] = 1
+            chunk.dirty = True
+            self.status = LOST
+            return [(x, y)]
+        return self._cascade([(x, y)])
+
+    @timed('endless.chord', cells=True)
+    def chord(self, x, y):
+        """
+        Открывает всех непомеченных соседей открытой цифры, если вокруг неё
+        уже стоит нужное число флагов (каскады соседей - одним проходом)
+
+        Returns:
+            Список мировых координат (x, y) открытых клеток
+        """
+        if self.status != PLAYING:
+            return []
+        chunk, i = self._locate(x, y)
+        if not chunk.revealed[i] or chunk.adjacent[i] == 0:
+            return []
+
+        around = [(nx, ny) for ny in (y - 1, y, y + 1) for nx in (x - 1, x, x + 1) if (nx, ny) != (x, y)]
+        starts = []
+        flags = 0
+        for nx, ny in around:
+            near, j = self._locate(nx, ny)
+            if near.flagged[j]:
+                flags += 1
+            elif not near.revealed[j]:
+                starts.append((nx, ny))
+        if flags != chunk.adjacent[i]:
+            return []
+
+        # Неверный флаг: соседи по порядку до первой мины открываются, затем проигрыш
+        for k, (nx, ny) in enumerate(starts):
+            near, j = self._locate(nx, ny)
+            if near.mines[j]:
+                opened = self._cascade(starts[:k])
+                near, j = self._locate(nx, ny)  # Каскад мог выгрузить кусок с миной из памяти
+                near.revealed[j] = 1
+                near.dirty = True
+                self.status = LOST
+                return opened + [(nx, ny)]
+        return self._cascade(starts)
+
+    def _cascade(self, starts, resume=False):
+        """
+        Открывает безопасные клетки starts и пустые области вокруг них (всего
+        не больше MAX_CASCADE клеток); общие клетки областей открываются один раз
+
+        Пустые клетки, до соседей которых каскад не дошёл, остаются в frontier.
+
+        Args:
+            starts: Мировые координаты (x, y) клеток, с которых начинается каскад
+            resume: Продолжить каскад с клеток frontier
+
+        Returns:
+            Список мировых координат (x, y) открытых клеток
+        """
+        opened = []
+        stack = []
+        if resume:
+            stack = list(self.frontier)
+            self.frontier.clear()
+        for x, y in starts:
+            chunk, i = self._locate(x, y)
+            if chunk.revealed[i]:
+                continue  # Уже открыта каскадом предыдущей клетки
+            chunk.revealed[i] = 1
+            chunk.dirty = True
+            opened.append((x, y))
+            if chunk.adjacent[i] == 0:
+                stack.append((x, y))
+        while stack and len(opened) < MAX_CASCADE:
+            cx, cy = stack.pop()
+            for ny in (cy - 1, cy, cy + 1):
+                for nx in (cx - 1, cx, cx + 1):
+                    near, j = self._locate(nx, ny)
+                    if near.revealed[j] or near.flagged[j]:
+                        continue
+                    near.revealed[j] = 1
+                    near.dirty = True
+                    opened.append((nx, ny))
+                    if near.adjacent[j] == 0:
+                        stack.append((nx, ny))
+
+        self.frontier.update(stack)  # Упёрлись в MAX_CASCADE: остаток области откроется следующим кликом
+        self.cells_revealed += len(opened)
+        return opened
+
+    def toggle_flag(self, x, y):
+        """
+        Ставит или снимает флаг с закрытой клетки
+
+        Returns:
+            True, если состояние флага изменилось
+        """
+        if self.status != PLAYING:
+            return False
+        chunk, i = self._locate(x, y)
+        if chunk.revealed[i]:
+            return False
+        self.flags_placed += -1 if chunk.flagged[i] else 1
+        chunk.flagged[i] ^= 1
+        chunk.dirty = True
+        return True
+
+    def check_win(self):
+        """В бесконечном поле победы нет - игра идёт до первой мины"""
+        return False
@@ -0,0 +1,216 @@
+import bisect
+import zlib
+from array import array
+
+try:
+    import numpy as np
+except ImportError:  # Без NumPy клетки большого хода переключаются по одной
+    np = None
+
+from .planes import BitPlane
+from .snapshot import _pack, _unpack
+from .sparse import CellRuns
+
+# Плоскости, изменения которых записываются (мины после первого хода не меняются)
+REVEALED = 0
+FLAGGED = 1
+# С какого числа клеток ход отменяется и повторяется пакетно через NumPy
+VECTOR_CELLS = 64
+
+
+class History:
+    def __init__(self, board):
+        """
+        Неограниченная отмена и повтор ходов через журнал изменений
+
+        Каждый ход записывается как список клеток, которые он изменил (например,
+        все клетки, открытые одним каскадом; на разреженном поле - отрезки строк
+        CellRuns без разворачивания в клетки), и счётчики поля до и после хода -
+        копии поля не делаются, поэтому память растёт с числом изменённых
+        клеток, а не с числом ходов, умноженным на размер поля. Отмена закрывает
+        записанные клетки, повтор открывает их снова.
+
+        Когда с прошлой контрольной точки изменилось больше клеток, чем есть на
+        поле, записывается новая: плоскости открытых клеток и флагов, упакованные
+        по биту на клетку и сжатые. Переход сразу на много ходов (goto) идёт от
+        ближайшей контрольной точки, если так дешевле, чем по журналу.
+
+        Первое открытие партии и ходы до него не отменяются: мины расставлены
+        под первый ход, и отмена до него вернула бы поле, где первый ход уже
+        не обязательно безопасен.
+
+        Args:
+            board: Поле Board, на котором идёт партия
+        """
+        self.board = board
+        # Индексы клеток - 4 байта, если поле меньше 2^32 клеток, иначе 8
+        self.typecode = 'I' if board.width * board.height <= 1 << 32 else 'Q'
+        self.entries = []  # (плоскость, изменённые клетки, счётчики до, счётчики после)
+        self.changed = array('Q', [0])  # Изменённых клеток в первых n ходах (n - индекс)
+        self.position = 0  # Сколько записанных ходов сейчас применено
+        self.barrier = 0  # Ходы до этого номера не отменяются
+        self.checkpoint_moves = []  # Номера ходов, после которых записаны контрольные точки
+        self.checkpoints = []  # (сжатые плоскости открытых клеток и флагов, счётчики) для этих ходов
+
+    def __len__(self):
+        return len(self.entries)
+
+    @property
+    def can_undo(self):
+        return self.position > self.barrier
+
+    @property
+    def can_redo(self):
+        return self.position < len(self.entries)
+
+    def _counters(self):
+        board = self.board
+        return board.status, board.safe_remaining, board.flags_placed, board.correct_flags
+
+    def _set_counters(self, counters):
+        board = self.board
+        board.status, board.safe_remaining, board.flags_placed, board.correct_flags = counters
+
+    def reveal(self, x, y):
+        """Открывает клетку через board.reveal и записывает ход; возвращает открытые клетки"""
+        before = self._counters()
+        opened = self.board.reveal(x, y)
+        self._record(REVEALED, opened, before)
+        return opened
+
+    def chord(self, x, y):
+        """Аккорд через board.chord с записью хода; возвращает открытые клетки"""
+        before = self._counters()
+        opened = self.board.chord(x, y)
+        self._record(REVEALED, opened, before)
+        return opened
+
+    def toggle_flag(self, x, y):
+        """Ставит или снимает флаг через board.toggle_flag и записывает ход"""
+        before = self._counters()
+        if not self.board.toggle_flag(x, y):
+            return False
+        self._record(FLAGGED, [y * self.board.width + x], before)
+        return True
+
+    def _record(self, plane, cells, before):
+        """Добавляет ход в журнал (ходы после текущей позиции, отменённые ранее, отбрасываются)"""
+        if not cells:
+            return
+        if self.position < len(self.entries):
+            del self.entries[self.position:]
+            del self.changed[self.position + 1:]
+            kept = bisect.bisect_right(self.checkpoint_moves, self.position)
+            del self.checkpoint_moves[kept:]
+            del self.checkpoints[kept:]
+
+        if not isinstance(cells, CellRuns):
+            cells = array(self.typecode, cells)
+        self.entries.append((plane, cells, before, self._counters()))
+        self.changed.append(self.changed[-1] + len(cells))
+        self.position += 1
+        board = self.board
+        if plane == REVEALED and before[1] == board.width * board.height - board.mine_count:
+            self.barrier = self.position  # Первое открытие партии (мины расставлены перед ним)
+
+        last = self.checkpoint_moves[-1] if self.checkpoint_moves else 0
+        if self.changed[-1] - self.changed[last] > board.width * board.height and self._packable():
+            self._checkpoint()
+
+    def _packable(self):
+        """Можно ли записывать и восстанавливать плоскости поля целиком"""
+        return all(isinstance(plane, (BitPlane, bytearray, memoryview))
+                   for plane in (self.board.revealed, self.board.flagged))
+
+    def _checkpoint(self):
+        board = self.board
+        cells = board.width * board.height
+        self.checkpoint_moves.append(self.position)
+        self.checkpoints.append((zlib.compress(_pack(board.revealed, cells), 1),
+                                 zlib.compress(_pack(board.flagged, cells), 1),
+                                 self._counters()))
+
+    def undo(self):
+        """Отменяет последний ход; возвращает изменённые клетки (пустой список, если отменять нечего)"""
+        if not self.can_undo:
+            return []
+        self.position -= 1
+        plane, cells, before, _ = self.entries[self.position]
+        _toggle(self.board.revealed if plane == REVEALED else self.board.flagged, cells)
+        self._set_counters(before)
+        self.board._sync()
+        return cells
+
+    def redo(self):
+        """Повторяет отменённый ход; возвращает изменённые клетки"""
+        if not self.can_redo:
+            return []
+        plane, cells, _, after = self.entries[self.position]
+        self.position += 1
+        _toggle(self.board.revealed if plane == REVEALED else self.board.flagged, cells)
+        self._set_counters(after)
+        self.board._sync()
+        return cells
+
+    def goto(self, n):
+        """
+        Переходит к состоянию после n записанных ходов (не раньше первого хода)
+
+        Returns:
+            Изменённые клетки или None, если поле восстановлено из контрольной
+            точки целиком или ходы записаны отрезками строк (интерфейсу нужно
+            перерисовать всё поле)
+        """
+        n = max(self.barrier, min(n, len(self.entries)))
+        walk = abs(self.changed[n] - self.changed[self.position])
+
+        # Ближайшая контрольная точка не позже n: восстановление (по размеру поля) и ходы от неё до n
+        k = bisect.bisect_right(self.checkpoint_moves, n) - 1
+        board = self.board
+        if k >= 0 and self._packable():
+            number = self.checkpoint_moves[k]
+            revealed, flagged, counters = self.checkpoints[k]
+            if board.width * board.height + self.changed[n] - self.changed[number] < walk:
+                cells = board.width * board.height
+                _unpack(zlib.decompress(revealed), board.revealed, cells)
+                _unpack(zlib.decompress(flagged), board.flagged, cells)
+                self._set_counters(counters)
+                self.position = number
+                while self.position < n:
+                    self.redo()
+                board._sync()
+                return None
+
+        changed = array(self.typecode)
+        whole = False
+        while self.position != n:
+            cells = self.undo() if self.position > n else self.redo()
+            if isinstance(cells, CellRuns):
+                whole = True  # Каскад огромного поля в список клеток не разворачиваем
+            elif not whole:
+                changed.extend(cells)
+        return None if whole else changed
+
+
+def _toggle(plane, cells):
+    """Переключает клетки cells в плоскости (ход менял каждую клетку ровно один раз)"""
+    if isinstance(cells, CellRuns):
+        # Все клетки отрезка ход открыл вместе - отрезок закрывается или открывается целиком
+        for y, start, end in cells.runs:
+            if plane[y * cells.width + start]:
+                plane.remove(y, start, end)
+            else:
+                plane.add(y, start, end)
+        return
+    if np is not None and len(cells) >= VECTOR_CELLS:
+        index = np.frombuffer(cells, dtype=np.uint32 if cells.typecode == 'I' else np.uint64)
+        if isinstance(plane, (bytearray, memoryview)):
+            np.frombuffer(plane, dtype=np.uint8)[index] ^= 1
+            return
+        if isinstance(plane, BitPlane):
+            # Несколько клеток хода могут лежать в одном байте - xor.at применяет их все
+            bits = np.left_shift(1, index & 7).astype(np.uint8)
+            np.bitwise_xor.at(np.frombuffer(plane.data, dtype=np.uint8), index >> 3, bits)
+            return
+    for i in cells:
+        plane[i] ^= 1
@@ -0,0 +1,209 @@
+"""
+Необязательные замеры горячих участков: таймеры и счётчики с гистограммами
+
+Замеры включаются переменной окружения MINESWEEPER_PROFILE:
+
+    MINESWEEPER_PROFILE=1 python game_3d/main.py            - сводка в stderr при выходе
+    MINESWEEPER_PROFILE=profile.json python game_3d/main.py - сводка в JSON-файл при выходе
+
+Выключенные замеры почти ничего не стоят: декоратор timed возвращает функцию
+без изменений, record - пустая функция, а stages - объект с пустыми методами.
+"""
+import atexit
+import functools
+import json
+import os
+import sys
+import threading
+import time
+
+ENV_VAR = 'MINESWEEPER_PROFILE'
+ENABLED = os.environ.get(ENV_VAR, '') not in ('', '0')
+# Сколько корзин гистограммы на каждое удвоение значения (степень двойки; 4 - точность процентилей 25%)
+SUB_BUCKETS = 4
+
+_series = {}  # Имя ряда -> Series
+_lock = threading.Lock()  # Замеры приходят и из фоновых потоков (запас полей)
+
+
+def _bucket(value):
+    """Номер корзины гистограммы: маленькие значения - точно, дальше по SUB_BUCKETS на удвоение"""
+    if value < 2 * SUB_BUCKETS:
+        return value
+    shift = value.bit_length() - SUB_BUCKETS.bit_length()
+    return shift * SUB_BUCKETS + (value >> shift)
+
+
+def _bucket_bound(index):
+    """Наибольшее значение, попадающее в корзину index"""
+    if index < 2 * SUB_BUCKETS:
+        return index
+    shift = index // SUB_BUCKETS - 1
+    return ((index % SUB_BUCKETS + SUB_BUCKETS + 1) << shift) - 1
+
+
+class Series:
+    def __init__(self, unit):
+        """
+        Ряд замеров одного участка: количество, сумма, пределы и гистограмма
+
+        Args:
+            unit: 'ns' для времени (значения - наносекунды) или '' для счётчиков
+        """
+        self.unit = unit
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+        self.buckets = {}  # Номер корзины -> количество значений
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = max(self.max, value)
+        index = _bucket(value)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+
+    def percentile(self, fraction):
+        """Оценка процентиля по гистограмме (верхняя граница корзины)"""
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= self.count * fraction:
+                return min(_bucket_bound(index), self.max)
+        return self.max
+
+    def summary(self):
+        """Сводка ряда: время - в миллисекундах, счётчики - как есть"""
+        scale = 1e-6 if self.unit == 'ns' else 1
+        return {
+            'unit': 'ms' if self.unit == 'ns' else '',
+            'count': self.count,
+            'total': self.total * scale,
+            'mean': self.total / self.count * scale,
+            'min': self.min * scale,
+            'p50': self.percentile(0.5) * scale,
+            'p90': self.percentile(0.9) * scale,
+            'p99': self.percentile(0.99) * scale,
+            'max': self.max * scale,
+            # Пары [верхняя граница корзины, количество значений]
+            'histogram': [[_bucket_bound(index) * scale, self.buckets[index]] for index in sorted(self.buckets)],
+        }
+
+
+def _add(name, value, unit):
+    with _lock:
+        series = _series.get(name)
+        if series is None:
+            series = _series[name] = Series(unit)
+        series.add(value)
+
+
+def record(name, value):
+    """Добавляет значение счётчика (например, сколько клеток открыл клик) в ряд name"""
+    if ENABLED:
+        _add(name, value, '')
+
+
+def timed(name, cells=False):
+    """
+    Декоратор: время каждого вызова функции в ряду name
+
+    Args:
+        name: Имя ряда
+        cells: Записывать ли ещё длину результата (например, открытые клетки) в ряд name + '.cells'
+    """
+    def decorate(func):
+        if not ENABLED:
+            return func
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter_ns()
+            result = func(*args, **kwargs)
+            _add(name, time.perf_counter_ns() - started, 'ns')
+            if cells:
+                _add(name + '.cells', len(result), '')
+            return result
+        return wrapper
+    return decorate
+
+
+class Stages:
+    def __init__(self, name):
+        """
+        Замер последовательных этапов цикла (например, кадра): ряды name.этап и name
+
+        Использование: start() в начале итерации, mark('этап') после каждого
+        этапа - время считается от предыдущей отметки, а на последней отметке
+        (mark с last=True) записывается и время всей итерации.
+        """
+        self.name = name
+        self.started = self.last = 0
+
+    def start(self):
+        self.started = self.last = time.perf_counter_ns()
+
+    def mark(self, stage, last=False):
+        now = time.perf_counter_ns()
+        _add(f'{self.name}.{stage}', now - self.last, 'ns')
+        self.last = now
+        if last:
+            _add(self.name, now - self.started, 'ns')
+
+
+class _NullStages:
+    """Этапы при выключенных замерах: методы ничего не делают"""
+
+    def start(self):
+        pass
+
+    def mark(self, stage, last=False):
+        pass
+
+
+_NULL_STAGES = _NullStages()
+
+
+def stages(name):
+    """Замер этапов цикла name (при выключенных замерах - пустой объект)"""
+    return Stages(name) if ENABLED else _NULL_STAGES
+
+
+def snapshot():
+    """Сводки всех рядов по именам"""
+    with _lock:
+        return {name: _series[name].summary() for name in sorted(_series)}
+
+
+def report(file=None):
+    """Печатает таблицу рядов: количество, сумма, среднее, процентили и максимум"""
+    file = file or sys.stderr
+    print(f"{'series':<32} {'count':>9} {'total':>11} {'mean':>10} {'p50':>10} {'p90':>10} "
+          f"{'p99':>10} {'max':>10}", file=file)
+    for name, summary in snapshot().items():
+        unit = summary['unit']
+        print(f"{name + (f' ({unit})' if unit else ''):<32} {summary['count']:>9} {summary['total']:>11.3f} "
+              f"{summary['mean']:>10.3f} {summary['p50']:>10.3f} {summary['p90']:>10.3f} "
+              f"{summary['p99']:>10.3f} {summary['max']:>10.3f}", file=file)
+
+
+def export(path):
+    """Записывает сводки всех рядов с гистограммами в JSON-файл"""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(snapshot(), f, indent=2)
+
+
+def _at_exit():
+    if not _series:
+        return
+    target = os.environ.get(ENV_VAR, '')
+    if target.endswith('.json'):
+        export(target)
+    else:
+        report()
+
+
+if ENABLED:
+    atexit.register(_at_exit)
@@ -0,0 +1,154 @@
+import os
+import struct
+import tempfile
+
+try:
+    import numpy as np
+except ImportError:  # NumPy нужен только для хранения поля в файле
+    np = None
+
+from .adjacency import BAND_ROWS, compute_adjacency_banded
+from .planes import BitPlane, UNPACK_BYTES
+
+# Заголовок файла: метка, версия, параметры партии, состояние и счётчики
+HEADER = struct.Struct('<4sHxxQQQqBBxx8sQqq')
+MAGIC = b'MSWM'
+VERSION = 1
+# Плоскости начинаются с границы страницы, чтобы заголовок не делил с ними страницу
+HEADER_SIZE = 4096
+
+
+class MappedStorage:
+    """
+    Хранение поля в одном файле на диске через numpy.memmap
+
+    Файл содержит заголовок с параметрами и счётчиками партии и четыре байтовые
+    плоскости: мины, счётчики соседей, открытые клетки и флаги. Плоскости не
+    загружаются в память: операционная система подгружает только страницы,
+    которых касается игра, поэтому поле может быть больше оперативной памяти,
+    открывается мгновенно и после сбоя продолжается с того же места
+    (Board.resume). Вскрытие обходит соседей, а не строит разметку открытий,
+    так что затрагиваются только страницы открываемой области.
+    """
+    name = 'mapped'
+    openings = False
+    flood = None
+
+    def __init__(self, path=None):
+        """
+        Args:
+            path: Путь к файлу поля (по умолчанию - временный файл)
+        """
+        if np is None:
+            raise ImportError("Для хранения поля в файле нужен NumPy")
+        if path is None:
+            fd, path = tempfile.mkstemp(prefix='minesweeper_', suffix='.board')
+            os.close(fd)
+        self.path = path
+
+    def allocate(self, width, height):
+        """Создаёт (или перезаписывает) файл поля с пустыми плоскостями"""
+        cells = width * height
+        with open(self.path, 'wb') as f:
+            f.truncate(HEADER_SIZE + 4 * cells)  # Файл с "дырами": место на диске занимают только записанные страницы
+        self._map(width, height)
+
+    def _map(self, width, height):
+        """Отображает файл в память и создаёт представления плоскостей"""
+        cells = width * height
+        self.width, self.height = width, height
+        self.file = np.memmap(self.path, dtype=np.uint8, mode='r+')
+        self.header = memoryview(self.file[:HEADER_SIZE])
+
+        # Двумерные массивы для пакетных операций и плоские memoryview для поклеточного доступа
+        self.arrays = {}
+        for k, plane in enumerate(('mines', 'adjacent', 'revealed', 'flagged')):
+            start = HEADER_SIZE + k * cells
+            array = self.file[start:start + cells]
+            self.arrays[plane] = array.reshape(height, width)
+            setattr(self, plane, memoryview(array))
+
+    def sync(self, board):
+        """Записывает в заголовок параметры, состояние и счётчики партии"""
+        HEADER.pack_into(self.header, 0, MAGIC, VERSION, board.width, board.height, board.mine_count,
+                         board.seed, board.safe_radius, board.flag_win, board.status.encode(),
+                         board.safe_remaining, board.flags_placed, board.correct_flags)
+
+    def resume(self):
+        """
+        Открывает существующий файл поля без чтения плоскостей
+
+        Returns:
+            Словарь с параметрами, состоянием и счётчиками сохранённой партии
+        """
+        with open(self.path, 'rb') as f:
+            fields = HEADER.unpack(f.read(HEADER.size))
+        magic, version, width, height = fields[:4]
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"Файл {self.path} не является сохранённым полем")
+
+        self._map(width, height)
+        return {
+            'width': width,
+            'height': height,
+            'mine_count': fields[4],
+            'seed': fields[5],
+            'safe_radius': fields[6],
+            'flag_win': bool(fields[7]),
+            'status': fields[8].rstrip(b'\x00').decode(),
+            'safe_remaining': fields[9],
+            'flags_placed': fields[10],
+            'correct_flags': fields[11],
+        }
+
+    def set_mines(self, indices):
+        """Записывает мины по списку плоских индексов или по битовой маске (BitPlane, распаковывается частями)"""
+        mines = self.arrays['mines'].reshape(-1)
+        if isinstance(indices, BitPlane):
+            packed = np.frombuffer(indices.data, dtype=np.uint8)
+            for start in range(0, len(packed), UNPACK_BYTES):
+                bits = np.unpackbits(packed[start:start + UNPACK_BYTES], bitorder='little')
+                cell = start * 8
+                end = min(len(mines), cell + len(bits))
+                mines[cell:end] = bits[:end - cell]
+            return
+        mines[np.fromiter(indices, dtype=np.int64)] = 1
+
+    def compute_adjacency(self):
+        """Заполняет счётчики соседних мин полосами строк"""
+        compute_adjacency_banded(self.arrays['mines'], self.arrays['adjacent'])
+
+    def _bands(self):
+        """Перебирает полосы строк (срезы), чтобы операции над всем полем не читали его целиком"""
+        for top in range(0, self.height, BAND_ROWS):
+            yield slice(top, min(self.height, top + BAND_ROWS))
+
+    def count_unrevealed_safe(self):
+        """Количество закрытых клеток без мин"""
+        mines, revealed = self.arrays['mines'], self.arrays['revealed']
+        return sum(int(np.count_nonzero((mines[band] | revealed[band]) == 0)) for band in self._bands())
+
+    def count_correct_flags(self):
+        """Количество флагов, стоящих на минах"""
+        mines, flagged = self.arrays['mines'], self.arrays['flagged']
+        return sum(int(np.count_nonzero(mines[band] & flagged[band])) for band in self._bands())
+
+    def reveal_mines(self):
+        """
+        Открывает все мины (показ поля при проигрыше)
+
+        Returns:
+            Список плоских индексов мин, которые были закрыты
+        """
+        mines, revealed = self.arrays['mines'], self.arrays['revealed']
+        shown = []
+        for band in self._bands():
+            hidden = mines[band] > revealed[band]
+            if hidden.any():
+                revealed[band][hidden] = 1
+                shown.extend((np.flatnonzero(hidden) + band.start * self.width).tolist())
+        return shown
+
+    def flush(self):
+        """Сбрасывает изменённые страницы на диск"""
+        self.file.flush()
@@ -0,0 +1,204 @@
+try:
+    import numpy as np
+except ImportError:  # NumPy нужен только для пакетного подсчёта
+    np = None
+
+from .adjacency import adjacency_array
+
+# Скорость сильного игрока в 3BV в секунду - по ней оценивается лучшее возможное время
+TOP_3BV_PER_SECOND = 6.0
+# Сколько полей обрабатывается за один пакетный шаг при потоковой подаче
+BATCH_BOARDS = 1024
+
+
+def metrics(mines, adjacent, width, height):
+    """
+    Сложность одного поля: 3BV, открытия, изолированные цифры и лучшее время
+
+    3BV - наименьшее число кликов, которым можно открыть поле: по одному на
+    каждое открытие (связную область пустых клеток с её цифровой границей)
+    и на каждую цифру, которая не граничит ни с одной пустой клеткой.
+    Поле проходится один раз построчно: пустая клетка объединяется системой
+    непересекающихся множеств с уже пройденными пустыми соседями (слева и
+    в строке выше), а цифра проверяется на соседство с пустыми клетками.
+
+    Args:
+        mines: Плоский массив маски мин (любая плоскость с индексацией)
+        adjacent: Плоский массив количеств соседних мин
+        width, height: Размеры поля
+
+    Returns:
+        Словарь: '3bv', 'openings', 'isolated' и 'best_time' (секунд при TOP_3BV_PER_SECOND)
+    """
+    parent = {}
+
+    def find(a):
+        while parent[a] != a:
+            parent[a] = parent[parent[a]]
+            a = parent[a]
+        return a
+
+    def is_zero(i):
+        return not adjacent[i] and not mines[i]
+
+    openings = 0
+    isolated = 0
+    for y in range(height):
+        row = y * width
+        for x in range(width):
+            i = row + x
+            if mines[i]:
+                continue
+            if adjacent[i]:
+                # Цифра без пустых соседей открывается только отдельным кликом
+                if not any(is_zero(ny * width + nx)
+                           for ny in range(max(0, y - 1), min(height, y + 2))
+                           for nx in range(max(0, x - 1), min(width, x + 2))):
+                    isolated += 1
+                continue
+
+            # Новое открытие, которое сливается с уже пройденными соседними открытиями
+            parent[i] = i
+            openings += 1
+            for j in (i - 1 if x else -1, i - width - 1 if x and y else -1,
+                      i - width if y else -1, i - width + 1 if y and x + 1 < width else -1):
+                if j in parent:
+                    ra, rb = find(j), find(i)
+                    if ra != rb:
+                        parent[rb] = ra
+                        openings -= 1
+
+    return _report(openings + isolated, openings, isolated)
+
+
+def board_metrics(board):
+    """
+    Сложность поля Board после расстановки мин
+
+    Плоскости из байтов (обычное хранение и поле в файле) считаются пакетно
+    через NumPy, остальные - построчным проходом metrics.
+    """
+    if np is not None and isinstance(board.mines, (bytearray, memoryview)):
+        mask = np.frombuffer(board.mines, dtype=np.uint8).reshape(1, board.height, board.width)
+        result = batch_metrics(mask)
+        return {key: value[0].item() for key, value in result.items()}
+    return metrics(board.mines, board.adjacent, board.width, board.height)
+
+
+def batch_metrics(masks, batch=BATCH_BOARDS):
+    """
+    Сложность множества полей одного размера (например, для отбора сгенерированных полей)
+
+    Поля обрабатываются пачками по batch штук: пачка укладывается в один
+    двумерный массив (поля одно под другим через пустую строку-разделитель),
+    счётчики соседей и пустых соседей считаются одной свёрткой 3x3, а
+    открытия находятся системой непересекающихся множеств сразу для всех полей.
+
+    Args:
+        masks: Массив NumPy формы (количество, высота, ширина) из 0 и 1 или
+            итератор двумерных масок (поля подаются потоком и в памяти не копятся)
+        batch: Сколько полей обрабатывать за один шаг
+
+    Returns:
+        Словарь массивов NumPy: '3bv', 'openings', 'isolated', 'best_time' (по элементу на поле)
+    """
+    if np is None:
+        raise ImportError("Для пакетного подсчёта сложности полей нужен NumPy")
+
+    if isinstance(masks, np.ndarray):
+        chunks = (masks[start:start + batch] for start in range(0, len(masks), batch))
+    else:
+        chunks = _stacked(masks, batch)
+
+    parts = [_batch_counts(np.asarray(chunk, dtype=np.uint8)) for chunk in chunks]
+    if not parts:
+        openings = isolated = np.zeros(0, dtype=np.int64)
+    else:
+        openings = np.concatenate([part[0] for part in parts])
+        isolated = np.concatenate([part[1] for part in parts])
+    return _report(openings + isolated, openings, isolated)
+
+
+def _stacked(masks, batch):
+    """Собирает поток двумерных масок в пачки по batch штук"""
+    chunk = []
+    for mask in masks:
+        chunk.append(mask)
+        if len(chunk) == batch:
+            yield np.stack(chunk)
+            chunk = []
+    if chunk:
+        yield np.stack(chunk)
+
+
+def _batch_counts(masks):
+    """Количество открытий и изолированных цифр для пачки полей формы (n, высота, ширина)"""
+    count, height, width = masks.shape
+    rows = height + 1  # Строка-разделитель под каждым полем: без мин и без пустых клеток
+
+    stacked = np.zeros((count, rows, width), dtype=np.uint8)
+    stacked[:, :height] = masks
+    stacked = stacked.reshape(count * rows, width)
+    separator = np.zeros((count, rows, width), dtype=bool)
+    separator[:, height] = True
+    separator = separator.reshape(count * rows, width)
+
+    adjacent = adjacency_array(stacked)
+    safe = (stacked == 0) & ~separator
+    zero = safe & (adjacent == 0)
+    near_zero = adjacency_array(zero)  # Сколько пустых клеток среди соседей
+    isolated = safe & ~zero & (near_zero == 0)
+
+    roots = _zero_roots(zero)
+    per_board = (count, rows * width)
+    return (roots.reshape(per_board).sum(axis=1),
+            isolated.reshape(per_board).sum(axis=1))
+
+
+def _zero_roots(zero):
+    """
+    Отмечает по одной клетке (корню) в каждой связной области пустых клеток
+
+    Система непересекающихся множеств в векторном виде: на каждом шаге
+    корень с большим номером подвешивается к меньшему корню соседней
+    области, после чего пути сжимаются перескоком parent = parent[parent],
+    пока все клетки не указывают прямо на корень. Шагов - порядка логарифма
+    от размера самой длинной области.
+    """
+    height, width = zero.shape
+    flat = zero.ravel()
+    cells = np.flatnonzero(flat)
+    column = cells % width
+
+    # Рёбра к соседям справа, снизу и по двум диагоналям вниз (остальные - те же рёбра наоборот)
+    firsts, seconds = [], []
+    inner = column < width - 1
+    for offset, valid in ((1, inner), (width, np.ones_like(inner)), (width + 1, inner), (width - 1, column > 0)):
+        a = cells[valid]
+        a = a[a + offset < flat.size]
+        a = a[flat[a + offset]]
+        firsts.append(a)
+        seconds.append(a + offset)
+    first = np.concatenate(firsts)
+    second = np.concatenate(seconds)
+
+    parent = np.arange(flat.size)
+    while True:
+        ra, rb = parent[first], parent[second]
+        differ = ra != rb
+        if not differ.any():
+            break
+        np.minimum.at(parent, np.maximum(ra, rb)[differ], np.minimum(ra, rb)[differ])
+        while True:
+            jumped = parent[parent]
+            if np.array_equal(jumped, parent):
+                break
+            parent = jumped
+
+    return flat & (parent == np.arange(flat.size))
+
+
+def _report(clicks, openings, isolated):
+    """Словарь метрик (скаляры для одного поля, массивы для пачки)"""
+    return {'3bv': clicks, 'openings': openings, 'isolated': isolated,
+            'best_time': clicks / TOP_3BV_PER_SECOND}
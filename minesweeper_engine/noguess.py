@@ -0,0 +1,110 @@
+import os
+import random
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from .board import Board, WON
+from .placement import new_seed
+from .solver import Solver
+
+# Сколько кандидатов проверяет один процесс за одно задание (меньше накладных расходов на передачу)
+SEEDS_PER_TASK = 8
+# После скольких неудачных кандидатов считать плотность мин слишком высокой
+MAX_ATTEMPTS = 20000
+
+
+def is_solvable(width, height, mine_count, seed, safe_x, safe_y, safe_radius=1):
+    """
+    Проверяет, что поле с этим зерном проходится от первого хода одной логикой
+
+    Поле создаётся так же, как его создаст Board при первом ходе в (safe_x, safe_y),
+    после чего решатель открывает только наверняка безопасные клетки.
+    """
+    board = Board(width, height, mine_count, safe_radius=safe_radius, seed=seed)
+    board.reveal(safe_x, safe_y)
+    Solver(board).play()
+    return board.status == WON
+
+
+def _try_seeds(width, height, mine_count, seeds, safe_x, safe_y, safe_radius):
+    """Задание для процесса: первое проходимое зерно из seeds (или None) и число проверенных"""
+    for tried, seed in enumerate(seeds, 1):
+        if is_solvable(width, height, mine_count, seed, safe_x, safe_y, safe_radius):
+            return seed, tried
+    return None, len(seeds)
+
+
+def find_no_guess_seed(width, height, mine_count, safe_x, safe_y, safe_radius=1, seed=None,
+                       workers=None, max_attempts=MAX_ATTEMPTS):
+    """
+    Ищет зерно поля, которое проходится без угадываний от первого хода
+
+    Кандидаты проверяются пачками в пуле процессов на всех ядрах; как только
+    один процесс находит проходимое поле, остальные задания отменяются.
+
+    Args:
+        width, height, mine_count, safe_radius: Параметры поля (как у Board)
+        safe_x, safe_y: Первый ход
+        seed: Зерно, из которого выводятся зёрна кандидатов (по умолчанию - случайное)
+        workers: Количество процессов (по умолчанию - по числу ядер, 1 - без пула)
+        max_attempts: Сколько кандидатов проверить, прежде чем сдаться
+
+    Returns:
+        Словарь {'seed': найденное зерно, 'attempts': проверено кандидатов, 'elapsed': секунд}
+    """
+    started = time.perf_counter()
+    rng = random.Random(new_seed() if seed is None else seed)
+    workers = workers or os.cpu_count() or 1
+    args = (width, height, mine_count)
+
+    def batch():
+        return [rng.getrandbits(63) for _ in range(SEEDS_PER_TASK)]
+
+    def report(found, attempts):
+        return {'seed': found, 'attempts': attempts, 'elapsed': time.perf_counter() - started}
+
+    attempts = 0
+    if workers == 1:
+        while attempts < max_attempts:
+            found, tried = _try_seeds(*args, batch(), safe_x, safe_y, safe_radius)
+            attempts += tried
+            if found is not None:
+                return report(found, attempts)
+    else:
+        pool = ProcessPoolExecutor(max_workers=workers)
+        try:
+            # Держим в работе по два задания на процесс, чтобы процессы не простаивали
+            pending = {pool.submit(_try_seeds, *args, batch(), safe_x, safe_y, safe_radius)
+                       for _ in range(workers * 2)}
+            submitted = len(pending) * SEEDS_PER_TASK
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    found, tried = future.result()
+                    attempts += tried
+                    if found is not None:
+                        return report(found, attempts)
+                    if submitted < max_attempts:
+                        pending.add(pool.submit(_try_seeds, *args, batch(), safe_x, safe_y, safe_radius))
+                        submitted += SEEDS_PER_TASK
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    raise RuntimeError(f"За {attempts} попыток не найдено поле без угадываний: уменьшите количество мин")
+
+
+def place_mines_no_guess(board, safe_x, safe_y, workers=None):
+    """
+    Расставляет мины так, чтобы поле проходилось без угадываний от первого хода
+
+    Подбирает зерно и передаёт его полю, после чего мины расставляются
+    обычным Board.place_mines (поле воспроизводится по зерну).
+
+    Returns:
+        Словарь с найденным зерном, количеством попыток и временем поиска
+    """
+    result = find_no_guess_seed(board.width, board.height, board.mine_count, safe_x, safe_y,
+                                board.safe_radius, board.seed, workers)
+    board.seed = result['seed']
+    board.place_mines(safe_x, safe_y)
+    return result
@@ -0,0 +1,142 @@
+import re
+from array import array
+
+# Непрерывный отрезок пустых клеток в строке поля
+ZERO_RUN = re.compile(b'\x00+')
+
+
+class Openings:
+    def __init__(self, mines, adjacent, width, height):
+        """
+        Разметка "открытий" поля: связных областей пустых клеток вместе с их цифровой границей
+
+        Разметка строится один раз при генерации поля. Пустые клетки каждой строки
+        собираются в отрезки (поиск идёт регулярным выражением на уровне C),
+        отрезки соседних строк объединяются системой непересекающихся множеств.
+        После этого вскрытие любой пустой клетки сводится к одному обращению к
+        массиву меток и перебору заранее известных отрезков - без обхода соседей.
+
+        Args:
+            mines: Плоский массив маски мин
+            adjacent: Плоский массив количеств соседних мин
+            width, height: Размеры поля
+        """
+        self.width = width
+        self.height = height
+
+        # Отрезки пустых клеток: строка, начало и конец (не включая) в плоских индексах
+        run_row = array('i')
+        run_start = array('q')
+        run_end = array('q')
+        for y in range(height):
+            row = y * width
+            for match in ZERO_RUN.finditer(adjacent, row, row + width):
+                start, end = match.span()
+                # Мина без соседних мин тоже имеет счётчик 0, но она всегда
+                # окружена цифрами и образует отдельный отрезок длины 1
+                if end - start == 1 and mines[start]:
+                    continue
+                run_row.append(y)
+                run_start.append(start - row)
+                run_end.append(end - row)
+
+        parent = list(range(len(run_row)))
+
+        def find(a):
+            while parent[a] != a:
+                parent[a] = parent[parent[a]]
+                a = parent[a]
+            return a
+
+        # Объединяем отрезки соседних строк, которые касаются хотя бы по диагонали
+        upper = 0  # Первый отрезок предыдущей строки
+        current = 0
+        total = len(run_row)
+        while current < total:
+            y = run_row[current]
+            next_row = current
+            while next_row < total and run_row[next_row] == y:
+                next_row += 1
+
+            # Отрезки строки y - 1 лежат в [upper, current)
+            if upper < current and run_row[upper] == y - 1:
+                a = upper
+                for b in range(current, next_row):
+                    # Пропускаем отрезки сверху, которые закончились левее
+                    while a < current and run_end[a] < run_start[b]:
+                        a += 1
+                    k = a
+                    while k < current and run_start[k] <= run_end[b]:
+                        ra, rb = find(k), find(b)
+                        if ra != rb:
+                            parent[rb] = ra
+                        k += 1
+
+            upper = current
+            current = next_row
+
+        # Номера открытий (с единицы) и отрезки каждого открытия
+        label_of_root = {}
+        self.runs = [None]  # runs[label] - список номеров отрезков
+        self.labels = array('i', bytes(4 * width * height))  # 0 - клетка не пустая
+        for r in range(total):
+            root = find(r)
+            label = label_of_root.get(root)
+            if label is None:
+                label = len(self.runs)
+                label_of_root[root] = label
+                self.runs.append([])
+            self.runs[label].append(r)
+            row = run_row[r] * width
+            self.labels[row + run_start[r]:row + run_end[r]] = array('i', [label]) * (run_end[r] - run_start[r])
+
+        self.run_row = run_row
+        self.run_start = run_start
+        self.run_end = run_end
+
+    def __len__(self):
+        """Количество открытий на поле"""
+        return len(self.runs) - 1
+
+    def label(self, i):
+        """Номер открытия, в которое входит пустая клетка (0 для остальных клеток)"""
+        return self.labels[i]
+
+    def untouched(self, label, revealed, flagged):
+        """
+        Можно ли открыть открытие label целиком: внутри нет флагов и открытых пустых клеток
+
+        Флаг останавливает заливку, а открытая пустая клетка дальше не
+        раскрывается, поэтому область, где они есть, открывается обходом соседей.
+
+        Args:
+            label: Номер открытия
+            revealed, flagged: Плоскости открытых клеток и флагов (с методом find);
+                flagged=None - флагов на поле нет
+        """
+        width = self.width
+        for r in self.runs[label]:
+            row = self.run_row[r] * width
+            if revealed.find(1, row + self.run_start[r], row + self.run_end[r]) != -1:
+                return False
+        if flagged is not None:
+            for start, end in self.segments(label):
+                if flagged.find(1, start, end) != -1:
+                    return False
+        return True
+
+    def segments(self, label):
+        """
+        Перебирает отрезки строк, покрывающие открытие вместе с его цифровой границей
+
+        Yields:
+            Пары (начало, конец) в плоских индексах; отрезки соседних строк могут перекрываться
+        """
+        width, height = self.width, self.height
+        for r in self.runs[label]:
+            y = self.run_row[r]
+            start = max(0, self.run_start[r] - 1)
+            end = min(width, self.run_end[r] + 1)
+            for ny in range(max(0, y - 1), min(height, y + 2)):
+                row = ny * width
+                yield row + start, row + end
@@ -0,0 +1,146 @@
+import random
+from array import array
+
+from .planes import BitPlane
+
+# До какого размера поля мины выбираются списком индексов (раскладки прежних зёрен не меняются)
+LIST_CELLS = 1 << 20
+# Список индексов дороже маски (бит на клетку), когда на мину приходится меньше стольких клеток
+MASK_DENSITY = 512
+# Инвертирование байта маски
+_INVERT = bytes(255 - b for b in range(256))
+
+
+def new_seed():
+    """Случайное зерно для партии, если игрок не задал своё"""
+    return random.getrandbits(63)
+
+
+def sample_layout(rng, cells, count, excluded=()):
+    """
+    Выбирает мины способом, память которого ограничена размером поля
+
+    На полях до LIST_CELLS клеток и при редких минах - список индексов
+    (sample_cells), иначе - битовая маска (sample_mask): список из десятков
+    миллионов индексов занял бы гигабайты, а маска - бит на клетку.
+
+    Returns:
+        Список плоских индексов или BitPlane с выбранными клетками
+    """
+    if cells <= LIST_CELLS or count * MASK_DENSITY < cells:
+        return sample_cells(rng, cells, count, excluded)
+    return sample_mask(rng, cells, count, excluded)
+
+
+def sample_mask(rng, cells, count, excluded=()):
+    """
+    Выбирает count различных клеток из range(cells) прямо в битовую маску
+
+    Клетки выбираются бросками с отказом для уже занятых. Если нужно занять
+    больше половины разрешённых клеток, выбираются свободные, а маска затем
+    инвертируется, поэтому занято при бросках не больше половины поля и на
+    клетку в среднем уходит меньше двух бросков при любой плотности.
+    Памяти нужно бит на клетку, без списков индексов.
+
+    Args:
+        rng: Генератор случайных чисел (random.Random)
+        cells: Количество клеток поля
+        count: Сколько клеток выбрать
+        excluded: Плоские индексы клеток, которые выбирать нельзя (безопасная зона)
+
+    Returns:
+        BitPlane с выбранными клетками
+    """
+    excluded = set(excluded)
+    allowed = cells - len(excluded)
+    if not 0 <= count <= allowed:
+        raise ValueError("Мины не помещаются на поле вне безопасной зоны")
+
+    invert = count * 2 > allowed
+    picks = allowed - count if invert else count
+    data = bytearray((cells + 7) >> 3)
+    for i in excluded:
+        data[i >> 3] |= 1 << (i & 7)  # Безопасная зона занята с самого начала
+
+    rand = rng.random
+    while picks:
+        i = int(rand() * cells)
+        bit = 1 << (i & 7)
+        if not data[i >> 3] & bit:
+            data[i >> 3] |= bit
+            picks -= 1
+
+    if invert:
+        # Минами становятся незанятые клетки; зона была занята и после инвертирования свободна
+        data = data.translate(_INVERT)
+        if cells & 7:
+            data[-1] &= (1 << (cells & 7)) - 1
+    else:
+        for i in excluded:
+            data[i >> 3] &= ~(1 << (i & 7)) & 0xFF
+    return BitPlane(cells, data)
+
+
+def sample_cells(rng, cells, count, excluded=()):
+    """
+    Выбирает count различных клеток из range(cells) за один проход, без повторных бросков
+
+    Используется частичная перетасовка Фишера-Йетса: ровно count случайных
+    обменов, поэтому время не зависит от того, насколько поле уже заполнено.
+    Если нужно занять больше половины поля, выбираются свободные клетки,
+    а минами становятся все остальные.
+
+    Args:
+        rng: Генератор случайных чисел (random.Random)
+        cells: Количество клеток поля
+        count: Сколько клеток выбрать
+        excluded: Плоские индексы клеток, которые выбирать нельзя (безопасная зона)
+
+    Returns:
+        Список плоских индексов выбранных клеток
+    """
+    excluded = sorted(set(excluded))
+    allowed = cells - len(excluded)
+    if not 0 <= count <= allowed:
+        raise ValueError("Мины не помещаются на поле вне безопасной зоны")
+
+    if count * 2 > allowed:
+        free = set(_partial_shuffle(rng, allowed, allowed - count))
+        picks = [j for j in range(allowed) if j not in free]
+    else:
+        picks = _partial_shuffle(rng, allowed, count)
+
+    if not excluded:
+        return picks
+    return [_skip_excluded(j, excluded) for j in picks]
+
+
+def _partial_shuffle(rng, n, k):
+    """Первые k элементов случайной перестановки range(n)"""
+    rand = rng.random
+
+    # Если выбирается заметная доля поля, быстрее переставлять элементы в массиве (8 байт на клетку)
+    if k * 8 > n:
+        pool = array('q', range(n))
+        for t in range(k):
+            j = t + int(rand() * (n - t))
+            pool[t], pool[j] = pool[j], pool[t]
+        return pool[:k].tolist()
+
+    # Иначе храним только переставленные элементы (память O(k) даже для огромных полей)
+    swaps = {}
+    result = []
+    for t in range(k):
+        j = t + int(rand() * (n - t))
+        result.append(swaps.get(j, j))
+        swaps[j] = swaps.get(t, t)
+    return result
+
+
+def _skip_excluded(j, excluded):
+    """Переводит номер среди разрешённых клеток в плоский индекс клетки поля"""
+    for cell in excluded:
+        if cell > j:
+            break
+        j += 1
+    return j
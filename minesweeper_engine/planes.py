@@ -0,0 +1,95 @@
+import re
+
+# Байт, в котором есть хотя бы одна единица / хотя бы один ноль
+_HAS_ONE = re.compile(b'[^\x00]')
+_HAS_ZERO = re.compile(b'[^\xff]')
+# Байт плоскости -> восемь байт по клетке (для распаковки в байтовые массивы)
+_UNPACKED = [bytes((b >> k) & 1 for k in range(8)) for b in range(256)]
+# Сколько байт плоскости распаковывать за раз (память распаковки не растёт с полем)
+UNPACK_BYTES = 1 << 16
+
+
+class BitPlane:
+    def __init__(self, size, data=None):
+        """
+        Битовая плоскость: по одному биту на клетку поля
+
+        Биты упакованы в bytearray в порядке "младший бит первым", что совпадает с
+        numpy.packbits(..., bitorder='little'), а вся плоскость целиком читается как
+        одно большое целое через int.from_bytes(data, 'little'). Поддерживает тот же
+        интерфейс индексации и поиска, что и bytearray с байтом на клетку.
+
+        Args:
+            size: Количество клеток
+            data: Готовые упакованные байты (по умолчанию - все биты сброшены)
+        """
+        self.size = size
+        self.data = bytearray((size + 7) >> 3) if data is None else data
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, i):
+        return (self.data[i >> 3] >> (i & 7)) & 1
+
+    def __setitem__(self, i, value):
+        if value:
+            self.data[i >> 3] |= 1 << (i & 7)
+        else:
+            self.data[i >> 3] &= ~(1 << (i & 7)) & 0xFF
+
+    def __eq__(self, other):
+        return isinstance(other, BitPlane) and self.size == other.size and self.data == other.data
+
+    def find(self, value, start=0, end=None):
+        """Индекс первой клетки со значением value в [start, end) или -1 (как у bytearray.find)"""
+        if end is None or end > self.size:
+            end = self.size
+        i = start
+
+        # Невыровненное начало проверяем побитно
+        while i < end and i & 7:
+            if self[i] == value:
+                return i
+            i += 1
+        if i >= end:
+            return -1
+
+        # Целые байты, где искомого бита нет, пропускаем поиском на уровне C
+        match = (_HAS_ONE if value else _HAS_ZERO).search(self.data, i >> 3, (end + 7) >> 3)
+        if match is None:
+            return -1
+        i = match.start() << 3
+        for i in range(i, min(i + 8, end)):
+            if self[i] == value:
+                return i
+        return -1
+
+    def ones(self):
+        """Перебирает индексы установленных битов"""
+        i = self.find(1)
+        while i != -1:
+            yield i
+            i = self.find(1, i + 1)
+
+    def unpack_into(self, out):
+        """Записывает плоскость в массив out по байту на клетку (частями, без копии всего поля)"""
+        data, size = self.data, self.size
+        for start in range(0, len(data), UNPACK_BYTES):
+            chunk = b''.join([_UNPACKED[b] for b in data[start:start + UNPACK_BYTES]])
+            cell = start << 3
+            end = min(size, cell + len(chunk))
+            out[cell:end] = chunk[:end - cell]
+
+    def to_int(self):
+        """Вся плоскость как одно целое (бит i соответствует клетке i)"""
+        return int.from_bytes(self.data, 'little')
+
+    def load_int(self, value):
+        """Записывает в плоскость биты целого value"""
+        self.data[:] = value.to_bytes(len(self.data), 'little')
+
+    def count(self, value=1):
+        """Количество клеток со значением value"""
+        ones = self.to_int().bit_count()
+        return ones if value else self.size - ones
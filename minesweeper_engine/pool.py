@@ -0,0 +1,250 @@
+import queue
+import random
+import threading
+import time
+
+from .adjacency import compute_adjacency
+from .board import Board, WON
+from .noguess import find_no_guess_seed, place_mines_no_guess
+from .placement import new_seed, sample_cells
+from .planes import BitPlane
+from .snapshot import _pack
+from .solver import Solver
+
+# Сколько готовых полей держать в запасе
+POOL_SIZE = 4
+# Поля больше этого (в клетках) в запас не генерируются: мины расставляются при клике
+POOL_CELLS = 1 << 20
+# Счётчик соседей -> 1 для пустой клетки (для маски пустых клеток через bytes.translate)
+_IS_ZERO = bytes([1] + [0] * 255)
+
+
+class BoardPool:
+    def __init__(self, width, height, mine_count, safe_radius=1, no_guess=False, size=POOL_SIZE,
+                 workers=None, seed=None):
+        """
+        Запас заранее сгенерированных полей, который пополняется в фоновом потоке
+
+        Дорогая генерация (большие поля, поля без угадываний) выполняется, пока
+        игрок смотрит на пустое поле или играет, а первый клик только берёт
+        готовое поле из очереди и подгоняет его под клик: поле поворачивается
+        или отражается так, чтобы клик попал в пустую область, а если такой
+        симметрии нет - мины переносятся из безопасной зоны клика в случайные
+        свободные клетки. Поле без угадываний проходимо из любой клетки своей
+        стартовой пустой области, поэтому симметрии его сохраняют, а после
+        переноса мин оно проверяется решателем; если и это не помогло, поле
+        подбирается заново прямо при клике.
+
+        Готовое поле хранится двумя битовыми масками (мины и пустые клетки
+        для клика), а поля больше POOL_CELLS клеток в запас не берутся.
+
+        Если поле без угадываний с такой плотностью мин найти не удаётся,
+        запас переходит на обычные поля, а причина сохраняется в failed
+        (и возвращается из place, чтобы интерфейс сообщил о ней игроку).
+
+        Args:
+            width, height, mine_count, safe_radius: Параметры полей (как у Board)
+            no_guess: Генерировать поля, которые проходятся без угадываний
+            size: Сколько готовых полей держать в запасе
+            workers: Количество процессов для поиска полей без угадываний
+            seed: Зерно генератора запаса (по умолчанию - случайное)
+        """
+        self.width = width
+        self.height = height
+        self.mine_count = mine_count
+        self.safe_radius = safe_radius
+        self.no_guess = no_guess
+        self.workers = workers
+        self.rng = random.Random(new_seed() if seed is None else seed)  # Только для фонового потока
+        self.place_rng = random.Random(self.rng.getrandbits(63))  # Для подгонки поля под клик
+        self.transforms = _symmetries(width, height)
+        self.failed = None  # Почему не удалось найти поле без угадываний (тогда поля обычные)
+
+        self.boards = queue.Queue(maxsize=size)
+        self.stopped = threading.Event()
+        self.thread = None
+        if width * height <= POOL_CELLS:
+            self.thread = threading.Thread(target=self._fill, daemon=True)
+            self.thread.start()
+
+    def _fill(self):
+        """Фоновый поток: генерирует поля, пока очередь не заполнится, и ждёт свободного места"""
+        while not self.stopped.is_set():
+            try:
+                item = self.generate()
+            except RuntimeError as error:
+                self.failed = str(error)  # Дальше запас пополняется обычными полями
+                continue
+            while not self.stopped.is_set():
+                try:
+                    self.boards.put(item, timeout=0.5)
+                    break
+                except queue.Full:
+                    continue
+
+    def generate(self):
+        """
+        Генерирует одно поле для запаса
+
+        Returns:
+            Словарь: 'mines' - маска мин BitPlane, 'zeros' - маска пустых клеток,
+            клик в которые открывает область (для поля без угадываний - только
+            клетки его стартовой области), 'no_guess' - поле без угадываний,
+            'attempts' и 'elapsed' - цена генерации
+
+        Raises:
+            RuntimeError: Поле без угадываний не найдено
+        """
+        started = time.perf_counter()
+        width, height = self.width, self.height
+        cells = width * height
+        no_guess = self.no_guess and self.failed is None
+        if no_guess:
+            # Поле проверяется от центра, подходит любая пустая клетка открытой им области
+            start_x, start_y = width // 2, height // 2
+            found = find_no_guess_seed(width, height, self.mine_count, start_x, start_y, self.safe_radius,
+                                       seed=self.rng.getrandbits(63), workers=self.workers)
+            board = Board(width, height, self.mine_count, safe_radius=self.safe_radius, seed=found['seed'],
+                          storage='packed')
+            opened = board.reveal(start_x, start_y)
+            mines = board.mines
+            zeros = BitPlane(cells)
+            for i in opened:
+                if board.adjacent[i] == 0:
+                    zeros[i] = 1
+            attempts = found['attempts']
+        else:
+            mask = bytearray(cells)
+            for i in sample_cells(self.rng, cells, self.mine_count):
+                mask[i] = 1
+            adjacent = bytearray(cells)
+            compute_adjacency(mask, adjacent, width, height)
+            mines = BitPlane(cells, bytearray(_pack(mask, cells)))
+            zeros = BitPlane(cells, bytearray(_pack(adjacent.translate(_IS_ZERO), cells)))
+            zeros.load_int(zeros.to_int() & ~mines.to_int())  # Пустые клетки без мин
+            attempts = 1
+        return {'mines': mines, 'zeros': zeros, 'no_guess': no_guess, 'attempts': attempts,
+                'elapsed': time.perf_counter() - started}
+
+    def place(self, board, x, y):
+        """
+        Расставляет мины поля board готовым полем из запаса с первым ходом в (x, y)
+
+        Если запас пуст или поле без угадываний не подгоняется под клик,
+        мины расставляются прямо сейчас (если и здесь поле без угадываний не
+        найдено - обычным способом).
+
+        Returns:
+            Словарь: 'pooled' - взято ли поле из запаса, 'attempts' и 'elapsed' -
+            цена генерации, 'wait' - сколько секунд занял сам клик, 'failed' -
+            почему поле обычное, хотя просили без угадываний (иначе None)
+        """
+        started = time.perf_counter()
+        try:
+            item = self.boards.get_nowait()
+        except queue.Empty:
+            item = None
+
+        mines = self._fit(board, item, x, y) if item is not None else None
+        if mines is not None:
+            board.place_layout(mines)
+            return {'pooled': True, 'attempts': item['attempts'], 'elapsed': item['elapsed'],
+                    'wait': time.perf_counter() - started, 'failed': None if item['no_guess'] else self.failed}
+
+        result = None
+        if self.no_guess and self.failed is None:
+            try:
+                result = place_mines_no_guess(board, x, y, self.workers)
+                result['failed'] = None
+            except RuntimeError as error:
+                self.failed = str(error)
+        if result is None:
+            board.place_mines(x, y)
+            result = {'attempts': 1, 'elapsed': time.perf_counter() - started, 'failed': self.failed}
+        result.update(pooled=False, wait=time.perf_counter() - started)
+        return result
+
+    def _fit(self, board, item, x, y):
+        """Маска мин готового поля, подогнанная под первый ход (None, если подогнать нельзя)"""
+        width = self.width
+        transforms = self.transforms[:]
+        self.place_rng.shuffle(transforms)  # Случайная симметрия, чтобы клик не определял поле
+
+        # Симметрия, которая переводит пустую клетку готового поля в клетку клика
+        for forward, inverse in transforms:
+            source_x, source_y = inverse(x, y)
+            if item['zeros'][source_y * width + source_x]:
+                moved = BitPlane(width * self.height)
+                for i in item['mines'].ones():
+                    mx, my = forward(i % width, i // width)
+                    moved[my * width + mx] = 1
+                return moved
+
+        mines = self._relocate(board, item['mines'], x, y)
+        # Перенос мин может сделать поле без угадываний непроходимым - проверяем решателем
+        if item['no_guess'] and not self._solvable(mines, x, y):
+            return None
+        return mines
+
+    def _solvable(self, mines, x, y):
+        """Проходится ли поле с такими минами от хода (x, y) одной логикой"""
+        board = Board(self.width, self.height, self.mine_count, safe_radius=self.safe_radius)
+        board.place_layout(mines)
+        board.reveal(x, y)
+        Solver(board).play()
+        return board.status == WON
+
+    def _relocate(self, board, mines, x, y):
+        """Переносит мины из безопасной зоны клика в случайные свободные клетки"""
+        zone = set(board.safe_zone(x, y))
+        inside = [i for i in zone if mines[i]]
+        if not inside:
+            return mines
+        cells = self.width * self.height
+        if cells - len(zone) - (self.mine_count - len(inside)) < len(inside):
+            raise ValueError("Мины не помещаются на поле вне безопасной зоны")
+
+        moved = BitPlane(cells, bytearray(mines.data))
+        for i in inside:
+            moved[i] = 0
+        # Свободные клетки выбираются случайными пробами, без списка всех клеток поля
+        rng = self.place_rng
+        left = len(inside)
+        while left:
+            i = rng.randrange(cells)
+            if not moved[i] and i not in zone:
+                moved[i] = 1
+                left -= 1
+        return moved
+
+    def ready(self):
+        """Сколько готовых полей сейчас в запасе"""
+        return self.boards.qsize()
+
+    def close(self):
+        """Останавливает фоновую генерацию"""
+        self.stopped.set()
+
+
+def _symmetries(width, height):
+    """
+    Симметрии прямоугольного поля: пары функций (прямое, обратное) преобразование координат
+
+    Для прямоугольного поля - тождество, два отражения и поворот на 180 градусов,
+    для квадратного - ещё повороты на 90 градусов и отражения по диагоналям.
+    """
+    right, top = width - 1, height - 1
+    transforms = [
+        (lambda x, y: (x, y), lambda x, y: (x, y)),
+        (lambda x, y: (right - x, y), lambda x, y: (right - x, y)),
+        (lambda x, y: (x, top - y), lambda x, y: (x, top - y)),
+        (lambda x, y: (right - x, top - y), lambda x, y: (right - x, top - y)),
+    ]
+    if width == height:
+        transforms += [
+            (lambda x, y: (y, x), lambda x, y: (y, x)),
+            (lambda x, y: (right - y, right - x), lambda x, y: (right - y, right - x)),
+            (lambda x, y: (right - y, x), lambda x, y: (y, right - x)),
+            (lambda x, y: (y, right - x), lambda x, y: (right - y, x)),
+        ]
+    return transforms
@@ -0,0 +1,254 @@
+from collections import OrderedDict
+from math import comb
+
+from .board import PLAYING
+from .solver import Solver
+
+# Сколько решённых компонент границы помнить (ключ - набор их ограничений)
+COMPONENT_CACHE_SIZE = 4096
+
+
+class ProbabilityEngine:
+    def __init__(self, board, solver=None):
+        """
+        Точные вероятности мин для всех закрытых клеток
+
+        Ограничения, оставшиеся после детерминированного решателя, делятся на
+        независимые компоненты (группы клеток, связанных общими цифрами).
+        Каждая компонента считается отдельно: для каждого числа мин в ней
+        считается количество допустимых расстановок и сколько из них ставят
+        мину в каждую клетку. Результаты компонент объединяются свёрткой,
+        а клетки вне границы учитываются биномиальными весами C(клеток, мин).
+        Решения компонент запоминаются по их ограничениям, поэтому после хода
+        в другом месте поля неизменившиеся компоненты заново не перебираются.
+
+        Args:
+            board: Игровое поле (minesweeper_engine.Board)
+            solver: Готовый решатель этого поля (по умолчанию создаётся новый)
+        """
+        self.board = board
+        self.solver = solver or Solver(board)
+        self.cache = OrderedDict()
+
+    def update(self, opened):
+        """Учитывает клетки, открытые последним ходом (передаются решателю)"""
+        self.solver.update(opened)
+
+    def components(self):
+        """
+        Разбивает оставшиеся ограничения на независимые компоненты
+
+        Returns:
+            Список компонент, каждая - отсортированный кортеж ограничений
+            (отсортированный кортеж клеток, сколько среди них мин)
+        """
+        constraints, watch = self.solver.constraints, self.solver.watch
+        seen = set()
+        result = []
+        for start in watch:
+            if start in seen:
+                continue
+            seen.add(start)
+            stack = [start]
+            owners = set()
+            while stack:
+                cell = stack.pop()
+                for owner in watch[cell]:
+                    if owner in owners:
+                        continue
+                    owners.add(owner)
+                    for near in constraints[owner][0]:
+                        if near not in seen:
+                            seen.add(near)
+                            stack.append(near)
+            result.append(tuple(sorted({(tuple(sorted(constraints[owner][0])), constraints[owner][1])
+                                        for owner in owners})))
+        return result
+
+    def solve_component(self, signature):
+        """
+        Считает расстановки мин одной компоненты (с запоминанием по её ограничениям)
+
+        Клетки решаются по очереди вдоль границы, а расстановки с одинаковыми
+        остатками у незаконченных ограничений склеиваются, поэтому время растёт
+        с длиной компоненты, а не с числом расстановок.
+
+        Returns:
+            (клетки, {мин: расстановок}, [{мин: расстановок с миной в клетке} для каждой клетки])
+        """
+        result = self.cache.get(signature)
+        if result is not None:
+            self.cache.move_to_end(signature)
+            return result
+
+        cells = _band_order(signature)
+        size = len(cells)
+        position = {cell: k for k, cell in enumerate(cells)}
+        groups = [sorted(position[cell] for cell in group) for group, _ in signature]
+        first = [group[0] for group in groups]
+        last = [group[-1] for group in groups]
+
+        # Для каждой позиции: ограничения, которые уже начаты и ещё не закончены после неё,
+        # начинающиеся в ней, содержащие её, и сколько клеток каждого остаётся правее
+        active = [[] for _ in range(size + 1)]
+        starting = [[] for _ in range(size)]
+        containing = [[] for _ in range(size)]
+        for j, group in enumerate(groups):
+            starting[first[j]].append(j)
+            for pos in group:
+                containing[pos].append(j)
+            for pos in range(first[j] + 1, last[j] + 1):
+                active[pos].append(j)
+        left = [{j: sum(p > pos for p in groups[j]) for j in active[pos] + starting[pos]}
+                for pos in range(size)]
+
+        def step(pos, state, value):
+            """Состояние после решения клетки pos (None, если ограничение нарушено)"""
+            needs = dict(zip(active[pos], state))
+            for j in starting[pos]:
+                needs[j] = signature[j][1]
+            for j in containing[pos]:
+                needs[j] -= value
+            rest = left[pos]
+            for j, need in needs.items():
+                if need < 0 or need > rest[j]:
+                    return None
+            return tuple(needs[j] for j in active[pos + 1])
+
+        # Прямой проход: состояние - сколько мин ещё нужно незаконченным ограничениям,
+        # для каждого состояния храним {мин: расстановок}. Клетки упорядочены вдоль
+        # границы, поэтому незаконченных ограничений всегда мало
+        forward = [{(): {0: 1}}]
+        for pos in range(size):
+            layer = {}
+            for state, ways in forward[pos].items():
+                for value in (0, 1):
+                    new_state = step(pos, state, value)
+                    if new_state is not None:
+                        _add_shifted(layer.setdefault(new_state, {}), ways, value)
+            forward.append(layer)
+
+        # Обратный проход: число способов закончить расстановку из каждого состояния
+        backward = [None] * size + [{(): {0: 1}}]
+        per_cell = [{} for _ in cells]
+        for pos in range(size - 1, -1, -1):
+            layer = {}
+            for state, ways in forward[pos].items():
+                completions = {}
+                for value in (0, 1):
+                    new_state = step(pos, state, value)
+                    after = backward[pos + 1].get(new_state) if new_state is not None else None
+                    if after:
+                        _add_shifted(completions, after, value)
+                        if value:
+                            # Расстановки с миной в клетке pos: путь до неё, мина, продолжение
+                            _add_shifted(per_cell[pos], _convolve(ways, after), 1)
+                if completions:
+                    layer[state] = completions
+            backward[pos] = layer
+        totals = forward[size].get((), {})
+        result = (cells, totals, per_cell)
+        self.cache[signature] = result
+        if len(self.cache) > COMPONENT_CACHE_SIZE:
+            self.cache.popitem(last=False)
+        return result
+
+    def probabilities(self):
+        """
+        Returns:
+            Пара: словарь {плоский индекс: вероятность мины} для клеток границы
+            и найденных решателем клеток, и вероятность мины для любой другой
+            закрытой клетки (None, если таких клеток нет)
+        """
+        board = self.board
+        if board.status != PLAYING:
+            return {}, None
+
+        solver = self.solver
+        result = {cell: 1.0 for cell in solver.mines}
+        result.update((cell, 0.0) for cell in solver.safe)
+
+        components = [self.solve_component(signature) for signature in self.components()]
+        remaining = board.mine_count - len(solver.mines)
+        hidden = board.safe_remaining + board.mine_count  # Пока игра идёт, закрыты все мины
+        interior = hidden - len(result) - sum(len(cells) for cells, _, _ in components)
+
+        def weight(mines):
+            """Сколькими способами оставшиеся мины раскладываются по клеткам вне границы"""
+            rest = remaining - mines
+            return comb(interior, rest) if 0 <= rest <= interior else 0
+
+        # Свёртки всех компонент, кроме одной (через префиксы и суффиксы)
+        prefix = [{0: 1}]
+        for _, totals, _ in components:
+            prefix.append(_convolve(prefix[-1], totals))
+        suffix = [{0: 1}]
+        for _, totals, _ in reversed(components):
+            suffix.append(_convolve(suffix[-1], totals))
+        suffix.reverse()
+
+        total = prefix[-1]
+        norm = sum(count * weight(mines) for mines, count in total.items())
+
+        for k, (cells, totals, per_cell) in enumerate(components):
+            others = _convolve(prefix[k], suffix[k + 1])
+            # Вес каждого числа мин в компоненте с учётом остальных компонент и клеток вне границы
+            outside = {mines: sum(count * weight(mines + rest) for rest, count in others.items())
+                       for mines in totals}
+            for cell, counts in zip(cells, per_cell):
+                result[cell] = sum(count * outside[mines] for mines, count in counts.items()) / norm
+
+        interior_probability = None
+        if interior > 0:
+            interior_mines = sum(count * weight(mines) * (remaining - mines) for mines, count in total.items())
+            interior_probability = interior_mines / (norm * interior)
+        return result, interior_probability
+
+    def probability(self, x, y, probabilities=None):
+        """Вероятность мины в клетке (x, y); можно передать уже посчитанный результат probabilities()"""
+        cells, interior = probabilities or self.probabilities()
+        i = y * self.board.width + x
+        if self.board.revealed[i]:
+            return 0.0
+        return cells.get(i, interior)
+
+
+def _convolve(a, b):
+    """Свёртка распределений {мин: расстановок}"""
+    result = {}
+    for i, x in a.items():
+        for j, y in b.items():
+            result[i + j] = result.get(i + j, 0) + x * y
+    return result
+
+
+def _add_shifted(target, ways, shift):
+    """Прибавляет к target распределение ways, сдвинутое на shift мин"""
+    for mines, count in ways.items():
+        target[mines + shift] = target.get(mines + shift, 0) + count
+
+
+def _band_order(signature):
+    """
+    Порядок клеток компоненты вдоль границы (обход в ширину от её конца)
+
+    Соседние в этом порядке клетки связаны общими ограничениями, поэтому
+    при переборе одновременно открыто мало ограничений.
+    """
+    near = {}
+    for group, _ in signature:
+        for cell in group:
+            near.setdefault(cell, set()).update(group)
+
+    def bfs(start):
+        order = [start]
+        seen = {start}
+        for cell in order:
+            for other in sorted(near[cell]):
+                if other not in seen:
+                    seen.add(other)
+                    order.append(other)
+        return order
+
+    # Последняя клетка обхода лежит на дальнем конце компоненты
+    return bfs(bfs(min(near))[-1])
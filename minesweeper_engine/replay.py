@@ -0,0 +1,563 @@
+"""
+Компактная запись партий (повторы) и их быстрое воспроизведение
+
+Пример: python -m minesweeper_engine.replay ~/.minesweeper_replays/20250101-120000.mswr --at 50
+
+Файл повтора - поток записей в кодировке varint (7 бит на байт). После
+заголовка с параметрами поля идут действия игрока: метка записи хранит
+вид действия и время от предыдущего действия в миллисекундах, за ней -
+плоский индекс клетки, поэтому действие занимает 2-4 байта. Расстановка
+мин записывается один раз (разности отсортированных индексов), а каждые
+CHECKPOINT_ACTIONS действий (на больших полях реже) - контрольная точка с состоянием поля
+(сжатые плоскости открытых клеток и флагов и счётчики). Отмена и повтор
+ходов записываются короткой записью перехода с номером действия, после
+которого поле было в том же состоянии: повтор восстанавливает поле как
+после него и продолжает оттуда. При закрытии в
+конец файла пишется оглавление контрольных точек; если игра прервалась
+и оглавления нет, оно восстанавливается одним проходом по файлу.
+"""
+import argparse
+import bisect
+import mmap
+import os
+import struct
+import time
+import zlib
+
+from .board import Board, READY, PLAYING, WON, LOST
+
+MAGIC = b'MSWR'
+VERSION = 2
+VERSIONS = (1, VERSION)  # Читаемые версии (в первой нет записей перехода)
+# Конец файла: смещение оглавления и метка (оглавления нет, если запись оборвалась)
+TRAILER = struct.Struct('<Q4s')
+TRAILER_MAGIC = b'MSWI'
+# Как часто записывать контрольную точку: раз в CHECKPOINT_ACTIONS действий, на больших
+# полях - реже, чтобы сжатые плоскости не занимали больше места, чем сами действия
+CHECKPOINT_ACTIONS = 64
+CELLS_PER_ACTION = 256
+# Папка для повторов по умолчанию
+REPLAY_DIR = os.path.join(os.path.expanduser('~'), '.minesweeper_replays')
+
+# Виды записей (младшие 3 бита метки)
+REVEAL = 0
+FLAG = 1
+CHORD = 2
+GOTO = 3  # Отмена или повтор ходов: поле как после действия с указанным номером
+LAYOUT = 4
+CHECKPOINT = 5
+INDEX = 6
+ACTIONS = (REVEAL, FLAG, CHORD)
+MOVES = ACTIONS + (GOTO,)  # Записи, которые нумеруются как ходы повтора
+
+# Коды состояний партии в контрольных точках
+STATUSES = (READY, PLAYING, WON, LOST)
+
+
+def _put_varint(out, value):
+    """Дописывает неотрицательное целое в out по 7 бит на байт"""
+    while value > 0x7F:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _get_varint(data, pos):
+    """Читает целое из data с позиции pos: (значение, позиция после него)"""
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+def _ones(plane):
+    """Плоские индексы единиц плоскости любого хранения"""
+    if isinstance(plane, memoryview):
+        plane = bytes(plane)
+    if isinstance(plane, (bytes, bytearray)):
+        result = []
+        i = plane.find(1)
+        while i != -1:
+            result.append(i)
+            i = plane.find(1, i + 1)
+        return result
+    return list(plane.ones())
+
+
+def _plane_bytes(plane, cells):
+    """Плоскость в виде байта на клетку (для сжатия в контрольной точке)"""
+    if isinstance(plane, (bytes, bytearray, memoryview)):
+        return bytes(plane)
+    data = bytearray(cells)
+    for i in plane.ones():
+        data[i] = 1
+    return bytes(data)
+
+
+def default_path(directory=REPLAY_DIR):
+    """Путь для повтора новой партии: папка повторов и текущие дата и время"""
+    os.makedirs(directory, exist_ok=True)
+    stamp = time.strftime('%Y%m%d-%H%M%S')
+    path = os.path.join(directory, f'{stamp}.mswr')
+    n = 1
+    while os.path.exists(path):
+        n += 1
+        path = os.path.join(directory, f'{stamp}-{n}.mswr')
+    return path
+
+
+class ReplayWriter:
+    def __init__(self, path, board, checkpoint_every=None):
+        """
+        Потоковая запись партии в файл повтора
+
+        Каждое действие сразу уходит в файл (через буфер ввода-вывода), поэтому
+        память не зависит от длины партии. Действие записывается после того,
+        как интерфейс выполнил его на поле; расстановка мин попадает в файл
+        вместе с первым действием после неё. Если партия уже идёт (например,
+        продолжена из файла поля), сразу пишется контрольная точка с её
+        состоянием, и повтор начинается с неё.
+
+        Args:
+            path: Путь к файлу повтора
+            board: Поле Board, на котором идёт партия
+            checkpoint_every: Через сколько действий записывать контрольную точку
+                (по умолчанию - по размеру поля)
+        """
+        if checkpoint_every is None:
+            checkpoint_every = max(CHECKPOINT_ACTIONS, board.width * board.height // CELLS_PER_ACTION)
+        self.path = path
+        self.board = board
+        self.checkpoint_every = checkpoint_every
+        self.file = open(path, 'wb')
+        self.actions = 0
+        self.elapsed = 0  # Миллисекунды от начала записи до последнего действия
+        self.started = time.monotonic()
+        self.layout_offset = 0  # 0 - расстановка ещё не записана
+        self.checkpoints = []  # (номер действия, смещение записи)
+        self.applied = []  # Номера действий, которые сейчас применены к полю (для отмены)
+        self.undone = []  # Номера отменённых действий (для повтора)
+
+        header = bytearray(MAGIC)
+        header.append(VERSION)
+        for value in (board.width, board.height, board.mine_count, board.safe_radius,
+                      int(board.flag_win), board.seed):
+            _put_varint(header, value)
+        self.file.write(header)
+
+        if board.status != READY:
+            self._write_layout()
+            self._write_checkpoint()
+
+    def record(self, kind, x, y):
+        """
+        Записывает выполненное действие игрока
+
+        Args:
+            kind: REVEAL, FLAG или CHORD
+            x, y: Координаты клетки на поле
+        """
+        if not self.layout_offset and self.board.status != READY:
+            self._write_layout()
+        self._write_move(kind, y * self.board.width + x)
+        self.applied.append(self.actions)
+        self.undone.clear()  # Новый ход отбрасывает отменённые (как и журнал отмены)
+
+    def step(self, moves):
+        """
+        Записывает отмену (moves < 0) или повтор (moves > 0) ходов
+
+        Пишется только номер действия, после которого поле было в том же
+        состоянии. Если переход уходит раньше начала записи (например, запись
+        начата после конца партии), пишется контрольная точка.
+
+        Args:
+            moves: На сколько ходов журнала отмены сдвинулась партия
+        """
+        if not moves:
+            return
+        source, target = (self.applied, self.undone) if moves < 0 else (self.undone, self.applied)
+        if abs(moves) > len(source):
+            self.applied.clear()
+            self.undone.clear()
+            self.checkpoint()
+            return
+        for _ in range(abs(moves)):
+            target.append(source.pop())
+        self._write_move(GOTO, self.applied[-1] if self.applied else 0)
+
+    def _write_move(self, kind, value):
+        """Записывает ход повтора: вид и время от прошлого хода в метке, затем value"""
+        now = round((time.monotonic() - self.started) * 1000)
+        delta = max(0, now - self.elapsed)
+        self.elapsed += delta
+
+        out = bytearray()
+        _put_varint(out, delta << 3 | kind)
+        _put_varint(out, value)
+        self.file.write(out)
+        self.actions += 1
+
+        if self.actions % self.checkpoint_every == 0:
+            self._write_checkpoint()
+
+    def checkpoint(self):
+        """
+        Записывает текущее состояние поля контрольной точкой
+
+        Нужна после изменений, которые не записываются ходами: повтор
+        продолжается от этого состояния.
+        """
+        if not self.layout_offset and self.board.status != READY:
+            self._write_layout()
+        self._write_checkpoint()
+
+    def _write_layout(self):
+        """Записывает расстановку мин: количество и разности отсортированных индексов"""
+        self.layout_offset = self.file.tell()
+        mines = _ones(self.board.mines)
+        out = bytearray()
+        _put_varint(out, LAYOUT)
+        _put_varint(out, len(mines))
+        previous = 0
+        for i in mines:
+            _put_varint(out, i - previous)
+            previous = i
+        self.file.write(out)
+
+    def _write_checkpoint(self):
+        """Записывает состояние поля после self.actions действий"""
+        board = self.board
+        cells = board.width * board.height
+        self.checkpoints.append((self.actions, self.file.tell()))
+
+        out = bytearray()
+        _put_varint(out, CHECKPOINT)
+        for value in (self.actions, self.elapsed, STATUSES.index(board.status),
+                      board.safe_remaining, board.flags_placed, board.correct_flags):
+            _put_varint(out, value)
+        for plane in (board.revealed, board.flagged):
+            packed = zlib.compress(_plane_bytes(plane, cells), 1)
+            _put_varint(out, len(packed))
+            out += packed
+        self.file.write(out)
+        self.file.flush()  # Контрольная точка переживает аварийное завершение игры
+
+    def close(self):
+        """Записывает оглавление контрольных точек и закрывает файл (пустую запись - удаляет)"""
+        if self.file.closed:
+            return
+        if not self.actions:
+            # Партию начали и бросили без единого хода - повтор не нужен
+            self.file.close()
+            os.remove(self.path)
+            return
+        offset = self.file.tell()
+        out = bytearray()
+        _put_varint(out, INDEX)
+        for value in (self.actions, self.layout_offset, len(self.checkpoints)):
+            _put_varint(out, value)
+        previous = (0, 0)
+        for number, position in self.checkpoints:
+            _put_varint(out, number - previous[0])
+            _put_varint(out, position - previous[1])
+            previous = (number, position)
+        out += TRAILER.pack(offset, TRAILER_MAGIC)
+        self.file.write(out)
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ReplayReader:
+    def __init__(self, path):
+        """
+        Чтение файла повтора
+
+        Файл отображается в память (mmap), поэтому к любой контрольной точке
+        можно перейти сразу, не читая всё, что записано до неё.
+
+        Args:
+            path: Путь к файлу повтора
+        """
+        self.path = path
+        self.file = open(path, 'rb')
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        data = self.data
+
+        if data[:4] != MAGIC or data[4] not in VERSIONS:
+            raise ValueError(f"Файл {path} не является повтором партии")
+        pos = 5
+        values = []
+        for _ in range(6):
+            value, pos = _get_varint(data, pos)
+            values.append(value)
+        width, height, mine_count, safe_radius, flag_win, seed = values
+        self.params = {'width': width, 'height': height, 'mine_count': mine_count,
+                       'safe_radius': safe_radius, 'flag_win': bool(flag_win), 'seed': seed}
+        self.start = pos  # Первая запись после заголовка
+        self.end = len(data)
+
+        if not self._read_index():
+            self._scan()
+
+    def _read_index(self):
+        """Читает оглавление в конце файла (False, если его нет - запись оборвалась)"""
+        data = self.data
+        if len(data) < self.start + TRAILER.size:
+            return False
+        offset, magic = TRAILER.unpack_from(data, len(data) - TRAILER.size)
+        if magic != TRAILER_MAGIC or not self.start <= offset < len(data) - TRAILER.size:
+            return False
+
+        pos = offset
+        tag, pos = _get_varint(data, pos)
+        if tag != INDEX:
+            return False
+        self.count, pos = _get_varint(data, pos)
+        self.layout_offset, pos = _get_varint(data, pos)
+        count, pos = _get_varint(data, pos)
+        self.checkpoints = []
+        number = position = 0
+        for _ in range(count):
+            step, pos = _get_varint(data, pos)
+            shift, pos = _get_varint(data, pos)
+            number, position = number + step, position + shift
+            self.checkpoints.append((number, position))
+        self.end = offset
+        return True
+
+    def _scan(self):
+        """Восстанавливает оглавление одним проходом по записям (без применения действий)"""
+        self.count = 0
+        self.layout_offset = 0
+        self.checkpoints = []
+        for offset, kind, _, _ in self._records(self.start):
+            if kind in MOVES:
+                self.count += 1
+            elif kind == LAYOUT:
+                self.layout_offset = offset
+            elif kind == CHECKPOINT:
+                self.checkpoints.append((self.count, offset))
+
+    def _records(self, pos, elapsed=0):
+        """
+        Перебирает записи начиная с позиции pos
+
+        Yields:
+            (смещение записи, вид, время от начала в мс, данные) - для действий данные
+            это плоский индекс клетки, для переходов - номер действия, для остальных
+            записей - позиция их содержимого.
+            Оборванная в конце файла запись пропускается
+        """
+        data, end = self.data, self.end
+        while pos < end:
+            offset = pos
+            try:
+                tag, pos = _get_varint(data, pos)
+                kind = tag & 7
+                if kind in MOVES:
+                    elapsed += tag >> 3
+                    value, pos = _get_varint(data, pos)
+                    yield offset, kind, elapsed, value
+                    continue
+                body = pos
+                if kind == LAYOUT:
+                    count, pos = _get_varint(data, pos)
+                    for _ in range(count):
+                        _, pos = _get_varint(data, pos)
+                elif kind == CHECKPOINT:
+                    for _ in range(6):
+                        _, pos = _get_varint(data, pos)
+                    for _ in range(2):
+                        size, pos = _get_varint(data, pos)
+                        pos += size
+                else:
+                    return  # Оглавление - конец записей
+            except IndexError:
+                return
+            if pos > end:
+                return
+            yield offset, kind, elapsed, body
+
+    def __len__(self):
+        """Количество ходов в повторе (действия, отмены и повторы)"""
+        return self.count
+
+    def actions(self):
+        """
+        Перебирает действия партии (отмены и повторы ходов не перечисляются)
+
+        Yields:
+            (время от начала в мс, вид действия, x, y)
+        """
+        width = self.params['width']
+        for _, kind, elapsed, cell in self._records(self.start):
+            if kind in ACTIONS:
+                yield elapsed, kind, cell % width, cell // width
+
+    def duration(self):
+        """Длительность партии в миллисекундах (время последнего действия)"""
+        elapsed = 0
+        start = self.start
+        if self.checkpoints:
+            start = self.checkpoints[-1][1]
+            elapsed = self._checkpoint_values(start)[0][1]
+        for _, kind, elapsed, _ in self._records(start, elapsed):
+            pass
+        return elapsed
+
+    def board_at(self, n=None):
+        """
+        Состояние поля после первых n ходов (по умолчанию - после всех)
+
+        Поле восстанавливается из ближайшей контрольной точки не позже n,
+        после чего применяются только ходы между ней и n. Переход (отмена или
+        повтор) заменяет поле состоянием после действия, на которое он указывает.
+
+        Returns:
+            Новое поле Board в этом состоянии
+        """
+        if n is None or n > self.count:
+            n = self.count
+        k = bisect.bisect_right(self.checkpoints, (n, float('inf'))) - 1
+        number, offset = self.checkpoints[k] if k >= 0 else (0, self.start)
+
+        # Последний переход до n: поле перед ним не нужно - после него поле такое
+        # же, как после действия, на которое он указывает
+        jump = None
+        applied = number
+        for position, kind, _, body in self._records(offset):
+            if applied >= n:
+                break
+            if kind in MOVES:
+                applied += 1
+                if kind == GOTO:
+                    jump = (position, applied, body)
+
+        if jump is not None:
+            position, applied, target = jump
+            board = self.board_at(target)
+            records = self._records(position)
+            next(records)  # Сам переход
+        else:
+            params = self.params
+            board = Board(params['width'], params['height'], params['mine_count'],
+                          safe_radius=params['safe_radius'], flag_win=params['flag_win'], seed=params['seed'])
+            records = self._records(offset)
+            applied = number
+            if k >= 0:
+                board.place_layout(self._layout())
+                self._restore(board, offset)
+                next(records)  # Сама контрольная точка
+
+        for _, kind, _, body in records:
+            if applied >= n:
+                break
+            if kind == LAYOUT:
+                board.place_layout(self._layout())
+            elif kind in ACTIONS:
+                _apply(board, kind, *board.coords(body))
+                applied += 1
+        return board
+
+    def _layout(self):
+        """Плоские индексы мин из записи расстановки"""
+        data = self.data
+        tag, pos = _get_varint(data, self.layout_offset)
+        count, pos = _get_varint(data, pos)
+        mines = []
+        i = 0
+        for _ in range(count):
+            step, pos = _get_varint(data, pos)
+            i += step
+            mines.append(i)
+        return mines
+
+    def _checkpoint_values(self, offset):
+        """Числа контрольной точки и позиция её плоскостей"""
+        data = self.data
+        _, pos = _get_varint(data, offset)
+        values = []
+        for _ in range(6):
+            value, pos = _get_varint(data, pos)
+            values.append(value)
+        return values, pos
+
+    def _restore(self, board, offset):
+        """Переносит состояние контрольной точки на поле (с уже расставленными минами)"""
+        values, pos = self._checkpoint_values(offset)
+        data = self.data
+        planes = []
+        for _ in range(2):
+            size, pos = _get_varint(data, pos)
+            planes.append(zlib.decompress(data[pos:pos + size]))
+            pos += size
+        board.revealed[:] = planes[0]
+        board.flagged[:] = planes[1]
+        board.status = STATUSES[values[2]]
+        board.safe_remaining, board.flags_placed, board.correct_flags = values[3:6]
+        return values[1]
+
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _apply(board, kind, x, y):
+    """Выполняет записанное действие на поле"""
+    if kind == REVEAL:
+        board.reveal(x, y)
+    elif kind == FLAG:
+        board.toggle_flag(x, y)
+    else:
+        board.chord(x, y)
+
+
+def render(board):
+    """Поле в виде текста: '-' - закрытая клетка, 'F' - флаг, иначе символ клетки"""
+    lines = []
+    for y in range(board.height):
+        row = []
+        for x in range(board.width):
+            if board.is_flagged(x, y):
+                row.append('F')
+            elif not board.is_revealed(x, y):
+                row.append('-')
+            else:
+                row.append(board.cell_char(x, y).replace(' ', '.'))
+        lines.append(''.join(row))
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Просмотр повтора партии сапёра")
+    parser.add_argument('path', help="Файл повтора (.mswr)")
+    parser.add_argument('--at', type=int, help="Показать поле после этого количества действий (по умолчанию - в конце)")
+    args = parser.parse_args(argv)
+
+    with ReplayReader(args.path) as replay:
+        params = replay.params
+        print(f"{params['width']}x{params['height']}, {params['mine_count']} mines, seed {params['seed']}: "
+              f"{len(replay)} actions, {replay.duration() / 1000:.1f}s")
+        board = replay.board_at(args.at)
+        print(f"status: {board.status}")
+        print(render(board))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,260 @@
+"""
+Массовая симуляция партий ботами без интерфейса
+
+Пример: python -m minesweeper_engine.simulate --size 9x9 --size 16x16 --density 0.12 --density 0.16 \
+            --games 100000 --bot logic --output games.csv
+
+Каждая партия записывается строкой CSV (зерно, размеры, мины, исход, ходы, время),
+а сводка (доля побед по размеру и плотности) считается на лету и печатается в конце.
+"""
+import argparse
+import csv
+import os
+import random
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from .board import Board, PLAYING, WON
+from .placement import new_seed
+from .probability import ProbabilityEngine
+from .solver import Solver
+
+# Сколько партий играет процесс за одно задание
+GAMES_PER_TASK = 200
+# Поля записи о партии (порядок столбцов CSV)
+RECORD_FIELDS = ('seed', 'width', 'height', 'mines', 'outcome', 'moves', 'time')
+
+
+class RandomBot:
+    """Открывает случайную закрытую клетку"""
+
+    def __init__(self, board, rng):
+        self.board = board
+        self.rng = rng
+
+    def update(self, opened):
+        """Бот ничего не запоминает"""
+
+    def random_cell(self, excluded=()):
+        """Случайная закрытая клетка вне excluded (выбор с отбрасыванием)"""
+        board = self.board
+        cells = board.width * board.height
+        while True:
+            i = self.rng.randrange(cells)
+            if not board.revealed[i] and i not in excluded:
+                return board.coords(i)
+
+    def move(self):
+        return self.random_cell()
+
+
+class LogicBot(RandomBot):
+    """Открывает наверняка безопасные клетки, а когда их нет - случайную клетку, где мины может не быть"""
+
+    def __init__(self, board, rng):
+        super().__init__(board, rng)
+        self.solver = None  # Создаётся после первого хода, когда мины уже расставлены
+
+    def update(self, opened):
+        if self.solver is None:
+            self.solver = Solver(self.board)
+        else:
+            self.solver.update(opened)
+
+    def move(self):
+        if self.solver is None:
+            return self.random_cell()
+        hint = self.solver.next_safe()
+        return hint if hint is not None else self.random_cell(self.solver.mines)
+
+
+class ProbabilityBot(LogicBot):
+    """Открывает клетку с наименьшей точной вероятностью мины"""
+
+    def update(self, opened):
+        if self.solver is None:
+            self.engine = ProbabilityEngine(self.board)
+            self.solver = self.engine.solver
+        else:
+            self.engine.update(opened)
+
+    def move(self):
+        if self.solver is None:
+            return self.random_cell()
+        hint = self.solver.next_safe()
+        if hint is not None:
+            return hint
+
+        cells, interior = self.engine.probabilities()
+        revealed = self.board.revealed
+        best, best_p = None, 2
+        for i, p in cells.items():
+            if p < best_p and not revealed[i]:
+                best, best_p = i, p
+        if interior is not None and interior < best_p:
+            return self.random_cell(cells)
+        return self.board.coords(best)
+
+
+BOTS = {
+    'random': RandomBot,
+    'logic': LogicBot,
+    'probability': ProbabilityBot,
+}
+
+
+def play_game(width, height, mines, seed, bot):
+    """
+    Играет одну партию ботом (первый ход - в центр поля)
+
+    Returns:
+        Кортеж записи о партии в порядке RECORD_FIELDS
+    """
+    started = time.perf_counter()
+    board = Board(width, height, mines, seed=seed)
+    player = BOTS[bot](board, random.Random(seed))
+    x, y = width // 2, height // 2
+    moves = 0
+    while True:
+        opened = board.reveal(x, y)
+        moves += 1
+        if board.status != PLAYING:
+            break
+        player.update(opened)
+        x, y = player.move()
+    outcome = 'won' if board.status == WON else 'lost'
+    return seed, width, height, mines, outcome, moves, round(time.perf_counter() - started, 6)
+
+
+def play_games(width, height, mines, seeds, bot):
+    """Задание для процесса: партии со всеми зёрнами seeds"""
+    return [play_game(width, height, mines, seed, bot) for seed in seeds]
+
+
+class Summary:
+    """Сводка по партиям, считаемая на лету (память не зависит от числа партий)"""
+
+    def __init__(self):
+        self.groups = {}  # (ширина, высота, мины) -> [партий, побед, ходов, секунд]
+
+    def add(self, record):
+        _, width, height, mines, outcome, moves, seconds = record
+        group = self.groups.setdefault((width, height, mines), [0, 0, 0, 0.0])
+        group[0] += 1
+        group[1] += outcome == 'won'
+        group[2] += moves
+        group[3] += seconds
+
+    def print(self, out):
+        out.write(f"{'size':>11} {'mines':>7} {'density':>8} {'games':>9} {'win rate':>9} "
+                  f"{'moves':>7} {'ms/game':>8}\n")
+        for (width, height, mines), (games, wins, moves, seconds) in sorted(self.groups.items()):
+            out.write(f"{f'{width}x{height}':>11} {mines:>7} {mines / (width * height):>8.3f} {games:>9} "
+                      f"{wins / games:>9.2%} {moves / games:>7.1f} {seconds / games * 1000:>8.3f}\n")
+
+
+def tasks(configs, games, seed):
+    """Перебирает задания (ширина, высота, мины, зёрна) для всех конфигураций"""
+    rng = random.Random(seed)
+    for width, height, mines in configs:
+        left = games
+        while left > 0:
+            count = min(GAMES_PER_TASK, left)
+            left -= count
+            yield width, height, mines, [rng.getrandbits(63) for _ in range(count)]
+
+
+def simulate(configs, games, bot, workers=None, seed=None, on_record=None):
+    """
+    Играет games партий для каждой конфигурации (ширина, высота, мины)
+
+    Задания раздаются пулу процессов по мере готовности (в работе не больше
+    двух заданий на процесс), поэтому и очередь, и результаты занимают
+    постоянную память.
+
+    Args:
+        on_record: Функция, вызываемая для каждой записи о партии (например, запись в файл)
+
+    Returns:
+        Summary со сводкой по конфигурациям
+    """
+    summary = Summary()
+    pending_tasks = tasks(configs, games, new_seed() if seed is None else seed)
+    workers = workers or os.cpu_count() or 1
+
+    def collect(records):
+        for record in records:
+            summary.add(record)
+            if on_record is not None:
+                on_record(record)
+
+    if workers == 1:
+        for width, height, mines, seeds in pending_tasks:
+            collect(play_games(width, height, mines, seeds, bot))
+        return summary
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        running = set()
+        for task in pending_tasks:
+            running.add(pool.submit(play_games, *task, bot))
+            if len(running) >= workers * 2:
+                done, running = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    collect(future.result())
+        for future in running:
+            collect(future.result())
+    return summary
+
+
+def parse_size(text):
+    """'16x30' -> (16, 30)"""
+    width, _, height = text.lower().partition('x')
+    return int(width), int(height or width)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Массовая симуляция партий сапёра ботами")
+    parser.add_argument('--size', action='append', type=parse_size,
+                        help="Размер поля ШxВ (можно несколько раз), по умолчанию 9x9")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--mines', action='append', type=int, help="Количество мин (можно несколько раз)")
+    group.add_argument('--density', action='append', type=float, help="Доля клеток с минами (можно несколько раз)")
+    parser.add_argument('--games', type=int, default=1000, help="Партий на каждую конфигурацию")
+    parser.add_argument('--bot', choices=sorted(BOTS), default='logic', help="Бот, который играет партии")
+    parser.add_argument('--workers', type=int, help="Количество процессов (по умолчанию - по числу ядер)")
+    parser.add_argument('--seed', type=int, help="Зерно для зёрен партий (для воспроизводимости)")
+    parser.add_argument('--output', help="Файл для записей о партиях в CSV ('-' - стандартный вывод)")
+    args = parser.parse_args(argv)
+
+    configs = []
+    for width, height in args.size or [(9, 9)]:
+        if args.mines:
+            counts = args.mines
+        else:
+            counts = [round(density * width * height) for density in args.density or [10 / 81]]
+        configs.extend((width, height, count) for count in counts)
+
+    out = None
+    on_record = None
+    if args.output:
+        out = sys.stdout if args.output == '-' else open(args.output, 'w', newline='')
+        writer = csv.writer(out)
+        writer.writerow(RECORD_FIELDS)
+        on_record = writer.writerow
+
+    started = time.perf_counter()
+    try:
+        summary = simulate(configs, args.games, args.bot, args.workers, args.seed, on_record)
+    finally:
+        if out is not None and out is not sys.stdout:
+            out.close()
+
+    # Сводка идёт в stderr, чтобы не смешиваться с записями в stdout
+    summary.print(sys.stderr)
+    sys.stderr.write(f"{sum(group[0] for group in summary.groups.values())} games in "
+                     f"{time.perf_counter() - started:.1f}s\n")
+
+
+if __name__ == '__main__':
+    main()
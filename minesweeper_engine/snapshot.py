@@ -0,0 +1,169 @@
+import json
+import os
+import struct
+import zlib
+
+try:
+    import numpy as np
+except ImportError:  # Без NumPy плоскости упаковываются и распаковываются построчно
+    np = None
+
+from .board import Board, READY
+from .planes import BitPlane
+from .storage import make_storage
+
+# Заголовок: метка, версия, флаги, параметры поля, состояние, счётчики, таймер,
+# длина настроек и размеры трёх плоскостей в файле
+HEADER = struct.Struct('<4sHHQQQqBBxx8s8sQqqdIQQQ')
+MAGIC = b'MSWS'
+VERSION = 1
+COMPRESSED = 1  # Флаг: плоскости сжаты zlib
+# Папка для сохранённых партий по умолчанию
+SNAPSHOT_DIR = os.path.join(os.path.expanduser('~'), '.minesweeper_snapshots')
+
+# Байт упакованной плоскости -> 8 байт по клетке (распаковка без NumPy)
+_UNPACKED = [bytes((b >> k) & 1 for k in range(8)) for b in range(256)]
+
+
+def default_path(name, directory=SNAPSHOT_DIR):
+    """Путь к сохранённой партии версии игры name (одно сохранение на версию)"""
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, f'{name}.msnap')
+
+
+def _pack(plane, cells):
+    """Плоскость любого хранения в виде битов (младший бит первым, как у BitPlane)"""
+    if isinstance(plane, BitPlane):
+        return plane.data
+    if np is not None and isinstance(plane, (bytearray, memoryview)):
+        return np.packbits(np.frombuffer(plane, dtype=np.uint8), bitorder='little').tobytes()
+    packed = BitPlane(cells)
+    if isinstance(plane, (bytearray, memoryview)):
+        plane = bytes(plane)
+        i = plane.find(1)
+        while i != -1:
+            packed[i] = 1
+            i = plane.find(1, i + 1)
+    else:
+        for i in plane.ones():
+            packed[i] = 1
+    return packed.data
+
+
+def _unpack(packed, plane, cells):
+    """Записывает биты packed в байтовую или битовую плоскость хранения plane"""
+    if isinstance(plane, BitPlane):
+        plane.data[:] = packed
+    elif isinstance(plane, (bytearray, memoryview)):
+        if np is not None:
+            bits = np.unpackbits(np.frombuffer(packed, dtype=np.uint8), count=cells, bitorder='little')
+            np.frombuffer(plane, dtype=np.uint8)[:] = bits
+        else:
+            plane[:] = b''.join(_UNPACKED[b] for b in packed)[:cells]
+
+
+def save_snapshot(path, board, elapsed=0.0, settings=None, compress=False):
+    """
+    Сохраняет партию в файл: упакованные по биту на клетку плоскости мин,
+    открытых клеток и флагов, счётчики, таймер и настройки интерфейса
+
+    Счётчики соседей не сохраняются - при загрузке они пересчитываются
+    пакетно по плоскости мин, это быстрее чтения лишнего байта на клетку.
+    Файл сначала пишется рядом под временным именем, поэтому сбой во время
+    сохранения не портит прошлое сохранение.
+
+    Args:
+        path: Путь к файлу
+        board: Поле Board
+        elapsed: Время партии в секундах
+        settings: Настройки интерфейса (словарь, сохраняется в JSON)
+        compress: Сжать плоскости zlib (файл меньше, загрузка дольше)
+    """
+    cells = board.width * board.height
+    planes = [_pack(plane, cells) for plane in (board.mines, board.revealed, board.flagged)]
+    if compress:
+        planes = [zlib.compress(plane, 1) for plane in planes]
+    settings_data = json.dumps(settings or {}).encode()
+
+    header = HEADER.pack(MAGIC, VERSION, COMPRESSED if compress else 0,
+                         board.width, board.height, board.mine_count, board.seed,
+                         board.safe_radius, int(board.flag_win),
+                         board.status.encode(), board.storage.name.encode(),
+                         board.safe_remaining, board.flags_placed, board.correct_flags, elapsed,
+                         len(settings_data), *(len(plane) for plane in planes))
+
+    temp = path + '.tmp'
+    with open(temp, 'wb') as f:
+        f.write(header)
+        f.write(settings_data)
+        for plane in planes:
+            f.write(plane)
+    os.replace(temp, path)
+
+
+def load_snapshot(path, storage=None):
+    """
+    Загружает партию, сохранённую save_snapshot
+
+    Плоскости читаются прямо в буферы хранения (readinto): для хранения
+    'packed' биты попадают на место без копий и преобразований, для
+    остальных распаковываются одним пакетным шагом. Разметка открытий не
+    строится - вскрытие обходит соседей.
+
+    Args:
+        path: Путь к файлу
+        storage: Вариант хранения поля (по умолчанию - тот же, что у сохранённого поля)
+
+    Returns:
+        Кортеж (поле Board, время партии в секундах, настройки интерфейса)
+    """
+    with open(path, 'rb') as f:
+        fields = HEADER.unpack(f.read(HEADER.size))
+        (magic, version, flags, width, height, mine_count, seed, safe_radius, flag_win,
+         status, saved_storage, safe_remaining, flags_placed, correct_flags, elapsed,
+         settings_size, *sizes) = fields
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"Файл {path} не является сохранённой партией")
+        settings = json.loads(f.read(settings_size))
+
+        board = Board.__new__(Board)
+        board.width = width
+        board.height = height
+        board.mine_count = mine_count
+        board.safe_radius = safe_radius
+        board.flag_win = bool(flag_win)
+        board.seed = seed
+        board.storage = make_storage(storage or saved_storage.rstrip(b'\x00').decode())
+        board.storage.allocate(width, height)
+        board._bind_planes()
+
+        cells = width * height
+        for name, size in zip(('mines', 'revealed', 'flagged'), sizes):
+            plane = getattr(board, name)
+            if flags & COMPRESSED:
+                packed = zlib.decompress(f.read(size))
+            elif isinstance(plane, BitPlane):
+                f.readinto(plane.data)  # Биты сразу на своём месте
+                continue
+            else:
+                packed = bytearray(size)
+                f.readinto(packed)
+
+            if isinstance(plane, (BitPlane, bytearray, memoryview)):
+                _unpack(packed, plane, cells)
+            elif name == 'mines':
+                # Разреженное хранение принимает мины только списком
+                board.storage.set_mines(list(BitPlane(cells, bytearray(packed)).ones()))
+                board._bind_planes()
+            else:
+                for i in BitPlane(cells, bytearray(packed)).ones():
+                    plane[i] = 1
+
+    board.status = status.rstrip(b'\x00').decode()
+    board.safe_remaining = safe_remaining
+    board.flags_placed = flags_placed
+    board.correct_flags = correct_flags
+    if board.status != READY:
+        board.storage.compute_adjacency()
+    board._sync()
+    return board, elapsed, settings
@@ -0,0 +1,158 @@
+from .board import PLAYING
+
+
+class Solver:
+    def __init__(self, board):
+        """
+        Детерминированный решатель по видимому состоянию поля
+
+        Каждая открытая цифра даёт ограничение: среди её закрытых соседей
+        ровно столько мин, сколько показывает цифра (за вычетом уже найденных).
+        Из ограничений выводятся клетки, которые наверняка безопасны или
+        наверняка заминированы: по одному ограничению (нужно 0 мин или все
+        клетки) и по парам, где клетки одного ограничения - подмножество
+        клеток другого. Решатель инкрементальный: после хода проверяются
+        только ограничения, которых коснулись новые открытые клетки, поэтому
+        стоимость хода не зависит от длины всей границы.
+
+        Решатель читает только открытые клетки и их цифры (мины и флаги
+        игрока не используются, поэтому ошибочные флаги не сбивают подсказки).
+
+        Args:
+            board: Игровое поле (minesweeper_engine.Board)
+        """
+        self.board = board
+        self.constraints = {}  # Клетка с цифрой -> [множество закрытых соседей, сколько среди них мин]
+        self.watch = {}  # Закрытая клетка -> множество цифр, в ограничения которых она входит
+        self.safe = set()  # Закрытые клетки, которые наверняка безопасны
+        self.mines = set()  # Клетки, где наверняка мина
+
+        # Уже открытые клетки (например, решатель подключён посреди партии)
+        revealed = board.revealed
+        self.update([i for i in range(board.width * board.height) if revealed[i]])
+
+    def update(self, opened):
+        """
+        Учитывает новые открытые клетки и выводит всё, что из них следует
+
+        Args:
+            opened: Плоские индексы клеток, открытых последним ходом (как их вернул Board.reveal)
+        """
+        if self.board.status != PLAYING:
+            return
+
+        board = self.board
+        width, height = board.width, board.height
+        revealed, adjacent = board.revealed, board.adjacent
+        queue = []
+
+        for i in opened:
+            # Открытая клетка больше не неизвестная
+            self._resolve(i, False, queue)
+            self.safe.discard(i)
+
+            count = adjacent[i]
+            if count == 0:
+                continue
+            x, y = i % width, i // width
+            cells = set()
+            for ny in range(max(0, y - 1), min(height, y + 2)):
+                for nx in range(max(0, x - 1), min(width, x + 2)):
+                    j = ny * width + nx
+                    if revealed[j] or j in self.safe:
+                        continue
+                    if j in self.mines:
+                        count -= 1
+                    else:
+                        cells.add(j)
+            if cells:
+                self.constraints[i] = [cells, count]
+                for j in cells:
+                    self.watch.setdefault(j, set()).add(i)
+                queue.append(i)
+
+        self._propagate(queue)
+
+    def _resolve(self, cell, mine, queue):
+        """Фиксирует значение клетки и убирает её из всех ограничений"""
+        for owner in self.watch.pop(cell, ()):
+            constraint = self.constraints[owner]
+            constraint[0].discard(cell)
+            if mine:
+                constraint[1] -= 1
+            if constraint[0]:
+                queue.append(owner)
+            else:
+                del self.constraints[owner]
+
+    def _mark(self, cells, mine, queue):
+        """Отмечает клетки как наверняка заминированные или наверняка безопасные"""
+        found = self.mines if mine else self.safe
+        for cell in cells:
+            if cell in self.mines or cell in self.safe:
+                continue
+            found.add(cell)
+            self._resolve(cell, mine, queue)
+
+    def _propagate(self, queue):
+        """Применяет правила к ограничениям из очереди, пока выводятся новые клетки"""
+        constraints, watch = self.constraints, self.watch
+        while queue:
+            owner = queue.pop()
+            constraint = constraints.get(owner)
+            if constraint is None:
+                continue
+            cells, need = constraint
+
+            # Правило одной клетки: мин нет или мины везде
+            if need == 0 or need == len(cells):
+                self._mark(list(cells), need > 0, queue)
+                continue
+
+            # Правило подмножества: ограничения, у которых есть общие клетки с текущим
+            others = set()
+            for cell in cells:
+                others |= watch[cell]
+            others.discard(owner)
+
+            deductions = []
+            for other in others:
+                other_cells, other_need = constraints[other]
+                if cells < other_cells:
+                    rest, rest_need = other_cells - cells, other_need - need
+                elif other_cells < cells:
+                    rest, rest_need = cells - other_cells, need - other_need
+                else:
+                    continue
+                if rest_need == 0 or rest_need == len(rest):
+                    deductions.append((rest, rest_need > 0))
+
+            for rest, mine in deductions:
+                self._mark(list(rest), mine, queue)
+
+    def hints(self):
+        """
+        Returns:
+            Пара отсортированных списков плоских индексов: наверняка безопасные и наверняка заминированные клетки
+        """
+        return sorted(self.safe), sorted(self.mines)
+
+    def next_safe(self):
+        """Любая наверняка безопасная закрытая клетка (x, y) или None"""
+        if not self.safe:
+            return None
+        return self.board.coords(min(self.safe))
+
+    def play(self):
+        """
+        Открывает наверняка безопасные клетки, пока они есть (автоигра)
+
+        Returns:
+            Количество сделанных ходов
+        """
+        moves = 0
+        while self.safe and self.board.status == PLAYING:
+            x, y = self.board.coords(self.safe.pop())
+            self.update(self.board.reveal(x, y))
+            moves += 1
+        return moves
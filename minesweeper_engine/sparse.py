@@ -0,0 +1,420 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+
+from .planes import BitPlane
+
+# Сколько посчитанных счётчиков соседей держать в кэше
+ADJACENCY_CACHE_SIZE = 65536
+# Сколько строк с посчитанными пустыми отрезками держать в кэше
+ZERO_RUNS_CACHE_SIZE = 65536
+
+
+class SortedMines:
+    """Плоскость мин, хранящая только отсортированные плоские индексы мин (8 байт на мину)"""
+
+    def __init__(self, size, indices=()):
+        self.size = size
+        self.index = array('q', sorted(indices))
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, i):
+        j = bisect_left(self.index, i)
+        return 1 if j < len(self.index) and self.index[j] == i else 0
+
+    def count_range(self, start, end):
+        """Количество мин с индексами в [start, end)"""
+        return bisect_left(self.index, end) - bisect_left(self.index, start)
+
+    def in_range(self, start, end):
+        """Индексы мин в [start, end) по возрастанию"""
+        return self.index[bisect_left(self.index, start):bisect_left(self.index, end)]
+
+    def ones(self):
+        return iter(self.index)
+
+    def count(self, value=1):
+        return len(self.index) if value else self.size - len(self.index)
+
+
+class SetPlane:
+    """Плоскость, хранящая множество индексов установленных клеток (для флагов)"""
+
+    def __init__(self, size):
+        self.size = size
+        self.cells = set()
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, i):
+        return 1 if i in self.cells else 0
+
+    def __setitem__(self, i, value):
+        if value:
+            self.cells.add(i)
+        else:
+            self.cells.discard(i)
+
+    def ones(self):
+        return iter(sorted(self.cells))
+
+    def count(self, value=1):
+        return len(self.cells) if value else self.size - len(self.cells)
+
+
+class IntervalPlane:
+    """
+    Плоскость открытых клеток в виде непересекающихся отрезков каждой строки
+
+    Открытые клетки образуют сплошные области, поэтому отрезков на порядки
+    меньше, чем клеток, и память растёт с числом границ открытых областей.
+    """
+
+    def __init__(self, width, height):
+        self.width = width
+        self.size = width * height
+        self.rows = {}  # Номер строки -> (начала, концы) отрезков, концы не включаются
+        self.total = 0  # Количество открытых клеток
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, i):
+        row = self.rows.get(i // self.width)
+        if row is None:
+            return 0
+        x = i % self.width
+        k = bisect_right(row[0], x) - 1
+        return 1 if k >= 0 and x < row[1][k] else 0
+
+    def __setitem__(self, i, value):
+        y, x = divmod(i, self.width)
+        if value:
+            self.add(y, x, x + 1)
+        else:
+            self.remove(y, x, x + 1)
+
+    def add(self, y, start, end):
+        """
+        Отмечает открытыми клетки [start, end) строки y
+
+        Returns:
+            Список отрезков (начало, конец), которые до этого были закрыты
+        """
+        starts, ends = self.rows.setdefault(y, ([], []))
+        lo = bisect_left(ends, start)  # Первый отрезок, который касается нового или правее
+        hi = bisect_right(starts, end)  # Отрезки после hi начинаются правее нового
+
+        added = []
+        pos = start
+        for k in range(lo, hi):
+            if starts[k] > pos:
+                added.append((pos, starts[k]))
+            pos = max(pos, ends[k])
+        if pos < end:
+            added.append((pos, end))
+
+        # Склеиваем новый отрезок с теми, которых он касается
+        if lo < hi:
+            start, end = min(start, starts[lo]), max(end, ends[hi - 1])
+        starts[lo:hi] = [start]
+        ends[lo:hi] = [end]
+
+        self.total += sum(b - a for a, b in added)
+        return added
+
+    def remove(self, y, start, end):
+        """Отмечает закрытыми клетки [start, end) строки y"""
+        row = self.rows.get(y)
+        if row is None:
+            return
+        starts, ends = row
+        lo = bisect_right(ends, start)
+        hi = bisect_left(starts, end)
+        pieces_start, pieces_end = [], []
+        for k in range(lo, hi):
+            self.total -= min(end, ends[k]) - max(start, starts[k])
+            if starts[k] < start:
+                pieces_start.append(starts[k])
+                pieces_end.append(start)
+            if ends[k] > end:
+                pieces_start.append(end)
+                pieces_end.append(ends[k])
+        starts[lo:hi] = pieces_start
+        ends[lo:hi] = pieces_end
+        if not starts:
+            del self.rows[y]
+
+    def ones(self):
+        for y in sorted(self.rows):
+            row = y * self.width
+            for start, end in zip(*self.rows[y]):
+                yield from range(row + start, row + end)
+
+    def count(self, value=1):
+        return self.total if value else self.size - self.total
+
+
+class LazyAdjacency:
+    """Счётчики соседних мин, вычисляемые по запросу с небольшим LRU-кэшем"""
+
+    def __init__(self, mines, width, height, cache_size=ADJACENCY_CACHE_SIZE):
+        self.mines = mines
+        self.width = width
+        self.height = height
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+
+    def __len__(self):
+        return self.width * self.height
+
+    def __getitem__(self, i):
+        cache = self.cache
+        count = cache.get(i)
+        if count is not None:
+            cache.move_to_end(i)
+            return count
+
+        width = self.width
+        y, x = divmod(i, width)
+        left, right = max(0, x - 1), min(width, x + 2)
+        count = -self.mines[i]
+        for ny in range(max(0, y - 1), min(self.height, y + 2)):
+            row = ny * width
+            count += self.mines.count_range(row + left, row + right)
+
+        cache[i] = count
+        if len(cache) > self.cache_size:
+            cache.popitem(last=False)
+        return count
+
+
+class CellRuns:
+    """
+    Результат вскрытия на разреженном поле: открытые клетки в виде отрезков строк
+
+    Ведёт себя как список плоских индексов (len и перебор), но не хранит
+    каждую клетку отдельно, поэтому вскрытие миллиардного поля не требует
+    миллиардного списка.
+    """
+
+    def __init__(self, width):
+        self.width = width
+        self.runs = []  # (строка, начало, конец)
+        self.total = 0
+
+    def add(self, y, start, end):
+        self.runs.append((y, start, end))
+        self.total += end - start
+
+    def __len__(self):
+        return self.total
+
+    def __iter__(self):
+        for y, start, end in self.runs:
+            row = y * self.width
+            yield from range(row + start, row + end)
+
+
+class SparseStorage:
+    """
+    Разреженное хранение для огромных полей с низкой плотностью мин
+
+    Хранятся только индексы мин (отсортированный массив), флаги (множество) и
+    открытые клетки (отрезки строк). Счётчики соседей вычисляются по запросу.
+    Пустые области открываются построчно: пустые отрезки строки находятся по
+    минам трёх соседних строк, так что вскрытие стоит пропорционально числу
+    отрезков, а не клеток. Память зависит от числа мин и открытых областей,
+    а не от площади поля.
+    """
+    name = 'sparse'
+    openings = False
+    sync = None
+
+    def allocate(self, width, height):
+        """Создаёт пустые разреженные плоскости"""
+        cells = width * height
+        self.width, self.height = width, height
+        self.mines = SortedMines(cells)
+        self.revealed = IntervalPlane(width, height)
+        self.flagged = SetPlane(cells)
+        self.adjacent = LazyAdjacency(self.mines, width, height)
+        self.zero_runs_cache = OrderedDict()
+
+    def set_mines(self, indices):
+        """Записывает мины по списку плоских индексов или по битовой маске (BitPlane)"""
+        self.mines.index = array('q', indices.ones() if isinstance(indices, BitPlane) else sorted(indices))
+        self.adjacent.cache.clear()
+        self.zero_runs_cache.clear()
+
+    def compute_adjacency(self):
+        """Счётчики вычисляются лениво, заранее ничего не считаем"""
+
+    def count_unrevealed_safe(self):
+        """Количество закрытых клеток без мин"""
+        revealed_mines = sum(self.revealed[i] for i in self.mines.index)
+        return self.mines.size - len(self.mines.index) - (self.revealed.total - revealed_mines)
+
+    def count_correct_flags(self):
+        """Количество флагов, стоящих на минах"""
+        return sum(self.mines[i] for i in self.flagged.cells)
+
+    def reveal_mines(self):
+        """
+        Открывает все мины (показ поля при проигрыше)
+
+        Returns:
+            Список плоских индексов мин, которые были закрыты
+        """
+        shown = []
+        for i in self.mines.index:
+            if not self.revealed[i]:
+                self.revealed[i] = 1
+                shown.append(i)
+        return shown
+
+    def zero_runs(self, y):
+        """
+        Отрезки пустых клеток (без мин вокруг) строки y
+
+        Клетка не пуста, если по соседству есть мина, поэтому отрезки - это
+        дополнение к окрестностям мин трёх соседних строк.
+
+        Returns:
+            Пара списков (начала, концы) отрезков
+        """
+        cache = self.zero_runs_cache
+        runs = cache.get(y)
+        if runs is not None:
+            cache.move_to_end(y)
+            return runs
+
+        width = self.width
+        blocked = []
+        for ny in range(max(0, y - 1), min(self.height, y + 2)):
+            row = ny * width
+            blocked.extend(i - row for i in self.mines.in_range(row, row + width))
+        blocked.sort()
+
+        starts, ends = [], []
+        pos = 0
+        for x in blocked:
+            if x - 1 > pos:
+                starts.append(pos)
+                ends.append(x - 1)
+            pos = max(pos, x + 2)
+        if pos < width:
+            starts.append(pos)
+            ends.append(width)
+
+        runs = (starts, ends)
+        cache[y] = runs
+        if len(cache) > ZERO_RUNS_CACHE_SIZE:
+            cache.popitem(last=False)
+        return runs
+
+    def flood(self, starts):
+        """
+        Открывает клетки starts и пустые области вокруг них построчной заливкой
+
+        Заливка идёт по кускам пустых отрезков, которые были закрыты и без
+        флагов до её начала: флаг и уже открытая пустая клетка её останавливают,
+        как и при обходе соседей в Board._flood_search.
+
+        Returns:
+            CellRuns с открытыми клетками
+        """
+        width, height = self.width, self.height
+        revealed, flagged, adjacent = self.revealed, self.flagged, self.adjacent
+        opened = CellRuns(width)
+
+        # Флаги по строкам, чтобы вырезать их из открываемых отрезков и кусков
+        flags_by_row = {}
+        for i in flagged.cells:
+            flags_by_row.setdefault(i // width, []).append(i % width)
+        for flags in flags_by_row.values():
+            flags.sort()
+
+        # Открытые до заливки отрезки строк (копия снимается до первого изменения строки)
+        before = {}
+
+        def remember(y):
+            if y not in before:
+                row = revealed.rows.get(y)
+                before[y] = (list(row[0]), list(row[1])) if row else ([], [])
+
+        def open_span(y, start, end):
+            remember(y)
+            pieces = [(start, end)]
+            flags = flags_by_row.get(y)
+            if flags:
+                pieces = []
+                pos = start
+                for x in flags[bisect_left(flags, start):bisect_left(flags, end)]:
+                    pieces.append((pos, x))
+                    pos = x + 1
+                pieces.append((pos, end))
+            for a, b in pieces:
+                if a < b:
+                    for added in revealed.add(y, a, b):
+                        opened.add(y, *added)
+
+        def zero_pieces(y, left, right):
+            """Куски пустых отрезков строки y, касающиеся [left, right): закрытые до заливки и без флагов"""
+            remember(y)
+            open_starts, open_ends = before[y]
+            flags = flags_by_row.get(y, ())
+            run_starts, run_ends = self.zero_runs(y)
+            j = bisect_right(run_ends, left)
+            while j < len(run_starts) and run_starts[j] < right:
+                start, end = run_starts[j], run_ends[j]
+                # Границы кусков: флаги и открытые отрезки внутри пустого отрезка
+                cuts = [(x, x + 1) for x in flags[bisect_left(flags, start):bisect_left(flags, end)]] if flags else []
+                k = bisect_right(open_ends, start)
+                while k < len(open_starts) and open_starts[k] < end:
+                    cuts.append((open_starts[k], open_ends[k]))
+                    k += 1
+                if not cuts:
+                    yield start, end  # Отрезок целиком закрыт и без флагов
+                    j += 1
+                    continue
+                cuts.sort()
+                pos = start
+                for a, b in cuts + [(end, end)]:
+                    if a > pos and a > left and pos < right:
+                        yield pos, min(a, end)
+                    pos = max(pos, b)
+                j += 1
+
+        done = set()  # Уже обработанные куски: (строка, начало)
+        stack = []
+        for i in starts:
+            if revealed[i] or flagged[i]:
+                continue
+            y, x = divmod(i, width)
+            if adjacent[i] == 0:
+                for piece in zero_pieces(y, x, x + 1):
+                    stack.append((y, *piece))
+            else:
+                open_span(y, x, x + 1)
+
+        while stack:
+            y, start, end = stack.pop()
+            if (y, start) in done:
+                continue
+            done.add((y, start))
+
+            # Открываем кусок вместе с цифровой границей в трёх строках
+            left, right = max(0, start - 1), min(width, end + 1)
+            for ny in range(max(0, y - 1), min(height, y + 2)):
+                if ny != y:
+                    # Куски соседней строки, которых касается кусок (в том числе по диагонали)
+                    for piece in zero_pieces(ny, left, right):
+                        if (ny, piece[0]) not in done:
+                            stack.append((ny, *piece))
+                open_span(ny, left, right)
+
+        return opened
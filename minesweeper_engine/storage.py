@@ -0,0 +1,135 @@
+from .adjacency import compute_adjacency, compute_adjacency_packed
+from .mapped import MappedStorage
+from .planes import BitPlane
+from .sparse import SparseStorage
+
+
+class DenseStorage:
+    """
+    Хранение поля по байту на клетку в каждой плоскости
+
+    Самый быстрый вариант для полей обычного размера: индексация и поиск по плоскостям
+    выполняются встроенными методами bytearray.
+    """
+    name = 'dense'
+    openings = True  # Строить ли разметку открытий (4 байта на клетку)
+    flood = None  # Собственная заливка пустых областей (если хранение её предоставляет)
+    sync = None  # Запись состояния партии после каждого хода (для хранения на диске)
+
+    def allocate(self, width, height):
+        """Создаёт пустые плоскости мин, открытых клеток, флагов и счётчиков соседей"""
+        cells = width * height
+        self.width, self.height = width, height
+        self.mines = bytearray(cells)
+        self.revealed = bytearray(cells)
+        self.flagged = bytearray(cells)
+        self.adjacent = bytearray(cells)
+
+    def set_mines(self, indices):
+        """Записывает мины по списку плоских индексов или по битовой маске (BitPlane)"""
+        mines = self.mines
+        if isinstance(indices, BitPlane):
+            if isinstance(mines, BitPlane):
+                mines.data[:] = indices.data
+            else:
+                indices.unpack_into(mines)
+            return
+        for i in indices:
+            mines[i] = 1
+
+    def compute_adjacency(self):
+        """Заполняет счётчики соседних мин по плоскости мин"""
+        compute_adjacency(self.mines, self.adjacent, self.width, self.height)
+
+    def count_unrevealed_safe(self):
+        """Количество закрытых клеток без мин"""
+        hidden = int.from_bytes(self.mines, 'little') | int.from_bytes(self.revealed, 'little')
+        return len(self.mines) - hidden.bit_count()
+
+    def count_correct_flags(self):
+        """Количество флагов, стоящих на минах"""
+        return (int.from_bytes(self.mines, 'little') & int.from_bytes(self.flagged, 'little')).bit_count()
+
+    def reveal_mines(self):
+        """
+        Открывает все мины (показ поля при проигрыше)
+
+        Returns:
+            Список плоских индексов мин, которые были закрыты
+        """
+        mines, revealed = self.mines, self.revealed
+        shown = []
+        i = mines.find(1)
+        while i != -1:
+            if not revealed[i]:
+                revealed[i] = 1
+                shown.append(i)
+            i = mines.find(1, i + 1)
+        return shown
+
+
+class PackedStorage(DenseStorage):
+    """
+    Компактное хранение: мины, открытые клетки и флаги - битовые плоскости, счётчики - байты
+
+    На клетку уходит 1 байт и 3 бита, поэтому поле 10000x10000 занимает около 140 МБ.
+    Операции над всем полем выполняются побитовыми операциями над большими целыми,
+    а разметка открытий не строится (она заняла бы ещё 4 байта на клетку).
+    """
+    name = 'packed'
+    openings = False
+
+    def allocate(self, width, height):
+        """Создаёт пустые битовые плоскости и байтовый массив счётчиков"""
+        cells = width * height
+        self.width, self.height = width, height
+        self.mines = BitPlane(cells)
+        self.revealed = BitPlane(cells)
+        self.flagged = BitPlane(cells)
+        self.adjacent = bytearray(cells)
+
+    def compute_adjacency(self):
+        """Заполняет счётчики соседних мин по битовой плоскости мин"""
+        compute_adjacency_packed(self.mines, self.adjacent, self.width, self.height)
+
+    def count_unrevealed_safe(self):
+        """Количество закрытых клеток без мин: popcount(~(mines | revealed))"""
+        return self.mines.size - (self.mines.to_int() | self.revealed.to_int()).bit_count()
+
+    def count_correct_flags(self):
+        """Количество флагов на минах: popcount(mines & flagged)"""
+        return (self.mines.to_int() & self.flagged.to_int()).bit_count()
+
+    def reveal_mines(self):
+        """
+        Открывает все мины одной операцией revealed |= mines
+
+        Returns:
+            Список плоских индексов мин, которые были закрыты
+        """
+        mines = self.mines.to_int()
+        revealed = self.revealed.to_int()
+        shown = BitPlane(self.mines.size, bytearray((mines & ~revealed).to_bytes(len(self.mines.data), 'little')))
+        self.revealed.load_int(mines | revealed)
+        return list(shown.ones())
+
+
+# Варианты хранения по имени (например, из настроек игры)
+STORAGES = {
+    DenseStorage.name: DenseStorage,
+    PackedStorage.name: PackedStorage,
+    SparseStorage.name: SparseStorage,
+    MappedStorage.name: MappedStorage,
+}
+
+
+def make_storage(storage):
+    """Возвращает объект хранения по имени или сам переданный объект"""
+    if storage is None:
+        return DenseStorage()
+    if isinstance(storage, str):
+        try:
+            return STORAGES[storage]()
+        except KeyError:
+            raise ValueError(f"Неизвестный вариант хранения поля: {storage}") from None
+    return storage
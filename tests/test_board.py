@@ -0,0 +1,26 @@
+import os
+import sys
+
+import pytest
+
+# Общий движок лежит в корне репозитория
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from minesweeper_engine import Board, PLAYING, WON
+
+
+def test_mines_must_fit_outside_safe_zone():
+    # На поле 3x3 зона 3x3 вокруг центра занимает всё поле
+    with pytest.raises(ValueError):
+        Board(3, 3, 1)
+    with pytest.raises(ValueError):
+        Board(9, 9, 73)
+
+
+@pytest.mark.parametrize('x, y', [(0, 0), (1, 1), (8, 4)])
+def test_densest_board_is_playable(x, y):
+    board = Board(9, 9, 72)
+    assert board.reveal(x, y)
+    assert board.status in (PLAYING, WON)
+
+    board = Board(3, 3, 8, safe_radius=0)
+    assert board.reveal(1, 1) and board.status == WON
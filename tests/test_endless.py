@@ -0,0 +1,25 @@
+import os
+import sys
+
+# Общий движок лежит в корне репозитория
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from minesweeper_engine import endless
+from minesweeper_engine.endless import EndlessBoard
+
+
+def test_cut_cascade_continues_from_its_edge(monkeypatch, tmp_path):
+    monkeypatch.setattr(endless, 'MAX_CASCADE', 50)
+    board = EndlessBoard(0.12, seed=5, chunk_size=16, max_chunks=64, save_dir=str(tmp_path))
+    opened = board.reveal(0, 0)
+    assert len(opened) < 60 and board.frontier  # Каскад прерван на пределе
+
+    # Клики по краю прерванного каскада открывают область до конца
+    for _ in range(100):
+        if not board.frontier:
+            break
+        opened += board.reveal(*next(iter(board.frontier)))
+    assert not board.frontier
+    assert len(set(opened)) == len(opened) == board.cells_revealed
+    for x, y in opened:
+        if board.adjacent_count(x, y) == 0:
+            assert all(board.is_revealed(x + dx, y + dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1))
@@ -0,0 +1,63 @@
+import itertools
+import os
+import random
+import sys
+
+import pytest
+
+# Общий движок лежит в корне репозитория
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from minesweeper_engine import Board, PLAYING
+from minesweeper_engine.mapped import MappedStorage
+
+STORAGES = ('dense', 'packed', 'sparse', 'mapped')
+_files = itertools.count()
+
+
+def make_board(storage, width, height, layout, tmp_path):
+    if storage == 'mapped':
+        storage = MappedStorage(str(tmp_path / f'{next(_files)}.board'))
+    board = Board(width, height, len(layout), safe_radius=0, storage=storage)
+    board.place_layout(layout)
+    return board
+
+
+def state(board, result):
+    cells = board.width * board.height
+    # Открытые клетки (список или CellRuns) сравниваются без учёта порядка
+    return (sorted(result) if hasattr(result, '__len__') else result,
+            board.status, board.safe_remaining, bytes(board.revealed[i] for i in range(cells)))
+
+
+@pytest.mark.parametrize('storage', STORAGES)
+def test_flag_stops_cascade(storage, tmp_path):
+    # Пустая строка с миной в конце: флаг посередине останавливает заливку
+    board = make_board(storage, 11, 1, [10], tmp_path)
+    board.toggle_flag(5, 0)
+    assert sorted(board.reveal(0, 0)) == [0, 1, 2, 3, 4]
+    assert board.safe_remaining == 5
+
+
+def test_storages_agree_with_flags(tmp_path):
+    rng = random.Random(2024)
+    for _ in range(60):
+        width, height = rng.randint(2, 24), rng.randint(1, 24)
+        layout = rng.sample(range(width * height), rng.randint(1, max(1, width * height // 8)))
+        boards = [make_board(storage, width, height, layout, tmp_path) for storage in STORAGES]
+        for _ in range(80):
+            x, y = rng.randrange(width), rng.randrange(height)
+            action = rng.random()
+            states = []
+            for board in boards:
+                if action < 0.35:
+                    result = board.toggle_flag(x, y)
+                elif action < 0.5:
+                    result = board.chord(x, y)
+                elif not board.is_mine(x, y):
+                    result = board.reveal(x, y)
+                else:
+                    result = None
+                states.append(state(board, result))
+            assert all(s == states[0] for s in states[1:]), (width, height, layout, x, y)
+            if boards[0].status != PLAYING:
+                break
@@ -0,0 +1,63 @@
+import os
+import sys
+import time
+
+# Общий движок лежит в корне репозитория
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from minesweeper_engine import Board, PLAYING
+from minesweeper_engine import pool as pool_module
+from minesweeper_engine.pool import BoardPool
+
+# Столько мин на поле 9x9 не даёт ни одного поля без угадываний
+WIDTH, HEIGHT, MINES = 9, 9, 50
+
+
+def wait_ready(pool, timeout=60):
+    deadline = time.monotonic() + timeout
+    while not pool.ready() and time.monotonic() < deadline:
+        time.sleep(0.05)
+    return pool.ready()
+
+
+def test_no_guess_falls_back_to_regular_board():
+    pool = BoardPool(WIDTH, HEIGHT, MINES, no_guess=True, workers=1, seed=1)
+    try:
+        # Клик до того, как запас пополнился: поиск при клике не находит поля
+        board = Board(WIDTH, HEIGHT, MINES)
+        result = pool.place(board, 4, 4)
+        assert result['failed'] and not result['pooled']
+        assert sum(board.mines[i] for i in range(WIDTH * HEIGHT)) == MINES
+        assert board.reveal(4, 4) and board.status == PLAYING
+
+        # Фоновый поток не падает, а пополняет запас обычными полями
+        assert wait_ready(pool)
+        board = Board(WIDTH, HEIGHT, MINES)
+        result = pool.place(board, 0, 0)
+        assert result['pooled'] and result['failed']
+        assert pool.thread.is_alive()
+    finally:
+        pool.close()
+
+
+def test_pooled_board_fits_any_click():
+    pool = BoardPool(WIDTH, HEIGHT, 30, seed=3)
+    try:
+        for k in range(40):
+            assert wait_ready(pool)
+            x, y = k % WIDTH, k * 7 % HEIGHT
+            board = Board(WIDTH, HEIGHT, 30)
+            assert pool.place(board, x, y)['pooled']
+            assert sum(board.mines[i] for i in range(WIDTH * HEIGHT)) == 30
+            assert not any(board.mines[i] for i in board.safe_zone(x, y))
+    finally:
+        pool.close()
+
+
+def test_huge_boards_are_not_pooled(monkeypatch):
+    monkeypatch.setattr(pool_module, 'POOL_CELLS', WIDTH * HEIGHT - 1)
+    pool = BoardPool(WIDTH, HEIGHT, 10)
+    board = Board(WIDTH, HEIGHT, 10)
+    result = pool.place(board, 4, 4)
+    assert pool.thread is None and not result['pooled']
+    assert not any(board.mines[i] for i in board.safe_zone(4, 4))
+    pool.close()
@@ -0,0 +1,60 @@
+import os
+import random
+import sys
+
+# Общий движок лежит в корне репозитория
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from minesweeper_engine import Board, PLAYING, READY
+from minesweeper_engine.history import History
+from minesweeper_engine.replay import ReplayReader, ReplayWriter, REVEAL, FLAG, CHORD
+
+
+def snapshot(board):
+    cells = board.width * board.height
+    return (board.status, board.safe_remaining, board.flags_placed,
+            bytes(board.revealed[i] for i in range(cells)), bytes(board.flagged[i] for i in range(cells)))
+
+
+def test_undo_and_redo_replay_without_checkpoints(tmp_path):
+    rng = random.Random(7)
+    path = str(tmp_path / 'game.mswr')
+    board = Board(16, 16, 30, seed=11)
+    history = History(board)
+    writer = ReplayWriter(path, board, checkpoint_every=50)
+    states = [snapshot(board)]  # Состояние после каждого хода повтора
+    while len(states) < 300:
+        if board.status not in (READY, PLAYING) or rng.random() < 0.3:
+            position = history.position
+            choice = rng.random()
+            if choice < 0.5:
+                history.undo()
+            elif choice < 0.8:
+                history.redo()
+            else:
+                history.goto(rng.randint(0, len(history)))
+            if history.position == position:
+                if board.status not in (READY, PLAYING) and not history.can_undo:
+                    break  # Партия кончилась первым же открытием - отменять нечего
+                continue
+            writer.step(history.position - position)
+        else:
+            x, y = rng.randrange(16), rng.randrange(16)
+            kind = rng.choice((REVEAL, REVEAL, FLAG, CHORD))
+            if kind == FLAG:
+                if not history.toggle_flag(x, y):
+                    continue
+            elif board.status == READY:
+                board.place_mines(x, y)
+                history.reveal(x, y)
+            elif not (history.reveal(x, y) if kind == REVEAL else history.chord(x, y)):
+                continue
+            writer.record(kind, x, y)
+        states.append(snapshot(board))
+    writer.close()
+
+    with ReplayReader(path) as replay:
+        assert len(replay) == len(states) - 1
+        # Контрольные точки - только по расписанию: отмена и повтор не пишут поле целиком
+        assert [number for number, _ in replay.checkpoints] == list(range(50, len(states), 50))
+        for n, state in enumerate(states):
+            assert snapshot(replay.board_at(n)) == state, n